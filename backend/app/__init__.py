@@ -1,17 +1,16 @@
+import hmac
 import os
-from flask import Flask, jsonify
-from sqlalchemy.pool import NullPool
+from flask import Flask, Response, jsonify, request
 from flask_sqlalchemy import SQLAlchemy
 from flask_restx import Api
 from dotenv import load_dotenv
 from flask_migrate import Migrate
 from flask_jwt_extended import JWTManager
-from sqlalchemy.orm import sessionmaker
 from flask_cors import CORS
 
 
 load_dotenv() #Loading env
-db = SQLAlchemy(engine_options={"pool_pre_ping": True, "poolclass": NullPool})
+db = SQLAlchemy()  # Engine options come from app.utils.db_pool.engine_options()
 migrate = Migrate()
 jwt = JWTManager()
 
@@ -37,7 +36,11 @@ api = Api(
 #Create App
 def create_app():
     app = Flask(__name__)
+    from app.utils.db_pool import engine_options, install_connect_retry, pool_status
+    from app.utils.profiling import install_request_profiling
+
     app.config["SQLALCHEMY_DATABASE_URI"] = os.getenv("DATABASE_URL", "sqlite:///watchly.db")
+    app.config["SQLALCHEMY_ENGINE_OPTIONS"] = engine_options(app.config["SQLALCHEMY_DATABASE_URI"])
     app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
     app.config["JWT_SECRET_KEY"] = os.getenv("JWT_SECRET_KEY", "supersecretkey")
 
@@ -45,7 +48,7 @@ def create_app():
 
     CORS(app, resources={r"/*": {"origins": allowed_origins}},
             supports_credentials=True,
-            expose_headers=["Content-Type", "Authorization"],
+            expose_headers=["Content-Type", "Authorization", "X-Next-Cursor", "X-Query-Count", "Server-Timing"],
             allow_headers=["Content-Type", "Authorization"],
             methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"])
 
@@ -54,29 +57,46 @@ def create_app():
     migrate.init_app(app, db)
     jwt.init_app(app)
 
-    # Initialize SessionLocal AFTER app & db are set up
     with app.app_context():
         from app.models import User, Website, Metric, Alert  # ✅ Ensure models are registered
-        global SessionLocal
-        SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=db.engine)  # ✅ Fix: Initialize inside app context
+        install_connect_retry(db.engine)  # ✅ Rides out Neon cold starts on every new connection
+        install_request_profiling(app, db.engine)  # ✅ SQL count/time per request, opt-in cProfile
 
     from app.routes.alerts import alerts_ns
     from app.routes.websites import websites_ns
     from app.routes.metrics import metrics_ns
     from app.routes.auth import auth_ns
     from app.routes.status import status_ns
+    from app.routes.events import events_ns
 
     api.add_namespace(alerts_ns, path="/alerts")  # Register namespaces
     api.add_namespace(websites_ns, path="/websites")
     api.add_namespace(metrics_ns, path="/metrics")
     api.add_namespace(auth_ns, path="/auth")
     api.add_namespace(status_ns, path="/status")
+    api.add_namespace(events_ns, path="/events")
 
     @app.route("/status", methods=['GET'])
     def status():
         return jsonify({"message": "Server is running"}), 200
 
+    @app.route("/health/db", methods=['GET'])
+    def db_health():
+        return jsonify(pool_status(db.engine)), 200
+
+    @app.route("/health/telemetry", methods=['GET'])
+    def telemetry_metrics():
+        from app.config import TELEMETRY_TOKEN
+        from app.utils.telemetry import registry, CONTENT_TYPE
+        # Public port: only served with a token (the standalone TELEMETRY_PORT listens locally instead)
+        if not TELEMETRY_TOKEN:
+            return jsonify({"error": "Not found"}), 404
+        if not hmac.compare_digest(request.headers.get("Authorization", "").encode(), f"Bearer {TELEMETRY_TOKEN}".encode()):
+            return jsonify({"error": "Unauthorized"}), 401
+        return Response(registry.render(), content_type=CONTENT_TYPE), 200
+
+    from app.utils.logger import logger
     for rule in app.url_map.iter_rules():
-        print(f"{rule.endpoint}: {rule.rule}")
+        logger.debug("%s: %s", rule.endpoint, rule.rule)
 
     return app
@@ -1,4 +1,5 @@
 import os
+import tempfile
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -19,3 +20,136 @@ class Config:
     SQLALCHEMY_TRACK_MODIFICATIONS = False  # Prevents unnecessary overhead
     SENDGRID_API_KEY = os.getenv("SENDGRID_DEV_API_KEY")
     FLASK_DEBUG = os.getenv("FLASK_DEBUG", "False").lower() in ("true", "1")
+
+# Monitoring
+# Sites due within the same tick are probed as one cycle (one metrics write, one alert pass)
+MONITOR_TICK_SECONDS = float(os.getenv("MONITOR_TICK_SECONDS", "1"))
+MONITOR_RESYNC_SECONDS = float(os.getenv("MONITOR_RESYNC_SECONDS", "60"))   # How often new/changed sites are picked up
+# "embedded": web workers elect one leader to run the monitor; "off": only `python -m app.monitor` runs it
+MONITOR_MODE = os.getenv("MONITOR_MODE", "embedded").lower()
+MONITOR_LEADER_RETRY_SECONDS = float(os.getenv("MONITOR_LEADER_RETRY_SECONDS", "5"))
+MONITOR_LOCK_FILE = os.getenv("MONITOR_LOCK_FILE", os.path.join(tempfile.gettempdir(), "watchly-monitor.lock"))
+MONITOR_LOCK_URL = os.getenv("MONITOR_LOCK_URL")  # Direct (non-pooled) Postgres URL for the advisory lock
+# Sharding: every monitor process probes its own consistent-hash slice of the websites (no leader election)
+MONITOR_SHARDING = os.getenv("MONITOR_SHARDING", "False").lower() in ("true", "1")
+MONITOR_HEARTBEAT_SECONDS = float(os.getenv("MONITOR_HEARTBEAT_SECONDS", "10"))
+MONITOR_WORKER_TTL_SECONDS = float(os.getenv("MONITOR_WORKER_TTL_SECONDS", "30"))
+
+# Probe HTTP client
+PROBE_TIMEOUT = float(os.getenv("PROBE_TIMEOUT", "5"))
+PROBE_MAX_CONNECTIONS = int(os.getenv("PROBE_MAX_CONNECTIONS", "100"))
+PROBE_MAX_KEEPALIVE = int(os.getenv("PROBE_MAX_KEEPALIVE", "50"))
+PROBE_KEEPALIVE_EXPIRY = float(os.getenv("PROBE_KEEPALIVE_EXPIRY", "60"))
+PROBE_MAX_PER_HOST = int(os.getenv("PROBE_MAX_PER_HOST", "4"))
+PROBE_HTTP2 = os.getenv("PROBE_HTTP2", "False").lower() in ("true", "1")
+# Adaptive probe concurrency (AIMD): grows while latency/timeouts stay healthy, backs off when they degrade
+PROBE_CONCURRENCY_MIN = int(os.getenv("PROBE_CONCURRENCY_MIN", "5"))
+PROBE_CONCURRENCY_MAX = int(os.getenv("PROBE_CONCURRENCY_MAX", str(PROBE_MAX_CONNECTIONS)))   # Set MIN = MAX for a fixed limit
+PROBE_CONCURRENCY_INITIAL = int(os.getenv("PROBE_CONCURRENCY_INITIAL", "10"))
+PROBE_CONCURRENCY_LATENCY_TOLERANCE = float(os.getenv("PROBE_CONCURRENCY_LATENCY_TOLERANCE", "2"))   # x healthy median latency
+PROBE_CONCURRENCY_TIMEOUT_RATE = float(os.getenv("PROBE_CONCURRENCY_TIMEOUT_RATE", "0.1"))   # Share of probes timing out
+PROBE_CONCURRENCY_BACKOFF = float(os.getenv("PROBE_CONCURRENCY_BACKOFF", "0.7"))   # Multiplier on a decrease
+
+# Alert notifications
+NOTIFY_TRANSPORT = os.getenv("NOTIFY_TRANSPORT", "cloudflare").lower()   # "cloudflare" or "sendgrid"
+NOTIFY_QUEUE_SIZE = int(os.getenv("NOTIFY_QUEUE_SIZE", "1000"))
+NOTIFY_CONCURRENCY = int(os.getenv("NOTIFY_CONCURRENCY", "4"))
+NOTIFY_MAX_ATTEMPTS = int(os.getenv("NOTIFY_MAX_ATTEMPTS", "5"))
+NOTIFY_BACKOFF_SECONDS = float(os.getenv("NOTIFY_BACKOFF_SECONDS", "2"))
+NOTIFY_TIMEOUT = float(os.getenv("NOTIFY_TIMEOUT", "10"))
+NOTIFY_DEAD_LETTER_SIZE = int(os.getenv("NOTIFY_DEAD_LETTER_SIZE", "500"))   # Kept in memory; the monitor also stores them
+NOTIFY_DEAD_LETTER_RETENTION_DAYS = int(os.getenv("NOTIFY_DEAD_LETTER_RETENTION_DAYS", "30"))   # 0 = keep forever
+
+# Metric history
+ROLLUP_MAX_POINTS = int(os.getenv("ROLLUP_MAX_POINTS", "1000"))   # Max buckets a rollup read returns
+#Opt-in: deleting raw history is irreversible, so it is kept forever unless a deployment sets this
+METRIC_RAW_RETENTION_DAYS = int(os.getenv("METRIC_RAW_RETENTION_DAYS", "0"))  # 0 keeps raw metrics forever
+ROLLUP_RETENTION_DAYS = {
+    60: int(os.getenv("ROLLUP_1M_RETENTION_DAYS", "14")),
+    3600: int(os.getenv("ROLLUP_1H_RETENTION_DAYS", "400")),
+    86400: int(os.getenv("ROLLUP_1D_RETENTION_DAYS", "0")),
+}
+MONITOR_PRUNE_SECONDS = float(os.getenv("MONITOR_PRUNE_SECONDS", "3600"))
+PRUNE_BATCH_SIZE = int(os.getenv("PRUNE_BATCH_SIZE", "5000"))   # Rows deleted per transaction when pruning
+METRIC_STORAGE = os.getenv("METRIC_STORAGE", "rows").lower()   # "rows", or "chunks" to compact old history
+METRIC_COMPACT_AFTER_HOURS = int(os.getenv("METRIC_COMPACT_AFTER_HOURS", "24"))
+METRIC_CHUNK_MAX_POINTS = int(os.getenv("METRIC_CHUNK_MAX_POINTS", "8640"))  # One day at 10 s probes
+
+# API pagination
+API_DEFAULT_PAGE_SIZE = int(os.getenv("API_DEFAULT_PAGE_SIZE", "100"))
+API_MAX_PAGE_SIZE = int(os.getenv("API_MAX_PAGE_SIZE", "500"))
+
+# Auth cache (verified tokens and users, per process)
+AUTH_CACHE_SIZE = int(os.getenv("AUTH_CACHE_SIZE", "10000"))
+AUTH_CACHE_TTL_SECONDS = float(os.getenv("AUTH_CACHE_TTL_SECONDS", "60"))   # 0 disables the cache
+
+# Database connection pool
+DB_POOL_CLASS = os.getenv("DB_POOL_CLASS", "queue").lower()   # "queue", or "null" behind pgbouncer
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "10"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "240"))   # Seconds; below Neon's idle timeout
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "True").lower() in ("true", "1")
+DB_POOL_WARMUP = int(os.getenv("DB_POOL_WARMUP", "0"))       # Connections to open at startup
+DB_CONNECT_RETRIES = int(os.getenv("DB_CONNECT_RETRIES", "3"))
+DB_CONNECT_BACKOFF_SECONDS = float(os.getenv("DB_CONNECT_BACKOFF_SECONDS", "1"))
+DB_CONNECT_TIMEOUT = int(os.getenv("DB_CONNECT_TIMEOUT", "10"))
+
+# Conditional GET / response cache
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "0"))   # Cached GET responses per process; 0 disables
+
+# Live event stream (SSE)
+EVENT_BROKER = os.getenv("EVENT_BROKER", "auto").lower()   # "memory", "postgres" (LISTEN/NOTIFY) or "auto"
+EVENT_CHANNEL = os.getenv("EVENT_CHANNEL", "watchly_events")
+#LISTEN needs a session-pooled or direct connection; a pgbouncer transaction pool drops it
+EVENT_LISTEN_URL = os.getenv("EVENT_LISTEN_URL") or os.getenv("MONITOR_LOCK_URL")
+SSE_QUEUE_SIZE = int(os.getenv("SSE_QUEUE_SIZE", "200"))            # Buffered events per connection
+SSE_HEARTBEAT_SECONDS = float(os.getenv("SSE_HEARTBEAT_SECONDS", "15"))
+SSE_MAX_SECONDS = float(os.getenv("SSE_MAX_SECONDS", "3600"))       # Clients reconnect after this
+#Each open stream holds a gthread thread, but it sleeps in a Condition.wait (and gives its DB
+#connection back), so idle threads are cheap: the Procfile runs 32 threads per worker and this
+#leaves 8 of them for API requests, i.e. 4 workers x 24 = 96 open dashboard tabs per dyno.
+#Keep it below --threads (or serve /events/stream from a separate gevent process and raise it there).
+SSE_MAX_STREAMS = int(os.getenv("SSE_MAX_STREAMS", "24"))           # Open streams per worker process; extra clients get a 503
+SSE_RETRY_AFTER_SECONDS = int(os.getenv("SSE_RETRY_AFTER_SECONDS", "30"))
+
+# Bulk website import
+BULK_IMPORT_MAX_ROWS = int(os.getenv("BULK_IMPORT_MAX_ROWS", "10000"))
+BULK_IMPORT_BATCH_SIZE = int(os.getenv("BULK_IMPORT_BATCH_SIZE", "500"))   # Rows per INSERT statement
+
+# On-demand status checks (/status/<url>)
+STATUS_CACHE_SECONDS = float(os.getenv("STATUS_CACHE_SECONDS", "5"))
+#How long a request thread may block on a probe; by default a check that isn't cached answers 202 at once
+#and the client's retry (Retry-After: 1, within STATUS_CACHE_SECONDS) picks up the result
+STATUS_WAIT_SECONDS = float(os.getenv("STATUS_WAIT_SECONDS", "0"))
+STATUS_MAX_IN_FLIGHT = int(os.getenv("STATUS_MAX_IN_FLIGHT", "100"))
+
+# Telemetry (Prometheus text format on /health/telemetry)
+TELEMETRY_ENABLED = os.getenv("TELEMETRY_ENABLED", "True").lower() in ("true", "1")
+TELEMETRY_TOKEN = os.getenv("TELEMETRY_TOKEN")   # Scrapes need "Authorization: Bearer <token>"; /health/telemetry is off (404) without it
+# Each process keeps its own numbers: the monitor's live in the leader, so give it its own port to scrape
+TELEMETRY_PORT = int(os.getenv("TELEMETRY_PORT", "0"))
+TELEMETRY_HOST = os.getenv("TELEMETRY_HOST", "127.0.0.1")   # Set to 0.0.0.0 to let scrapers on other hosts in
+
+# Logging (records go through a queue; a background thread does the formatting and I/O)
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text").lower()      # "text" or "json" (one object per line)
+LOG_FILE = os.getenv("LOG_FILE", os.path.join("logs", "app.log"))   # Empty: console only
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))  # Records beyond this are dropped, never waited on
+# Each message template (e.g. "Checking website: %s") may log this often per window; 0 disables
+LOG_RATE_LIMIT = int(os.getenv("LOG_RATE_LIMIT", "20"))
+LOG_RATE_WINDOW_SECONDS = float(os.getenv("LOG_RATE_WINDOW_SECONDS", "60"))
+
+# Per-request SQL accounting and profiling
+QUERY_BUDGET = int(os.getenv("QUERY_BUDGET", "10"))          # SQL statements per request before it is flagged; 0 disables
+#X-Query-Count / Server-Timing reveal query behaviour to any client: enable in dev/staging only
+QUERY_TIMING_HEADERS = os.getenv("QUERY_TIMING_HEADERS", "False").lower() in ("true", "1")
+# Requests sending "X-Profile: <PROFILE_TOKEN>" get a cProfile dump in PROFILE_DIR; unset disables profiling
+PROFILE_TOKEN = os.getenv("PROFILE_TOKEN")
+PROFILE_DIR = os.getenv("PROFILE_DIR", os.path.join(tempfile.gettempdir(), "watchly-profiles"))
+
+# Probe timing breakdown (DNS / connect / TLS / TTFB / body) and DNS cache
+PROBE_TIMINGS = os.getenv("PROBE_TIMINGS", "True").lower() in ("true", "1")
+PROBE_TIMING_RETENTION_DAYS = int(os.getenv("PROBE_TIMING_RETENTION_DAYS", "14"))   # 0 = keep forever
+DNS_CACHE_SECONDS = float(os.getenv("DNS_CACHE_SECONDS", "300"))   # How long a resolved host is reused; 0 disables the cache
+DNS_CACHE_SIZE = int(os.getenv("DNS_CACHE_SIZE", "10000"))
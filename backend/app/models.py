@@ -1,27 +1,8 @@
 #Datab# Database Models Schema
-from flask_sqlalchemy import SQLAlchemy
-from sqlalchemy.orm import sessionmaker, scoped_session
-from sqlalchemy.exc import OperationalError
-import time
 from werkzeug.security import generate_password_hash, check_password_hash
 from datetime import datetime
 from app import db
 
-# Database Session Handler (Ensures Neon Wakes Up)
-def get_db():
-    """Handles database session with auto-retry for Neon PostgreSQL wake-up."""
-    from app import SessionLocal
-    for _ in range(3):  # Retry up to 3 times
-        try:
-            session = SessionLocal()  # ✅ Use `session`, not `db`
-            yield session
-            break  # Exit loop if successful
-        except OperationalError:
-            print("🚀 Database is waking up... retrying in 5 seconds...")
-            time.sleep(5)  # Wait for Neon to wake up
-        finally:
-            session.close()  # ✅ Close session properly after use
-
 #User Model
 class User(db.Model):
     __tablename__ = 'user'
@@ -30,6 +11,7 @@ class User(db.Model):
     name = db.Column(db.String(100), nullable = False)
     email = db.Column(db.String(200), nullable=False, unique=True)
     password_hash = db.Column(db.String(200), nullable=False) #store hash password
+    data_version = db.Column(db.Integer, nullable=False, default=0, server_default="0")  # Bumped whenever dashboard data changes (ETags)
     websites = db.relationship('Website', backref='user', cascade="all, delete", passive_deletes=True, lazy=True)
     #set hashed password
     def set_password(self, password):
@@ -41,9 +23,13 @@ class User(db.Model):
 #Website Model
 class Website(db.Model):
     __tablename__ = 'website'
+    __table_args__ = (
+        # Serves per-user listings and (user_id, url) lookups
+        db.Index('ix_website_user_id_url', 'user_id', 'url'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.Integer, db.ForeignKey('user.id', ondelete="CASCADE"), nullable=False, index=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id', ondelete="CASCADE"), nullable=False)
     url = db.Column(db.String(200), nullable=False)
     name = db.Column(db.String(100), nullable=False)
     frequency = db.Column(db.Integer, default=5)
@@ -52,16 +38,106 @@ class Website(db.Model):
 
 #Metric Model
 class Metric(db.Model):
+    __table_args__ = (
+        # Serves "history of one site, newest first" scans (and plain website_id lookups)
+        db.Index('ix_metric_website_id_timestamp', 'website_id', 'timestamp', 'id'),
+    )
+
     id =db.Column(db.Integer, primary_key=True)
-    website_id = db.Column(db.Integer, db.ForeignKey('website.id', ondelete="CASCADE"), nullable=False, index=True)
+    website_id = db.Column(db.Integer, db.ForeignKey('website.id', ondelete="CASCADE"), nullable=False)
     response_time = db.Column(db.Float, nullable=False)
     uptime = db.Column(db.Float, nullable=False)
     timestamp = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
 
+#Metric Chunk Model (compacted, compressed run of one site's metrics; see app/utils/chunk_codec.py)
+class MetricChunk(db.Model):
+    __tablename__ = 'metric_chunk'
+    __table_args__ = (
+        db.Index('ix_metric_chunk_website_id_end_ts', 'website_id', 'end_ts'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    website_id = db.Column(db.Integer, db.ForeignKey('website.id', ondelete="CASCADE"), nullable=False)
+    start_ts = db.Column(db.DateTime, nullable=False)
+    end_ts = db.Column(db.DateTime, nullable=False)
+    count = db.Column(db.Integer, nullable=False)
+    data = db.Column(db.LargeBinary, nullable=False)
+
+#Metric Timing Model (per-phase breakdown of a probe, in ms; 4-byte floats keep rows small)
+class MetricTiming(db.Model):
+    __tablename__ = 'metric_timing'
+    __table_args__ = (
+        db.Index('ix_metric_timing_website_id_timestamp', 'website_id', 'timestamp'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    website_id = db.Column(db.Integer, db.ForeignKey('website.id', ondelete="CASCADE"), nullable=False)
+    timestamp = db.Column(db.DateTime, nullable=False)
+    dns_ms = db.Column(db.Float(24))        # Null when the DNS cache answered or the host is an IP
+    connect_ms = db.Column(db.Float(24))    # Null on a reused keep-alive connection
+    tls_ms = db.Column(db.Float(24))
+    ttfb_ms = db.Column(db.Float(24))       # Request sent -> response headers received
+    body_ms = db.Column(db.Float(24))
+
+#Latest Status Model (newest metric per website, maintained on every metric write)
+class LatestStatus(db.Model):
+    __tablename__ = 'latest_status'
+
+    website_id = db.Column(db.Integer, db.ForeignKey('website.id', ondelete="CASCADE"), primary_key=True)
+    response_time = db.Column(db.Float, nullable=False)
+    uptime = db.Column(db.Float, nullable=False)
+    timestamp = db.Column(db.DateTime, nullable=False)
+
 #Alert Model
 class Alert(db.Model):
+    __table_args__ = (
+        # Serve keyset-paginated history per site and per user, newest first
+        db.Index('ix_alert_website_id_timestamp', 'website_id', 'timestamp', 'id'),
+        db.Index('ix_alert_user_id_timestamp', 'user_id', 'timestamp', 'id'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
-    website_id = db.Column(db.Integer, db.ForeignKey('website.id', ondelete="CASCADE"), nullable=False, index=True)
+    website_id = db.Column(db.Integer, db.ForeignKey('website.id', ondelete="CASCADE"), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id', ondelete="CASCADE"), nullable=False)  # Copy of website.user_id
     alert_type = db.Column(db.String(50), nullable=False)
     status = db.Column(db.String(50), default="unresolved")
     timestamp = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+#Email Dead Letter Model (alert emails that could not be delivered, kept for inspection or a resend)
+class EmailDeadLetter(db.Model):
+    __tablename__ = 'email_dead_letter'
+
+    id = db.Column(db.Integer, primary_key=True)
+    to_email = db.Column(db.String(200), nullable=False, index=True)
+    subject = db.Column(db.String(255), nullable=False)
+    content = db.Column(db.Text, nullable=False)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    last_error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, nullable=False)       # When the email was first queued
+    failed_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, index=True)
+
+#Probe Worker Model (shard membership and throughput)
+class MonitorWorker(db.Model):
+    __tablename__ = 'monitor_worker'
+
+    id = db.Column(db.String(100), primary_key=True)   # hostname-pid
+    started_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    heartbeat_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, index=True)
+    sites_owned = db.Column(db.Integer, nullable=False, default=0)
+    probes_total = db.Column(db.BigInteger, nullable=False, default=0)
+    probes_per_second = db.Column(db.Float, nullable=False, default=0.0)
+
+#Metric Rollup Model (per-site aggregates at 1m / 1h / 1d resolution)
+class MetricRollup(db.Model):
+    __tablename__ = 'metric_rollup'
+
+    website_id = db.Column(db.Integer, db.ForeignKey('website.id', ondelete="CASCADE"), primary_key=True)
+    resolution = db.Column(db.Integer, primary_key=True)      # Bucket size in seconds
+    bucket_start = db.Column(db.Integer, primary_key=True)    # Epoch seconds (UTC)
+    count = db.Column(db.Integer, nullable=False, default=0)
+    up_count = db.Column(db.Integer, nullable=False, default=0)
+    latency_count = db.Column(db.Integer, nullable=False, default=0)  # Probes with a response time
+    latency_sum = db.Column(db.Float, nullable=False, default=0.0)
+    latency_min = db.Column(db.Float)
+    latency_max = db.Column(db.Float)
+    histogram = db.Column(db.Text, nullable=False, default="")  # Sparse latency histogram for percentiles
@@ -1,54 +1,135 @@
 import asyncio
 import httpx
 import atexit
-from apscheduler.schedulers.background import BackgroundScheduler
+import math
+from concurrent.futures import ThreadPoolExecutor
+from flask import current_app
 from app import create_app, db
-from app.models import Website, Metric, Alert, User
-from datetime import datetime
+from app.models import Website, Metric, Alert, User, MonitorWorker, EmailDeadLetter
+from datetime import datetime, timedelta
+import socket
 from sqlalchemy.orm import sessionmaker
 from app.utils.logger import logger
+from app.utils.scheduler import ProbeScheduler
+from app.utils.http_client import ProbeClient, ProbeTimer
+from app.utils.async_runner import BackgroundLoop
+from app.utils.leader import LeaderElector, create_leader_lock
+from app.utils.hashring import HashRing
+from app.utils.site_state import SiteStateTable
+from app.utils.notifier import NotificationDispatcher
+from app.utils.limiter import AdaptiveLimiter
+from app.utils.metric_store import record_metrics, compact_metrics
+from app.utils.rollups import prune_history, compact_histograms
+from app.utils.versioning import bump_site_versions
+from app.utils.pubsub import get_broker, publish, user_topic
+from app.utils import telemetry
+from sqlalchemy.exc import IntegrityError
+from collections import namedtuple
+from app.config import (
+    MONITOR_TICK_SECONDS,
+    MONITOR_RESYNC_SECONDS,
+    MONITOR_LEADER_RETRY_SECONDS,
+    MONITOR_LOCK_FILE,
+    MONITOR_LOCK_URL,
+    MONITOR_SHARDING,
+    MONITOR_HEARTBEAT_SECONDS,
+    MONITOR_WORKER_TTL_SECONDS,
+    MONITOR_PRUNE_SECONDS,
+    METRIC_STORAGE,
+    NOTIFY_DEAD_LETTER_RETENTION_DAYS,
+    TELEMETRY_PORT,
+    PROBE_TIMINGS,
+)
 from sqlalchemy.sql import text  # Ensure text is imported
 import time
 import sys
 import os
+import signal
+import threading
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
-scheduler = BackgroundScheduler()
+monitor_service = None  # Only set in the elected leader process
+leader_elector = None
+probe_scheduler = ProbeScheduler()  # Tracks when each website is next due
+probe_client = ProbeClient()  # One connection pool for every probe
+site_states = SiteStateTable()  # Up/down state per website, rebuilt from unresolved alerts
+notifier = NotificationDispatcher()  # Alert emails are queued, never awaited inline
+probe_limiter = AdaptiveLimiter()  # In-flight probe cap, adapted to latency and timeouts
+db_writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="watchly-monitor-db")  # Every monitor query runs here
+SiteTarget = namedtuple("SiteTarget", ["id", "url", "user_id"])
+site_targets = {}  # website_id -> SiteTarget for every scheduled website
+MONITOR_TOPIC = "monitor:schedule"  # Pub/sub topic the monitor listens on for schedule requests
+_last_resync = 0.0
+telemetry.SITES_SCHEDULED.callback = lambda: len(probe_scheduler)
+telemetry.EMAIL_QUEUE_DEPTH.callback = lambda: notifier.depth
+telemetry.CONCURRENCY_LIMIT.callback = lambda: probe_limiter.limit
+
+# Function to run blocking database work off the probe loop
+async def run_db(func, *args, app=None):
+    """Run func(*args) in its own app context on the monitor's database thread.
+
+    Probes keep running while a query or commit is in flight, and one thread
+    means the monitor's own writes never race each other.
+    """
+    app = app or current_app._get_current_object()
+    return await asyncio.get_running_loop().run_in_executor(db_writer, in_app_context, app, func, *args)
+
+def in_app_context(app, func, *args):
+    with app.app_context():
+        return func(*args)
 
 # Function to check Website status
 async def check_websites(website):
-    logger.info(f"🔎 Checking website: {website.url}")
+    logger.debug("🔎 Checking website: %s", website.url)
 
-    async with httpx.AsyncClient() as client:
-        try:
-            start_time = datetime.utcnow()
+    timer = ProbeTimer() if PROBE_TIMINGS else None
+    start_time = time.perf_counter()
+    timed_out = False
+    try:
 
-            response = await client.get(website.url, timeout=5, follow_redirects=True)
-            response_time = (datetime.utcnow() - start_time).total_seconds() * 1000  # Convert to ms
+        response, elapsed = await probe_client.probe(website.url, timer=timer)
+        probe_seconds = elapsed
+        response_time = elapsed * 1000  # Convert to ms; excludes waiting for a per-host slot
 
-            # Allows 2xx-3xx as Up for redirects
-            if 200 <= response.status_code < 400:
-                uptime = 1
-            else:
-                uptime = 0
-            if uptime == 0:
-                logger.warning(f"⚠️ {website.url} responded with {response.status_code}, marking as DOWN.")
-
-        except httpx.RequestError as e:
-            # Connection failed - Website is down
-            response_time = 0  # ✅ Ensure response_time is not None
+        # Allows 2xx-3xx as Up for redirects
+        if 200 <= response.status_code < 400:
+            uptime = 1
+        else:
             uptime = 0
-            logger.error(f"❌ {website.url} is DOWN - Connection Failed: {str(e)}")
+        if uptime == 0:
+            logger.warning("⚠️ %s responded with %s, marking as DOWN.", website.url, response.status_code)
+
+    except httpx.RequestError as e:
+        # Connection failed - Website is down
+        response_time = 0  # ✅ Ensure response_time is not None
+        uptime = 0
+        probe_seconds = getattr(e, "probe_seconds", None)    # None: never got a host slot
+        # A PoolTimeout is our own queueing (host slot or connection pool), not a slow upstream
+        timed_out = isinstance(e, httpx.TimeoutException) and not isinstance(e, httpx.PoolTimeout)
+        logger.error("❌ %s is DOWN - Connection Failed: %s", website.url, e)
+
+    outcome = "up" if uptime else "down"
+    telemetry.PROBE_SECONDS.observe(time.perf_counter() - start_time, result=outcome)
+    telemetry.PROBES.inc(result=outcome)
+    timings = timer.as_dict() if timer is not None else None
+    if timings:
+        for phase, value in timings.items():
+            if value is not None:
+                telemetry.PROBE_PHASE_SECONDS.observe(value / 1000, phase=phase[:-3])
 
     # ✅ Ensure timestamp is declared
     timestamp = datetime.utcnow()
 
     result = {
         "website_id": website.id,  # ✅ Use website.id instead of website
+        "user_id": website.user_id,
         "response_time": response_time,
         "uptime": uptime,
         "timestamp": timestamp,
+        "timings": timings,
+        "timed_out": timed_out,  # Feeds the adaptive concurrency limit
+        "probe_seconds": probe_seconds,
     }
 
     # ✅ Save to DB
@@ -61,87 +142,177 @@ async def check_websites(website):
 
     return result  # ✅ Always return result
 
+# Function to reload websites into the probe scheduler and health state
+async def refresh_schedule(app, force=False, shard=None):
+    """Picks up new, changed and deleted websites at most every MONITOR_RESYNC_SECONDS.
+
+    With a shard, only the websites this worker owns on the hash ring are scheduled.
+    The in-memory health state is reconciled with unresolved alerts at the same time.
+    """
+    global _last_resync, site_targets
+    now = time.time()
+    if not force and now - _last_resync < MONITOR_RESYNC_SECONDS:
+        return
+    # Alerts can open or resolve while the snapshot is loading; those sites keep their newer state
+    since = site_states.version
+    sites, open_alerts = await run_db(load_schedule, app=app)
+    now = time.time()
+    if shard is not None:
+        sites = [site for site in sites if shard.owns(site.id)]
+    probe_scheduler.sync([(site.id, site.frequency) for site in sites], now=now)
+    site_targets = {site.id: SiteTarget(site.id, site.url, site.user_id) for site in sites}
+    site_states.retain(site_targets)
+    site_states.reconcile({website_id: alert_id for website_id, alert_id in open_alerts.items() if website_id in site_targets},
+                          since=since)
+    _last_resync = now
+    logger.info("🗓️ Probe schedule refreshed: %d websites, %d down", len(probe_scheduler), len(open_alerts))
+
+def load_schedule():
+    """Every website's schedule fields plus the open 'Website Down' alerts."""
+    sites = db.session.execute(db.select(Website.id, Website.frequency, Website.url, Website.user_id)).all()
+    return sites, load_open_alerts()
+
+def load_open_alerts():
+    """{website_id: alert_id} for every unresolved 'Website Down' alert."""
+    return {
+        website_id: alert_id
+        for alert_id, website_id in db.session.execute(
+            db.select(Alert.id, Alert.website_id).where(
+                Alert.alert_type == "Website Down",
+                Alert.status == "unresolved",
+            ).order_by(Alert.id)
+        ).all()
+    }
+
 # Function to check all websites
 async def check_all_websites(app):
     with app.app_context():
-        websites = db.session.execute(db.select(Website)).scalars().all()
-        semaphore = asyncio.Semaphore(10)
-
-        async def limited_check(website):
-            async with semaphore:
-                return await check_websites(website)
-
-        tasks = [limited_check(website) for website in websites]
-        results = await asyncio.gather(*tasks)
-
-        db.session.bulk_insert_mappings(Metric, [
-            {
-                "website_id": result["website_id"],  # ✅ Fixed reference to website_id
-                "response_time": result["response_time"],
-                "uptime": result["uptime"],
-                "timestamp": result["timestamp"]
-            }
-            for result in results
-        ])
-        db.session.commit()
-        print("✅ Metrics saved successfully!")
-
-        # Run alerts concurrently
-        alert_tasks = [
-            check_for_alert(result["website_id"], "Website Down", app)
-            if result["uptime"] == 0
-            else check_for_alert(result["website_id"], "Website Up", app)
-            for result in results
-        ]
-        await asyncio.gather(*alert_tasks)
-
-# Function to check alert conditions
-async def check_for_alert(website_id, alert_type, app):
-    from app.utils.email_utils import send_email_via_cloudflare as send_email_async
-    with app.app_context():
-        website = db.session.get(Website, website_id)
-        if not website:
-            logger.error(f"Alert triggered for non-existent website ID {website_id}")
-            return
+        websites = await run_db(load_targets, None)
+        await probe_websites(app, websites)
 
-        user = db.session.get(User, website.user_id)
-        if not user:
-            logger.error(f"User not found for alert on website {website.url}")
-            return
-
-        # Fetch latest uptime & response time
-        latest_metric = db.session.query(Metric).filter_by(website_id=website_id).order_by(Metric.timestamp.desc()).first()
-        uptime_percent = f"{(latest_metric.uptime * 100):.1f}%" if latest_metric else "N/A"
-        response_time = f"{latest_metric.response_time:.2f} ms" if latest_metric and latest_metric.response_time > 0 else "N/A"
-
-        existing_alert = Alert.query.filter_by(
-            website_id=website_id,
-            alert_type="Website Down",
-            status="unresolved"
-        ).first()
-
-        if alert_type == "Website Down":
-            if existing_alert:
-                logger.info(f"Skipping duplicate 'Website Down' alert for {website.url} (Already unresolved)")
-                return  # ✅ Prevent duplicate emails
-
-            # Create new alert if no unresolved alert exists
-            new_alert = Alert(
-                website_id=website_id,
-                alert_type=alert_type,
-                status="unresolved",
-                timestamp=datetime.utcnow(),
-            )
-            db.session.add(new_alert)
-            db.session.commit()
-            logger.info(f"New alert created for {website.url} - Type: {alert_type}")
-
-            # ✅ Send Email Alert with Uptime & Response Time
-            subject = f"⚠️ Alert: {website.url} is DOWN!"
-            content = f"""
+# Function to check only the websites that are due
+async def check_due_websites(app, website_ids):
+    with app.app_context():
+        targets = [site_targets[website_id] for website_id in website_ids if website_id in site_targets]
+        missing = [website_id for website_id in website_ids if website_id not in site_targets]
+        if missing:
+            # Submitted before the next resync picked them up
+            for target in await run_db(load_targets, missing):
+                site_targets[target.id] = target
+                targets.append(target)
+        await probe_websites(app, targets)
+
+def load_targets(website_ids):
+    """SiteTargets for the given websites (all of them for None)."""
+    #By id: the (user_id, url) index would otherwise hand them back grouped by host
+    query = db.select(Website.id, Website.url, Website.user_id).order_by(Website.id)
+    if website_ids is not None:
+        query = query.where(Website.id.in_(website_ids))
+    return [SiteTarget(*row) for row in db.session.execute(query).all()]
+
+# Function to probe a batch of websites, save metrics and run alerts
+async def probe_websites(app, websites):
+    """Probes the given websites, saves metrics and runs alerts (inside an app context)."""
+    if not websites:
+        return
+    async def limited_check(website):
+        queued = time.perf_counter()
+        await probe_limiter.acquire()
+        telemetry.QUEUE_WAIT.observe(time.perf_counter() - queued)
+        result = None
+        try:
+            result = await check_websites(website)
+            return result
+        finally:
+            #The probe's own time, so waiting for a host slot doesn't read as upstream latency
+            if result is None:
+                probe_limiter.release(None)
+            else:
+                probe_limiter.release(result["probe_seconds"], timed_out=result["timed_out"])
+
+    cycle_start = time.perf_counter()
+    tasks = [limited_check(website) for website in websites]
+    results = await asyncio.gather(*tasks)
+    phase_start = time.perf_counter()
+    telemetry.PHASE_SECONDS.observe(phase_start - cycle_start, phase="probe")
+
+    saved = await run_db(save_metrics, results, app=app)
+    forget_websites({result["website_id"] for result in results} - {result["website_id"] for result in saved})
+    logger.debug("✅ Metrics saved for %d websites", len(saved))
+    await run_db(publish_results, saved, app=app)
+    results = saved
+    telemetry.PHASE_SECONDS.observe(time.perf_counter() - phase_start, phase="db_write")
+
+    # Evaluate alerts for the whole batch at once
+    phase_start = time.perf_counter()
+    await evaluate_alerts(results)
+    telemetry.PHASE_SECONDS.observe(time.perf_counter() - phase_start, phase="alerts")
+    telemetry.PHASE_SECONDS.observe(time.perf_counter() - cycle_start, phase="total")
+
+def save_metrics(results):
+    """Bulk-inserts metrics (and rollups); returns the results that were saved.
+
+    Results for websites deleted since the last resync are left out.
+    """
+    rows = [
+        {
+            "website_id": result["website_id"],  # ✅ Fixed reference to website_id
+            "response_time": result["response_time"],
+            "uptime": result["uptime"],
+            "timestamp": result["timestamp"],
+            "timings": result.get("timings"),
+        }
+        for result in results
+    ]
+    try:
+        record_metrics(rows)
+        return results
+    except IntegrityError:
+        db.session.rollback()
+        # Only a website deleted since the last resync (a foreign key miss) is expected here
+        website_ids = [result["website_id"] for result in results]
+        existing = set(db.session.execute(db.select(Website.id).where(Website.id.in_(website_ids))).scalars())
+        if existing >= set(website_ids):
+            raise
+    logger.info("🗑️ Dropped results for %d deleted websites", len(set(website_ids) - existing))
+
+    results = [result for result in results if result["website_id"] in existing]
+    record_metrics([row for row in rows if row["website_id"] in existing])
+    return results
+
+def forget_websites(website_ids):
+    """Stop probing websites that turned out to be deleted."""
+    for website_id in website_ids:
+        site_targets.pop(website_id, None)
+        probe_scheduler.remove(website_id)
+    site_states.discard(website_ids)
+
+def publish_results(results):
+    """Push each saved probe result to its owner's live streams."""
+    publish(
+        (user_topic(result["user_id"]), {
+            "type": "status",
+            "website_id": result["website_id"],
+            "uptime": result["uptime"],
+            "response_time": result["response_time"],
+            "timestamp": result["timestamp"].isoformat(),
+        })
+        for result in results if result.get("user_id") is not None
+    )
+
+# Email templates for alert transitions
+def _status_lines(result):
+    uptime_percent = f"{(result['uptime'] * 100):.1f}%"
+    response_time = f"{result['response_time']:.2f} ms" if result["response_time"] > 0 else "N/A"
+    return uptime_percent, response_time
+
+def down_email(url, result):
+    uptime_percent, response_time = _status_lines(result)
+    subject = f"⚠️ Alert: {url} is DOWN!"
+    content = f"""
             🚨 **Website Down Alert** 🚨
 
-            Your monitored website **{website.url}** is currently down.
+            Your monitored website **{url}** is currently down.
 
             **Latest Status:**
             - Uptime: {uptime_percent}
@@ -152,21 +323,15 @@ async def check_for_alert(website_id, alert_type, app):
             Regards,
             **Watchly Monitoring**
             """
-            print(f"🚨 Sending email to {user.email}: {subject}")
-            await send_email_async(user.email, subject, content)
-
-        elif alert_type == "Website Up":
-            if existing_alert:
-                existing_alert.status = "resolved"  # ✅ Mark as resolved
-                db.session.commit()
-                logger.info(f"✅ Resolved: {website.url} is back online.")
-
-                # ✅ Send recovery notification
-                subject = f"✅ Resolved: {website.url} is back UP!"
-                content = f"""
+    return subject, content
+
+def up_email(url, result):
+    uptime_percent, response_time = _status_lines(result)
+    subject = f"✅ Resolved: {url} is back UP!"
+    content = f"""
                 ✅ **Website Back Online** ✅
 
-                Good news! **{website.url}** is back up.
+                Good news! **{url}** is back up.
 
                 **Latest Status:**
                 - Uptime: {uptime_percent}
@@ -175,23 +340,474 @@ async def check_for_alert(website_id, alert_type, app):
                 Regards,
                 **Watchly Monitoring**
                 """
-                print(f"🚨 Sending email to {user.email}: {subject}")
-                await send_email_async(user.email, subject, content)
+    return subject, content
+
+# Function to evaluate alert conditions for a whole probe cycle
+async def evaluate_alerts(results):
+    """Opens/resolves 'Website Down' alerts for a batch of results.
+
+    Transitions come from the in-memory health state, so the database is only
+    touched when some site actually changed state.
+    """
+    if not results:
+        return
+    if not site_states.loaded:
+        since = site_states.version
+        site_states.reconcile(await run_db(load_open_alerts), since=since)
+
+    went_down, came_up = [], []
+    for result in results:
+        transition = site_states.record(result["website_id"], result["uptime"], result["response_time"])
+        if transition == "down":
+            went_down.append(result)
+        elif transition == "up":
+            came_up.append(result)
+    if not went_down and not came_up:
+        return
+
+    now = datetime.utcnow()
+    owners, alert_ids = await run_db(
+        write_alerts,
+        [result["website_id"] for result in went_down],
+        [result["website_id"] for result in came_up],
+        now,
+    )
+    for website_id, alert_id in alert_ids.items():
+        state = site_states.get(website_id)
+        if state is not None:
+            state.last_alert_id = alert_id
+    for result in came_up:
+        state = site_states.get(result["website_id"])
+        if state is not None:
+            state.last_alert_id = None
+    telemetry.ALERTS.inc(len(alert_ids), transition="down")
+    telemetry.ALERTS.inc(len(came_up), transition="up")
+    logger.info("🚨 Alerts: %d opened, %d resolved", len(alert_ids), len(came_up))
+
+    events = [
+        (user_topic(result["user_id"]), {
+            "type": "alert",
+            "website_id": result["website_id"],
+            "status": transition,
+            "alert_id": alert_ids.get(result["website_id"]),
+            "timestamp": now.isoformat(),
+        })
+        for transition, batch in (("down", went_down), ("up", came_up))
+        for result in batch if result.get("user_id") is not None
+    ]
+    if events:
+        await run_db(publish, events)
+
+    emails = []
+    for result in went_down:
+        if result["website_id"] in owners:
+            url, email = owners[result["website_id"]]
+            emails.append((email, *down_email(url, result)))
+    for result in came_up:
+        if result["website_id"] in owners:
+            url, email = owners[result["website_id"]]
+            emails.append((email, *up_email(url, result)))
+    for email, subject, content in emails:
+        logger.info("🚨 Queueing email to %s: %s", email, subject)
+        notifier.enqueue(email, subject, content)
+
+def write_alerts(down_ids, up_ids, now):
+    """Insert alerts for sites that went down and resolve those that came up, in one commit.
+
+    Returns ({website_id: (url, owner email)}, {website_id: new alert id}).
+    """
+    # Owner emails for the sites that changed state, in one joined query
+    owners, user_ids = {}, {}
+    for website_id, url, user_id, email in db.session.execute(
+        db.select(Website.id, Website.url, Website.user_id, User.email)
+        .join(User, User.id == Website.user_id)
+        .where(Website.id.in_(down_ids + up_ids))
+    ).all():
+        owners[website_id] = (url, email)
+        user_ids[website_id] = user_id
+
+    new_alerts = [
+        {"website_id": website_id, "user_id": user_ids[website_id], "alert_type": "Website Down",
+         "status": "unresolved", "timestamp": now}
+        for website_id in down_ids if website_id in owners
+    ]
+    alert_ids = {}
+    if new_alerts:
+        for alert_id, website_id in db.session.execute(
+            db.insert(Alert).returning(Alert.id, Alert.website_id), new_alerts
+        ).all():
+            alert_ids[website_id] = alert_id
+    if up_ids:
+        db.session.execute(
+            db.update(Alert)
+            .where(
+                Alert.website_id.in_(up_ids),
+                Alert.alert_type == "Website Down",
+                Alert.status == "unresolved",
+            )
+            .values(status="resolved")
+        )
+    bump_site_versions(down_ids + up_ids)
+    db.session.commit()
+    return owners, alert_ids
+
+def tick_at_or_after(when):
+    """The first MONITOR_TICK_SECONDS boundary at or after `when`."""
+    if MONITOR_TICK_SECONDS <= 0:
+        return when
+    return math.ceil(when / MONITOR_TICK_SECONDS) * MONITOR_TICK_SECONDS
+
+def tick_after(when):
+    """The first MONITOR_TICK_SECONDS boundary strictly after `when`."""
+    if MONITOR_TICK_SECONDS <= 0:
+        return when
+    return (math.floor(when / MONITOR_TICK_SECONDS) + 1) * MONITOR_TICK_SECONDS
+
+# Functions to keep undeliverable alert emails past a restart
+def save_dead_letter(fields):
+    """Store one dead-lettered email (Notification.as_dict())."""
+    try:
+        db.session.add(EmailDeadLetter(
+            to_email=fields["to_email"],
+            subject=fields["subject"][:255],
+            content=fields["content"],
+            attempts=fields["attempts"],
+            last_error=fields["last_error"],
+            created_at=datetime.utcfromtimestamp(fields["created_at"]),
+        ))
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        logger.error("❌ Failed to store dead-lettered email to %s: %s", fields["to_email"], e)
+
+def prune_dead_letters():
+    if NOTIFY_DEAD_LETTER_RETENTION_DAYS:
+        cutoff = datetime.utcnow() - timedelta(days=NOTIFY_DEAD_LETTER_RETENTION_DAYS)
+        db.session.execute(db.delete(EmailDeadLetter).where(EmailDeadLetter.failed_at < cutoff))
+        db.session.commit()
 
-def run_monitoring_task(app):
-    """Runs the async check_all_websites() function in a synchronous context."""
-    asyncio.run(check_all_websites(app))
+class ShardMembership:
+    """Heartbeats this worker into monitor_worker and owns its slice of the hash ring."""
+
+    def __init__(self, app, worker_id=None):
+        self.app = app
+        self.worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+        self.ring = HashRing([self.worker_id])
+        self._last_probes = 0
+        self._last_beat = None
+        self.left = False
+
+    def owns(self, website_id):
+        return self.ring.owner(website_id) == self.worker_id
+
+    def heartbeat(self, sites_owned, probes_total):
+        """Report throughput and refresh membership; returns True when the ring changed."""
+        now = datetime.utcnow()
+        rate = 0.0
+        if self._last_beat is not None:
+            elapsed = (now - self._last_beat).total_seconds()
+            rate = (probes_total - self._last_probes) / elapsed if elapsed > 0 else 0.0
+        self._last_beat, self._last_probes = now, probes_total
+
+        with self.app.app_context():
+            worker = db.session.get(MonitorWorker, self.worker_id)
+            if worker is None:
+                worker = MonitorWorker(id=self.worker_id, started_at=now)
+                db.session.add(worker)
+            worker.heartbeat_at = now
+            worker.sites_owned = sites_owned
+            worker.probes_total = probes_total
+            worker.probes_per_second = rate
+
+            cutoff = now - timedelta(seconds=MONITOR_WORKER_TTL_SECONDS)
+            # Crashed or renamed workers never leave(), so expire their rows here
+            db.session.execute(db.delete(MonitorWorker).where(MonitorWorker.heartbeat_at < cutoff))
+            live = set(db.session.execute(db.select(MonitorWorker.id)).scalars())
+            db.session.commit()
+
+        live.add(self.worker_id)
+        logger.info("📊 Shard %s: %d sites, %.2f probes/s, %d workers", self.worker_id, sites_owned, rate, len(live))
+        if live == self.ring.nodes:
+            return False
+        logger.info("🔀 Rebalancing shards: %s", sorted(live))
+        self.ring = HashRing(live)
+        return True
+
+    def leave(self):
+        """Remove this worker so the others pick up its sites on their next heartbeat."""
+        with self.app.app_context():
+            db.session.execute(db.delete(MonitorWorker).where(MonitorWorker.id == self.worker_id))
+            db.session.commit()
+        self.left = True
+
+class MonitorService:
+    """Runs the probe scheduler on one persistent event loop in a background thread."""
+
+    def __init__(self, app, shard=None):
+        self.app = app
+        self.shard = shard          # ShardMembership when running as one of N sharded workers
+        self.runner = BackgroundLoop("watchly-monitor")
+        self.probes_total = 0
+        self._last_heartbeat = 0.0
+        self._last_prune = time.time()
+        self._housekeeping_running = False
+        self._main = None
+        self._main_task = None
+        self._wakeup = None
+        self._pending = set()       # Website ids queued for an immediate probe
+        self._in_flight = set()     # Probe cycles currently running
+        self._accepting = False
+        self._control = None        # Subscription for schedule requests from API processes
+        self._force_refresh = False
+        self._telemetry_server = None
+        self._next_cycle = 0.0      # No new probe cycle starts before this tick
+
+    @property
+    def running(self):
+        return self._accepting and self.runner.running
+
+    def start(self):
+        """Start the loop thread and the scheduling coroutine."""
+        if self.running:
+            return
+        self.runner.start()
+        self._accepting = True
+        # Queued on the database thread: dead letters can come from the loop or from stop()
+        notifier.on_dead_letter = lambda notification: db_writer.submit(
+            in_app_context, self.app, save_dead_letter, notification.as_dict())
+        self._main = self.runner.submit(self._run())
+        broker = get_broker()
+        self._control = broker.subscribe(MONITOR_TOPIC)
+        threading.Thread(target=self._watch_control, args=(broker, self._control),
+                         name="watchly-monitor-control", daemon=True).start()
+        if TELEMETRY_PORT:
+            self._telemetry_server = telemetry.serve_telemetry(TELEMETRY_PORT)
+        logger.info("✅ Monitor service started")
+
+    def _watch_control(self, broker, subscription):
+        """Relay schedule requests from the pub/sub broker into the loop."""
+        try:
+            while not subscription.closed:
+                events, _ = subscription.get(timeout=1)
+                website_ids = [website_id for event in events if event.get("type") == "schedule"
+                               for website_id in event.get("website_ids", [])]
+                if website_ids and self.running:
+                    self.runner.call_soon(self._schedule, website_ids)
+        finally:
+            broker.unsubscribe(subscription)
+
+    def _schedule(self, website_ids):
+        #Resync on the next pass so the new sites get their regular schedule, and probe them now
+        self._force_refresh = True
+        if self.shard is not None:
+            website_ids = [website_id for website_id in website_ids if self.shard.owns(website_id)]
+        self._enqueue(website_ids)
+
+    def submit(self, website_ids):
+        """Queue websites for a probe on the next scheduling pass (thread-safe)."""
+        self.runner.call_soon(self._enqueue, list(website_ids))
+
+    def _enqueue(self, website_ids):
+        self._pending.update(website_ids)
+        if self._wakeup:
+            self._wakeup.set()
+
+    def drain(self, timeout=None):
+        """Stop starting new cycles and wait for in-flight probes to finish."""
+        if not self.runner.running:
+            return True
+        self._accepting = False
+        self.runner.call_soon(self._enqueue, [])
+        try:
+            self.runner.submit(self._drain()).result(timeout)
+            return True
+        except TimeoutError:
+            logger.warning("⚠️ Monitor drain timed out with probes still in flight")
+            return False
+
+    async def _drain(self):
+        #Let the scheduling coroutine finish its pass so no new cycle slips in
+        if self._main_task and not self._main_task.done():
+            await asyncio.wait([self._main_task])
+        if self._in_flight:
+            await asyncio.gather(*self._in_flight, return_exceptions=True)
+
+    def stop(self, timeout=10):
+        """Drain, close the probe pool, stop the loop thread and leave the shard ring."""
+        if not self.runner.running:
+            self._leave_shard()
+            return
+        self.drain(timeout)
+        if self._control is not None:
+            self._control.close()
+            self._control = None
+        if self._telemetry_server is not None:
+            self._telemetry_server.shutdown()
+            self._telemetry_server.server_close()
+            self._telemetry_server = None
+        try:
+            self.runner.submit(notifier.stop(timeout)).result(timeout + 1)
+            self.runner.submit(probe_client.aclose()).result(timeout)
+        except Exception as e:
+            logger.error("❌ Failed to close monitor clients: %s", e)
+        self.runner.stop(timeout)
+        self._leave_shard()
+        logger.info("🛑 Monitor service stopped")
+
+    def _leave_shard(self):
+        if self.shard is None or self.shard.left:
+            return
+        try:
+            self.shard.leave()
+        except Exception as e:
+            logger.error("❌ Failed to leave shard ring: %s", e)
+
+    async def _run(self):
+        self._main_task = asyncio.current_task()
+        self._wakeup = asyncio.Event()
+        await notifier.start()
+        force = True  # A new leader starts from fresh data
+        while self._accepting:
+            try:
+                if self.shard is not None and time.time() - self._last_heartbeat >= MONITOR_HEARTBEAT_SECONDS:
+                    self._last_heartbeat = time.time()
+                    changed = await run_db(self.shard.heartbeat, len(probe_scheduler), self.probes_total, app=self.app)
+                    force = changed or force
+                force = force or self._force_refresh
+                self._force_refresh = False
+                await refresh_schedule(self.app, force=force, shard=self.shard)
+                force = False
+            except Exception as e:
+                logger.error("❌ Failed to refresh probe schedule: %s", e)
+
+            if time.time() - self._last_prune >= MONITOR_PRUNE_SECONDS and not self._housekeeping_running:
+                self._last_prune = time.time()
+                # Off the loop thread: compaction can take a while and must not delay probes
+                self._housekeeping_running = True
+                asyncio.ensure_future(asyncio.to_thread(self._housekeeping))
+
+            #At most one cycle per tick: every site due (or submitted) during the tick goes in it
+            now = time.time()
+            if now >= self._next_cycle:
+                website_ids = set()
+                for website_id, due in probe_scheduler.pop_due(now):
+                    telemetry.SCHEDULE_LAG.observe(max(now - due, 0))
+                    website_ids.add(website_id)
+                website_ids.update(self._pending)
+                self._pending.clear()
+                if website_ids:
+                    self._start_cycle(list(website_ids))
+                    self._next_cycle = tick_after(now)
+
+            #Sleep until the tick the next site is due in, a resync is needed or work is submitted
+            timeout = max(MONITOR_RESYNC_SECONDS - (time.time() - _last_resync), MONITOR_TICK_SECONDS)
+            next_due = probe_scheduler.next_due()
+            if self._pending:
+                timeout = min(timeout, self._next_cycle - time.time())
+            elif next_due is not None:
+                timeout = min(timeout, max(tick_at_or_after(next_due), self._next_cycle) - time.time())
+            if self.shard is not None:
+                timeout = min(timeout, self._last_heartbeat + MONITOR_HEARTBEAT_SECONDS - time.time())
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), max(timeout, 0))
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+    def _housekeeping(self):
+        """Compact (METRIC_STORAGE=chunks) and prune metric history."""
+        try:
+            with self.app.app_context():
+                if METRIC_STORAGE == "chunks":
+                    compact_metrics()
+                prune_history()
+                compact_histograms()
+                prune_dead_letters()
+        except Exception as e:
+            logger.error("❌ Failed to compact/prune metric history: %s", e)
+        finally:
+            self._housekeeping_running = False
+
+    def _start_cycle(self, website_ids):
+        task = asyncio.ensure_future(self._cycle(website_ids))
+        self._in_flight.add(task)
+        task.add_done_callback(self._in_flight.discard)
+
+    async def _cycle(self, website_ids):
+        telemetry.PROBES_IN_FLIGHT.inc(len(website_ids))
+        try:
+            await check_due_websites(self.app, website_ids)
+            self.probes_total += len(website_ids)
+            telemetry.CYCLES.inc(outcome="ok")
+        except Exception as e:
+            telemetry.CYCLES.inc(outcome="failed")
+            logger.error("❌ Probe cycle failed for %d websites: %s", len(website_ids), e)
+        finally:
+            telemetry.PROBES_IN_FLIGHT.dec(len(website_ids))
+
+def schedule_websites(website_ids):
+    """Ask the monitor (in this or any other process) to schedule and probe new websites now."""
+    website_ids = list(website_ids)
+    if website_ids:
+        publish([(MONITOR_TOPIC, {"type": "schedule", "website_ids": website_ids})])
+
+def _become_leader(app, shard=None):
+    global monitor_service
+    monitor_service = MonitorService(app, shard=shard)
+    monitor_service.start()
+
+def _step_down():
+    if monitor_service is not None:
+        monitor_service.stop()
 
 def start_monitoring(app):
-    """Starts the APScheduler job for monitoring websites at intervals."""
-    if not scheduler.running:  # ✅ Prevent multiple schedulers
-        print("✅ Starting monitoring service...")
-        scheduler.add_job(run_monitoring_task, "interval", seconds=30, args=[app])
-        scheduler.start()
-    else:
-        print("🚀 Scheduler is already running. Skipping duplicate start.")
+    """Campaigns for monitor leadership; only the elected process runs the MonitorService.
+
+    With MONITOR_SHARDING every process runs a MonitorService for its own shard instead.
+    """
+    global leader_elector
+    if leader_elector is not None or (monitor_service is not None and monitor_service.running):  # ✅ Prevent multiple monitors in one process
+        logger.info("🚀 Monitoring is already started. Skipping duplicate start.")
+        return leader_elector
+
+    logger.info("✅ Starting monitoring service...")
+    if MONITOR_SHARDING:
+        # Every worker probes its own slice, so there is nothing to elect
+        _become_leader(app, shard=ShardMembership(app))
+        atexit.register(stop_monitoring)
+        return monitor_service
 
-if __name__ == "__main__":
-    from app import create_app
+    with app.app_context():
+        lock = create_leader_lock(db.engine, "watchly-monitor", MONITOR_LOCK_FILE, MONITOR_LOCK_URL)
+    leader_elector = LeaderElector(
+        lock,
+        on_elected=lambda: _become_leader(app),
+        on_demoted=_step_down,
+        retry_seconds=MONITOR_LEADER_RETRY_SECONDS,
+    )
+    leader_elector.start()
+    atexit.register(stop_monitoring)
+    return leader_elector
+
+def stop_monitoring():
+    """Stops the monitor (if this process leads) and releases leadership."""
+    global leader_elector
+    if leader_elector is not None:
+        leader_elector.stop()
+        leader_elector = None
+    elif MONITOR_SHARDING:
+        _step_down()
+
+def run_worker():
+    """Standalone monitor process: `python -m app.monitor`."""
     app = create_app()
+    stop_event = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop_event.set())
+    signal.signal(signal.SIGINT, lambda *_: stop_event.set())
+
     start_monitoring(app)
+    stop_event.wait()
+    stop_monitoring()
+
+if __name__ == "__main__":
+    run_worker()
@@ -6,6 +6,9 @@ from app.models import Alert, Website
 from app import db
 from datetime import datetime
 from app.utils import email_utils
+from app.utils.pagination import cursor_headers, keyset_page, page_size
+from app.utils.versioning import bump_site_versions, bump_user_versions, versioned
+from app.config import API_DEFAULT_PAGE_SIZE
 
 
 alerts_ns= Namespace('alerts', description="Alert Management Endpoints")
@@ -62,6 +65,7 @@ class AddAlert(Resource):
         #Create new alert
         new_alert = Alert(
             website_id=website.id,
+            user_id=website.user_id,
             alert_type=alert_type,
             status="unresolved",
             timestamp=datetime.utcnow()
@@ -69,6 +73,7 @@ class AddAlert(Resource):
 
         #Save alert to db
         db.session.add(new_alert)
+        bump_user_versions([current_user.id])
         db.session.commit()
 
         return jsonify({
@@ -86,19 +91,19 @@ class AddAlert(Resource):
 @alerts_ns.route('', '/')
 class GetAlerts(Resource):
     @alerts_ns.response(200, "Alerts retrieved successfully!", [alert_model])
+    @alerts_ns.response(304, "Not Modified")
     @token_required
+    @versioned
     def get(self, current_user):
         """Fetch all alerts for user's websites"""
         website_id = request.args.get("website_id", type=int)
-        user_websites = Website.query.filter_by(user_id=current_user.id).all()
-        user_website_ids = {website.id for website in user_websites}
-
-        if website_id and website_id not in user_website_ids:
+        if website_id and not Website.query.filter_by(id=website_id, user_id=current_user.id).first():
             return {"error": "Website not found or unauthorized"}, 404
 
-        alerts_query = Alert.query.filter(Alert.website_id.in_(user_website_ids))
+        # Alerts carry their owner, so no join or website id list is needed
+        alerts_query = Alert.query.filter(Alert.user_id == current_user.id)
         if website_id:
-            alerts_query = alerts_query.filter_by(website_id=website_id)
+            alerts_query = alerts_query.filter(Alert.website_id == website_id)
 
         alerts = alerts_query.all()
         return [{
@@ -129,6 +134,7 @@ class UpdateAlert(Resource):
         if "alert_type" in data:
             alert.alert_type = data["alert_type"]
 
+        bump_site_versions([alert.website_id])
         db.session.commit()
 
         return {
@@ -163,6 +169,7 @@ class ResolveAlert(Resource):
 
         # Update alert status
         alert.status = "resolved"
+        bump_user_versions([current_user.id])
         db.session.commit()
 
         return {
@@ -182,30 +189,33 @@ class ResolveAlert(Resource):
 class AlertsHistory(Resource):
     @alerts_ns.response(200, "Alert History Retrieved Successfully!", [alert_model])
     @alerts_ns.response(404, "Website Not Found or Unauthorized")
+    @alerts_ns.response(304, "Not Modified")
     @token_required
+    @versioned
     def get(self, current_user):
-        """Retrieve alert history for monitored websites"""
+        """Retrieve alert history for monitored websites, newest first (page with ?cursor=<X-Next-Cursor>)"""
         from app.models import Alert, Website  # Avoid circular imports
 
         website_id = request.args.get("website_id", type=int)
         status = request.args.get("status")
-
-        # Fetch user websites
-        user_websites = Website.query.filter_by(user_id=current_user.id).all()
-        user_website_ids = {website.id for website in user_websites}
+        limit = page_size(request.args.get("limit", type=int), API_DEFAULT_PAGE_SIZE)
+        cursor = request.args.get("cursor")
 
         # Validate website_id
-        if website_id and website_id not in user_website_ids:
+        if website_id and not Website.query.filter_by(id=website_id, user_id=current_user.id).first():
             return {"error": "Website not found or unauthorized"}, 404
 
-        # Query alerts
-        alerts_query = Alert.query.filter(Alert.website_id.in_(user_website_ids))
+        # Filtering on Alert.user_id lets (user_id, timestamp, id) serve the keyset order without a sort
+        alerts_query = Alert.query.filter(Alert.user_id == current_user.id)
         if website_id:
-            alerts_query = alerts_query.filter_by(website_id=website_id)
+            alerts_query = alerts_query.filter(Alert.website_id == website_id)
         if status:
-            alerts_query = alerts_query.filter_by(status=status)
+            alerts_query = alerts_query.filter(Alert.status == status)
 
-        alerts = alerts_query.order_by(Alert.timestamp.desc()).all()
+        try:
+            alerts, next_cursor = keyset_page(alerts_query, Alert.timestamp, Alert.id, cursor, limit)
+        except ValueError:
+            return {"error": "Invalid cursor"}, 400
 
         # Serialize response
         alerts_data = [
@@ -218,4 +228,4 @@ class AlertsHistory(Resource):
             }
             for alert in alerts
         ]
-        return alerts_data, 200
+        return alerts_data, 200, cursor_headers(next_cursor)
\ No newline at end of file
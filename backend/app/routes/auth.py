@@ -2,11 +2,12 @@ from datetime import datetime, timedelta
 from flask_restx import Namespace, Resource, fields
 from functools import wraps
 from flask import jsonify, request
-from app.models import User, Website, Metric, Alert
+from app.models import User, Website, Metric, MetricRollup, MetricChunk, MetricTiming, LatestStatus, Alert, EmailDeadLetter
 from app import db
 import jwt
 from app.config import SECRET_KEY
 from app.utils.logger import logger
+from app.utils.auth_cache import auth_cache
 from flask_jwt_extended import create_access_token
 
 
@@ -48,6 +49,38 @@ change_password_model = auth_ns.model("ChangePassword", {
 #Secret key for jwt
 SECRET_KEY = "This_Is_The_Key"
 
+def authenticate(token):
+    """Resolve a bearer token to a user; returns (user, None) or (None, error response)."""
+    if not token:
+        logger.warning("Unauthorized access attempt: Missing token")
+        return None, ({"error": "Token is missing!"}, 401)
+
+    # ✅ Hot path: token verified recently and user cached -> no decode, no query
+    user_id = auth_cache.get_user_id(token)
+    current_user = auth_cache.get_user(db.session, User, user_id) if user_id is not None else None
+    if current_user is not None:
+        return current_user, None
+
+    try:
+        #Decode token
+        data = jwt.decode(token, SECRET_KEY, algorithms=["HS256"])
+    except jwt.ExpiredSignatureError:
+        logger.warning("Unauthorized access attempt: Expired token")
+        return None, ({"error": "Token has expired!"}, 401)
+    except jwt.InvalidTokenError:
+        logger.warning("Unauthorized access attempt: Invalid token")
+        return None, ({"error": "Invalid token!"}, 401)
+
+    #Fetch user from database
+    current_user = db.session.get(User, data.get("user_id"))
+    if not isinstance(current_user, User):
+        logger.warning("Unauthorized access attempt: Invalid token")
+        return None, ({"error": "Invalid token!"}, 401)
+
+    auth_cache.put_token(token, current_user.id, data.get("exp"))
+    auth_cache.put_user(current_user)
+    return current_user, None
+
 #Helper function to check validity
 # of token for protected routes.
 def token_required(f):
@@ -59,29 +92,9 @@ def token_required(f):
                 if auth_header.startswith("Bearer "):
                     token = auth_header.split(" ")[1]
 
-            print("Recieved Token:", token)
-
-            if not token:
-                logger.warning("Unauthorized access attempt: Missing token")
-                return {"error": "Token is missing!"}, 401
-
-            try:
-                #Decode token
-                data = jwt.decode(token, SECRET_KEY, algorithms=["HS256"])
-                print(f"Debug: Decoded Token Data - {data}")
-                #Fetch user from database
-                current_user = db.session.get(User, data["user_id"])
-                print(f"Debug: Retrieved User - {current_user}")
-
-                if not isinstance(current_user, User):
-                    logger.warning("Unauthorized access attempt: Invalid token")
-                    return {"error": "Invalid token!"}, 401
-            except jwt.ExpiredSignatureError:
-                logger.warning("Unauthorized access attempt: Expired token")
-                return {"error": "Token has expired!"}, 401
-            except jwt.InvalidTokenError:
-                logger.warning("Unauthorized access attempt: Invalid token")
-                return {"error": "Invalid token!"}, 401
+            current_user, error = authenticate(token)
+            if error:
+                return error
 
             #Pass current user to route
             return f(*args, **kwargs, current_user=current_user)
@@ -186,8 +199,6 @@ class UserProfile(Resource):
     @token_required
     def get(self, current_user):
         """Retrieve User Profile"""
-        print(f"Debug: current_user type: {type(current_user)}")
-
         if not current_user or not isinstance(current_user, User):
             logger.error("Profile access denied: User not found or invalid type.")
             return {"error": "User not found or invalid type."}, 500
@@ -215,6 +226,7 @@ class UserProfile(Resource):
             current_user.email = data["email"]
 
         db.session.commit()
+        auth_cache.invalidate_user(current_user.id)
 
         return {
             "message": "Profile Updated Successfully!",
@@ -256,6 +268,7 @@ class ChangePassword(Resource):
         #Update password
         current_user.set_password(new_password)
         db.session.commit()
+        auth_cache.invalidate_user(current_user.id)
 
         return {"message": "Password updated successfully!"}, 200
 
@@ -275,11 +288,17 @@ class DeleteUser(Resource):
         websites = Website.query.filter_by(user_id=user.id).all()
         for website in websites:
             Metric.query.filter_by(website_id=website.id).delete()
+            MetricRollup.query.filter_by(website_id=website.id).delete()
+            MetricChunk.query.filter_by(website_id=website.id).delete()
+            MetricTiming.query.filter_by(website_id=website.id).delete()
+            LatestStatus.query.filter_by(website_id=website.id).delete()
             Alert.query.filter_by(website_id=website.id).delete()
             db.session.delete(website)
+        EmailDeadLetter.query.filter_by(to_email=user.email).delete()
 
         db.session.delete(user)
         db.session.commit()
+        auth_cache.invalidate_user(current_user.id)
 
         logger.info(f"User {current_user.email} deleted their account")
         return {"message": "User account deleted successfully!"}, 200
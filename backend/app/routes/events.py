@@ -0,0 +1,79 @@
+import json
+import threading
+import time
+
+from flask import Response, request
+from flask_restx import Namespace, Resource
+
+from app import db
+from app.config import SSE_HEARTBEAT_SECONDS, SSE_MAX_SECONDS, SSE_MAX_STREAMS, SSE_RETRY_AFTER_SECONDS
+from app.routes.auth import authenticate
+from app.utils.pubsub import get_broker, user_topic
+
+events_ns = Namespace("events", description="Live probe results and alert transitions")
+
+#Open streams in this process; each one pins a worker thread until it ends
+_stream_slots = threading.BoundedSemaphore(SSE_MAX_STREAMS)
+
+
+def _format(event_type, data):
+    return f"event: {event_type}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+def event_stream(subscription, user_id):
+    """Yield SSE frames for one subscription until the client goes away or SSE_MAX_SECONDS pass."""
+    deadline = time.monotonic() + SSE_MAX_SECONDS
+    yield "retry: 5000\n\n"
+    yield _format("hello", {"user_id": user_id})
+    while time.monotonic() < deadline:
+        events, dropped = subscription.get(SSE_HEARTBEAT_SECONDS)
+        if dropped:
+            # Fell behind: the client should refetch over REST instead of trusting the stream
+            yield _format("resync", {"dropped": dropped})
+        for event in events:
+            yield _format(event["type"], event)
+        if not events and not dropped:
+            yield ": keepalive\n\n"
+
+
+@events_ns.route("/stream")
+class EventStream(Resource):
+    @events_ns.response(200, "text/event-stream of status, alert and resync events")
+    @events_ns.response(401, "Token is missing or invalid")
+    @events_ns.response(503, "Too many open streams on this worker; retry after Retry-After seconds")
+    def get(self):
+        """Server-Sent Events stream of the user's probe results and alert transitions.
+
+        EventSource can't set headers, so the token may also be passed as ?token=.
+        """
+        token = request.args.get("token")
+        auth_header = request.headers.get("Authorization", "")
+        if auth_header.startswith("Bearer "):
+            token = auth_header.split(" ")[1]
+
+        current_user, error = authenticate(token)
+        if error:
+            return error
+        user_id = current_user.id
+        # Don't hold a pooled connection for the life of the stream
+        db.session.remove()
+
+        if not _stream_slots.acquire(blocking=False):
+            return {"error": "Too many open event streams, try again later"}, 503, {
+                "Retry-After": str(SSE_RETRY_AFTER_SECONDS)}
+
+        broker = get_broker()
+        subscription = broker.subscribe(user_topic(user_id))
+        response = Response(
+            event_stream(subscription, user_id),
+            mimetype="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
+
+        @response.call_on_close
+        def _close():
+            # Runs even if the client leaves before the generator starts
+            broker.unsubscribe(subscription)
+            _stream_slots.release()
+
+        return response
@@ -1,9 +1,18 @@
 from flask import request
 from flask_restx import Namespace, Resource, fields
-from app.models import Metric, Website
+from app.models import Metric, MetricTiming, Website
 from app import db
-from datetime import datetime
+from datetime import datetime, timedelta
 from app.routes.auth import token_required
+from app.utils.scheduler import ALLOWED_FREQUENCIES
+from app.utils.metric_store import read_metrics, record_metrics
+from app.config import API_DEFAULT_PAGE_SIZE, API_MAX_PAGE_SIZE, ROLLUP_MAX_POINTS
+from app.utils.pagination import cursor_headers, page_size
+from app.utils.versioning import versioned
+from app.utils.rollups import (
+    MINUTE, RESOLUTION_NAMES, aggregate_metrics, aggregate_source, parse_duration, parse_timestamp,
+    pick_resolution, read_rollups, retained_since, serialize_rollup,
+)
 
 metrics_ns = Namespace('metrics', description="Website Metrics Endpoints")
 sites_ns = Namespace('sites', description="Manage Monitoring Frequency")
@@ -29,23 +38,31 @@ create_metric_model = metrics_ns.model("CreateMetric", {
 class GetMetrics(Resource):
     @metrics_ns.response(200, "Metrics retrieved successfully!", [metric_model])
     @metrics_ns.response(400, "Website ID is required")
+    @metrics_ns.response(304, "Not Modified")
     @token_required
+    @versioned
     def get(self, current_user):
-        """Fetch all metrics for a specific website"""
+        """Fetch metrics for a website: raw rows (page with ?cursor=<X-Next-Cursor>), or aggregated buckets when from/to/bucket is given"""
         website_id = request.args.get('website_id', type=int)
-        limit = request.args.get('limit', type=int, default=10)  # Fetch last 10 records
+        limit = page_size(request.args.get('limit', type=int, default=10), API_MAX_PAGE_SIZE)  # Fetch last 10 records (<= 0: a full page)
+        cursor = request.args.get('cursor')
 
         if not website_id:
             return {"error": "Website ID is required"}, 400
 
-        query = Metric.query.filter_by(website_id=website_id).order_by(Metric.timestamp.desc())
+        if any(request.args.get(param) for param in ('from', 'to', 'bucket')):
+            return aggregated_metrics(current_user, website_id)
 
-        if limit > 0:
-            query = query.limit(limit)  # Fix: limit must be applied to the query object
+        # The ETag comes from the caller's data version, so only serve their own sites
+        if not Website.query.filter_by(id=website_id, user_id=current_user.id).first():
+            return {"error": "Website not found or unauthorized"}, 404
 
-        metrics = query.all()
+        try:
+            metrics, next_cursor = read_metrics(website_id, cursor, limit)
+        except ValueError:
+            return {"error": "Invalid cursor"}, 400
 
-        if not metrics:
+        if not metrics and not cursor:
             return [{
                 "id": None,
                 "website_id": website_id,
@@ -55,12 +72,67 @@ class GetMetrics(Resource):
             }], 200
 
         return [{
-            "id": metric.id,
-            "website_id": metric.website_id,
-            "uptime": float(metric.uptime),  # Ensure numeric uptime
-            "response_time": float(metric.response_time),  #  Ensure numeric response time
-            "timestamp": metric.timestamp.isoformat()
-        } for metric in metrics], 200
+            "id": metric["id"],
+            "website_id": metric["website_id"],
+            "uptime": float(metric["uptime"]),  # Ensure numeric uptime
+            "response_time": float(metric["response_time"]),  #  Ensure numeric response time
+            "timestamp": metric["timestamp"].isoformat()
+        } for metric in metrics], 200, cursor_headers(next_cursor)
+
+def time_range(default_span):
+    """(start, end) from ?from= / ?to= (defaulting to the last `default_span`), or None if either is invalid."""
+    raw_start, raw_end = request.args.get('from'), request.args.get('to')
+    end = parse_timestamp(raw_end) if raw_end else datetime.utcnow()
+    if end is None:
+        return None
+    try:
+        start = parse_timestamp(raw_start) if raw_start else end - default_span
+    except OverflowError:
+        return None
+    return (start, end) if start is not None else None
+
+INVALID_RANGE = {"error": "Invalid 'from' or 'to'. Use ISO-8601 or epoch seconds."}
+
+def pruned_error(resolution, start):
+    """400 body when rollups at `resolution` no longer reach back to `start`, else None."""
+    since = retained_since(resolution)
+    if since is not None and start < since:
+        return {"error": f"{resolution}-second rollups are only kept since {since.date().isoformat()}; "
+                         "use a coarser bucket/resolution (whole hours or days) for older data."}
+    return None
+
+def aggregated_metrics(current_user, website_id):
+    """Bucketed uptime %, failures and avg/p50/p95/p99 latency over a time range."""
+    span = time_range(timedelta(days=1))
+    if span is None:
+        return INVALID_RANGE, 400
+    start, end = span
+    if start >= end:
+        return {"error": "'from' must be before 'to'"}, 400
+
+    bucket = request.args.get('bucket')
+    if bucket:
+        bucket = parse_duration(bucket)
+        if not bucket or bucket % MINUTE:
+            return {"error": "Invalid bucket. Use a whole number of minutes, e.g. 5m, 1h, 1d or 300."}, 400
+        if (end - start).total_seconds() / bucket > ROLLUP_MAX_POINTS:
+            return {"error": f"Too many buckets; at most {ROLLUP_MAX_POINTS} per request."}, 400
+        error = pruned_error(aggregate_source(bucket), start)
+        if error:
+            return error, 400
+    else:
+        bucket = pick_resolution(start, end)
+
+    if not Website.query.filter_by(id=website_id, user_id=current_user.id).first():
+        return {"error": "Website not found or unauthorized"}, 404
+
+    return {
+        "website_id": website_id,
+        "from": start.isoformat(),
+        "to": end.isoformat(),
+        "bucket": bucket,
+        "buckets": aggregate_metrics(website_id, start, end, bucket),
+    }, 200
 
 # Route to add a new metric
 @metrics_ns.route('/add')
@@ -79,27 +151,111 @@ class AddMetric(Resource):
         if not website_id or response_time is None or uptime is None:
             return {"error": "Missing required fields"}, 400
 
-        new_metric = Metric(
-            website_id=website_id,
-            response_time=response_time,
-            uptime=uptime,
-            timestamp=datetime.utcnow()
-        )
+        new_metric = {
+            "website_id": website_id,
+            "response_time": response_time,
+            "uptime": uptime,
+            "timestamp": datetime.utcnow()
+        }
 
-        db.session.add(new_metric)
-        db.session.commit()
+        record_metrics([new_metric], return_ids=True)
 
         return {
             "message": "Metric added successfully!",
             "metric": {
-                "id": new_metric.id,
-                "website_id": new_metric.website_id,
-                "response_time": new_metric.response_time,
-                "uptime": new_metric.uptime,
-                "timestamp": new_metric.timestamp.isoformat()
+                "id": new_metric["id"],
+                "website_id": new_metric["website_id"],
+                "response_time": new_metric["response_time"],
+                "uptime": new_metric["uptime"],
+                "timestamp": new_metric["timestamp"].isoformat()
             }
         }, 201
 
+# Route to fetch downsampled history (1m / 1h / 1d rollups)
+@metrics_ns.route('/rollups')
+class GetMetricRollups(Resource):
+    @metrics_ns.response(200, "Rollups retrieved successfully!")
+    @metrics_ns.response(400, "Invalid parameters")
+    @metrics_ns.response(404, "Website not found or unauthorized")
+    @metrics_ns.response(304, "Not Modified")
+    @token_required
+    @versioned
+    def get(self, current_user):
+        """Fetch aggregated history for a website, at the coarsest resolution that fits the range"""
+        website_id = request.args.get('website_id', type=int)
+        span = time_range(timedelta(days=1))
+        resolution = request.args.get('resolution')
+
+        if not website_id:
+            return {"error": "Website ID is required"}, 400
+        if span is None:
+            return INVALID_RANGE, 400
+        start, end = span
+        if start >= end:
+            return {"error": "'from' must be before 'to'"}, 400
+        if resolution and resolution not in RESOLUTION_NAMES:
+            return {"error": "Invalid resolution. Choose from 1m, 1h, 1d."}, 400
+        if resolution:
+            error = pruned_error(RESOLUTION_NAMES[resolution], start)
+            if error:
+                return error, 400
+
+        if not Website.query.filter_by(id=website_id, user_id=current_user.id).first():
+            return {"error": "Website not found or unauthorized"}, 404
+
+        resolution, rollups = read_rollups(website_id, start, end, RESOLUTION_NAMES.get(resolution))
+        return {
+            "website_id": website_id,
+            "resolution": resolution,
+            "from": start.isoformat(),
+            "to": end.isoformat(),
+            "buckets": [serialize_rollup(rollup) for rollup in rollups],
+        }, 200
+
+@metrics_ns.route('/timings')
+class GetMetricTimings(Resource):
+    @metrics_ns.response(200, "Probe timings retrieved successfully!")
+    @metrics_ns.response(400, "Invalid parameters")
+    @metrics_ns.response(404, "Website not found or unauthorized")
+    @metrics_ns.response(304, "Not Modified")
+    @token_required
+    @versioned
+    def get(self, current_user):
+        """Per-phase probe timings (dns/connect/tls/ttfb/body, ms) for a website, newest first"""
+        website_id = request.args.get('website_id', type=int)
+        limit = page_size(request.args.get('limit', type=int), API_DEFAULT_PAGE_SIZE)
+        span = time_range(timedelta(hours=1))
+
+        if not website_id:
+            return {"error": "Website ID is required"}, 400
+        if span is None:
+            return INVALID_RANGE, 400
+        start, end = span
+        if not Website.query.filter_by(id=website_id, user_id=current_user.id).first():
+            return {"error": "Website not found or unauthorized"}, 404
+
+        timings = db.session.execute(
+            db.select(MetricTiming).where(
+                MetricTiming.website_id == website_id,
+                MetricTiming.timestamp >= start,
+                MetricTiming.timestamp < end,
+            ).order_by(MetricTiming.timestamp.desc()).limit(limit)
+        ).scalars().all()
+        return {
+            "website_id": website_id,
+            "timings": [
+                {
+                    "timestamp": timing.timestamp.isoformat(),
+                    "dns_ms": timing.dns_ms,
+                    "connect_ms": timing.connect_ms,
+                    "tls_ms": timing.tls_ms,
+                    "ttfb_ms": timing.ttfb_ms,
+                    "body_ms": timing.body_ms,
+                }
+                for timing in timings
+            ],
+        }, 200
+
 @sites_ns.route('/<int:website_id>/frequency')
 class UpdateFrequency(Resource):
     @token_required
@@ -109,8 +265,7 @@ class UpdateFrequency(Resource):
         new_frequency = data.get("frequency")
 
         # Validate the requested frequency
-        allowed_frequencies = [10, 30, 60, 300, 600, 1800, 3600]
-        if new_frequency not in allowed_frequencies:
+        if new_frequency not in ALLOWED_FREQUENCIES:
             return {"error": "Invalid frequency. Choose from 10, 30, 60, 300, 600, 1800, 3600 seconds."}, 400
 
         # Check if the website exists and belongs to the user making the request
@@ -1,44 +1,67 @@
+from concurrent.futures import TimeoutError as FutureTimeout
+from datetime import datetime
+
+from flask import current_app
 from flask_restx import Namespace, Resource
-from flask import jsonify
-import requests
-from flask_jwt_extended import jwt_required
+
 from app import db
-from app.models import Metric, Website  #Import Metric model
+from app.config import STATUS_WAIT_SECONDS
+from app.models import Website
+from app.routes.auth import token_required
+from app.utils.metric_store import record_metrics
+from app.utils.on_demand import OnDemandChecker, TooManyChecks
 
 status_ns = Namespace("status", description="Website status monitoring")
 
+_checker = None
+
+
+def get_checker(app):
+    """The process-wide on-demand checker, recording results as metrics through `app`."""
+    global _checker
+    if _checker is None:
+        def record(url, result, website_ids):
+            with app.app_context():
+                record_metrics([
+                    {
+                        "website_id": website_id,
+                        "response_time": result["response_time"] or 0,
+                        "uptime": 1.0 if result["status"] == "online" else 0.0,
+                        "timestamp": datetime.fromisoformat(result["checked_at"]),
+                    }
+                    for website_id in website_ids
+                ])
+        _checker = OnDemandChecker(on_result=record)
+    return _checker
+
+
 @status_ns.route("/<path:url>")
 class WebsiteStatus(Resource):
-    @jwt_required()
-    def get(self, url):
-        """Check website status, uptime, and response time, then store it in the database"""
+    @status_ns.response(200, "Check finished")
+    @status_ns.response(202, "Check still running; retry shortly")
+    @status_ns.response(400, "Not an http(s) URL")
+    @status_ns.response(429, "Too many checks in progress")
+    @token_required
+    def get(self, current_user, url):
+        """Check website status and response time; stored as a metric when it is one of the user's sites"""
+        if not url.startswith(("http://", "https://")):
+            return {"error": "URL must start with http:// or https://"}, 400
+
+        # Served by the (user_id, url) index
+        website_id = db.session.execute(
+            db.select(Website.id).where(Website.user_id == current_user.id, Website.url == url)
+        ).scalar()
+        # Don't hold a pooled connection while waiting on the probe
+        db.session.remove()
+
+        try:
+            future = get_checker(current_app._get_current_object()).check(url, website_id)
+        except TooManyChecks:
+            return {"error": "Too many checks in progress, try again shortly"}, 429, {"Retry-After": "1"}
+
         try:
-            response = requests.get(url, timeout=5)
-            status_code = response.status_code
-            response_time = response.elapsed.total_seconds() * 1000  #Convert to ms
-            is_online = 1.0 if status_code == 200 else 0.0
-
-            # Find the website ID from the database
-            website = Website.query.filter_by(url=url).first()
-            if website:
-                #Save metric to database
-                new_metric = Metric(
-                    website_id=website.id,
-                    response_time=response_time,
-                    uptime=is_online  #Store as True (1) or False (0)
-                )
-                db.session.add(new_metric)
-                db.session.commit()
-
-            return {
-                "status": "online" if is_online else "offline",
-                "response_time": response_time,
-                "status_code": status_code
-            }, 200
-
-        except requests.exceptions.RequestException:
-            return {
-                "status": "offline",
-                "response_time": None,
-                "status_code": None
-            }, 200
+            # Cached or coalesced results are ready; otherwise this waits at most STATUS_WAIT_SECONDS (0 by default)
+            return future.result(timeout=STATUS_WAIT_SECONDS), 200
+        except FutureTimeout:
+            # The probe keeps running; a retry within the cache window gets its result
+            return {"status": "pending"}, 202, {"Retry-After": "1"}
@@ -2,6 +2,7 @@ from flask_restx import Namespace, Resource, fields
 from flask import request, jsonify
 from app import db
 from app.routes.auth import token_required
+from app.utils.versioning import bump_user_versions, versioned
 
 
 websites_ns = Namespace("websites", description="Manage Websites")
@@ -37,6 +38,17 @@ update_website_model = websites_ns.model(
     },
 )
 
+bulk_result_model = websites_ns.model(
+    "BulkImportResult",
+    {
+        "created": fields.Integer,
+        "duplicates": fields.Integer,
+        "failed": fields.Integer,
+        "websites": fields.List(fields.Nested(website_model)),
+        "errors": fields.List(fields.Raw),
+    },
+)
+
 delete_website_model = websites_ns.model(
     "DeleteWebsite",
     {"website_id": fields.Integer(required=True, description="Website ID")},
@@ -65,6 +77,7 @@ class AddWebsite(Resource):
         new_website = Website(user_id=current_user.id, url=url, name=name, frequency=frequency)
 
         db.session.add(new_website)
+        bump_user_versions([current_user.id])
         db.session.commit()
 
         return {
@@ -87,28 +100,33 @@ class AddWebsite(Resource):
 @websites_ns.route('', '/')
 class GetWebsites(Resource):
     @websites_ns.response(200, "Websites Retrieved Successfully!", [website_model])
+    @websites_ns.response(304, "Not Modified")
     @token_required
+    @versioned
     def get(self, current_user):
         """Retrieve all monitored websites for the user"""
-        from app.models import Website, Metric
+        from app.models import Website, LatestStatus
 
-        # Query user's websites
-        websites = Website.query.filter_by(user_id=current_user.id).all()
+        # One query: websites joined to their latest status
+        rows = db.session.execute(
+            db.select(Website.id, Website.url, Website.name, Website.frequency,
+                      LatestStatus.uptime, LatestStatus.response_time)
+            .outerjoin(LatestStatus, LatestStatus.website_id == Website.id)
+            .where(Website.user_id == current_user.id)
+        ).all()
 
         # Serialize data
-        websites_data = []
-        for website in websites:
-            # Fetch latest metric for each website
-            latest_metric = Metric.query.filter_by(website_id=website.id).order_by(Metric.timestamp.desc()).first()
-
-            websites_data.append({
-                "id": website.id,
-                "url": website.url,
-                "name": website.name,
-                "frequency": website.frequency,
-                "uptime": latest_metric.uptime if latest_metric else 0,
-                "response_time": latest_metric.response_time if latest_metric else "N/A",
-            })
+        websites_data = [
+            {
+                "id": row.id,
+                "url": row.url,
+                "name": row.name,
+                "frequency": row.frequency,
+                "uptime": row.uptime if row.uptime is not None else 0,
+                "response_time": row.response_time if row.response_time is not None else "N/A",
+            }
+            for row in rows
+        ]
 
         return websites_data, 200
 
@@ -135,6 +153,7 @@ class GetWebsites(Resource):
         )
 
         db.session.add(new_website)
+        bump_user_versions([current_user.id])
         db.session.commit()
 
         return {
@@ -144,6 +163,38 @@ class GetWebsites(Resource):
             "frequency": new_website.frequency,
         }, 201
 
+#Bulk import websites
+@websites_ns.route("/bulk")
+class BulkImportWebsites(Resource):
+    @websites_ns.response(201, "Websites Imported", bulk_result_model)
+    @websites_ns.response(200, "Nothing New To Import", bulk_result_model)
+    @websites_ns.response(400, "Unreadable Request Body")
+    @token_required
+    def post(self, current_user):
+        """Import many websites at once.
+
+        Body: a JSON list (or {"websites": [...]}) of {url, name?, frequency?},
+        NDJSON (application/x-ndjson) or CSV (text/csv) with a url column.
+        URLs are normalized and de-duplicated against the user's sites; bad rows
+        are reported individually and don't stop the import.
+        """
+        from app.utils.bulk_import import import_websites, iter_rows
+        from app.monitor import schedule_websites
+
+        try:
+            summary = import_websites(current_user.id, iter_rows(request.stream, request.content_type or ""))
+        except (ValueError, UnicodeDecodeError) as e:
+            db.session.rollback()
+            return {"error": f"Could not read the import: {str(e)}"}, 400
+
+        if summary["created"]:
+            bump_user_versions([current_user.id])
+        db.session.commit()
+        schedule_websites([website["id"] for website in summary["websites"]])
+
+        return summary, 201 if summary["created"] else 200
+
+
 #Update Website
 @websites_ns.route("/update")
 class UpdateWebsite(Resource):
@@ -179,6 +230,7 @@ class UpdateWebsite(Resource):
             website.frequency = frequency
 
         # Commit changes
+        bump_user_versions([current_user.id])
         db.session.commit()
 
         return {
@@ -201,7 +253,7 @@ class DeleteWebsite(Resource):
     @token_required
     def delete(self, current_user, website_id):
         """Delete a monitored website"""
-        from app.models import Website, Metric, Alert  # Import here to avoid circular dependencies
+        from app.models import Website, Metric, MetricRollup, MetricChunk, MetricTiming, LatestStatus, Alert  # Import here to avoid circular dependencies
 
         # Query database for website
         website = Website.query.filter_by(id=website_id, user_id=current_user.id).first()
@@ -210,10 +262,15 @@ class DeleteWebsite(Resource):
 
         # Delete related metrics and alerts
         Metric.query.filter_by(website_id=website.id).delete()
+        MetricRollup.query.filter_by(website_id=website.id).delete()
+        MetricChunk.query.filter_by(website_id=website.id).delete()
+        MetricTiming.query.filter_by(website_id=website.id).delete()
+        LatestStatus.query.filter_by(website_id=website.id).delete()
         Alert.query.filter_by(website_id=website.id).delete()
 
         # Delete website
         db.session.delete(website)
+        bump_user_versions([current_user.id])
         db.session.commit()
 
         return {"message": "Website deleted successfully!"}, 200
@@ -0,0 +1,64 @@
+import asyncio
+import threading
+
+from app.utils.logger import logger
+
+
+class BackgroundLoop:
+    """A persistent asyncio event loop running in its own daemon thread."""
+
+    def __init__(self, name="watchly-loop"):
+        self.name = name
+        self.loop = None
+        self._thread = None
+        self._ready = threading.Event()
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        """Start the loop thread (no-op if it is already running)."""
+        if self.running:
+            return
+        self._ready.clear()
+        self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+        self._thread.start()
+        self._ready.wait()
+
+    def _run(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        self._ready.set()
+        try:
+            self.loop.run_forever()
+        finally:
+            #Cancel whatever is left so coroutines get a chance to clean up
+            pending = asyncio.all_tasks(self.loop)
+            for task in pending:
+                task.cancel()
+            if pending:
+                self.loop.run_until_complete(asyncio.gather(*pending, return_exceptions=True))
+            self.loop.run_until_complete(self.loop.shutdown_asyncgens())
+            self.loop.close()
+
+    def submit(self, coro):
+        """Schedule a coroutine on the loop from any thread; returns a concurrent Future."""
+        if not self.running:
+            raise RuntimeError(f"{self.name} is not running")
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def call_soon(self, callback, *args):
+        """Run a plain callback on the loop thread."""
+        if not self.running:
+            raise RuntimeError(f"{self.name} is not running")
+        self.loop.call_soon_threadsafe(callback, *args)
+
+    def stop(self, timeout=None):
+        """Stop the loop and wait for the thread to exit."""
+        if not self.running:
+            return
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join(timeout)
+        if self._thread.is_alive():
+            logger.warning("⚠️ %s did not stop within %ss", self.name, timeout)
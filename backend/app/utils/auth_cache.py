@@ -0,0 +1,82 @@
+import threading
+import time
+
+from sqlalchemy import inspect
+from sqlalchemy.orm import make_transient_to_detached
+
+from app.config import AUTH_CACHE_SIZE, AUTH_CACHE_TTL_SECONDS
+from app.utils.cache import TTLCache
+
+
+class AuthCache:
+    """Verified JWTs and user rows, so authenticated reads skip decode and the user lookup.
+
+    Entries live at most `ttl` seconds (and never past the token's own exp).
+    The cache is per process: invalidate_user() is called on password change,
+    profile update and account deletion, and the TTL bounds how long other
+    workers can serve a stale copy.
+    """
+
+    def __init__(self, max_size=AUTH_CACHE_SIZE, ttl=AUTH_CACHE_TTL_SECONDS):
+        self.ttl = ttl
+        self._tokens = TTLCache(max_size)   # token -> user_id
+        self._users = TTLCache(max_size)    # user_id -> column values
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0}
+
+    @property
+    def enabled(self):
+        return self.ttl > 0 and self._tokens.max_size > 0
+
+    def get_user_id(self, token):
+        if not self.enabled:
+            return None
+        with self._lock:
+            user_id = self._tokens.get(token, time.monotonic())
+        self.stats["hits" if user_id is not None else "misses"] += 1
+        return user_id
+
+    def put_token(self, token, user_id, token_exp=None):
+        if not self.enabled:
+            return
+        now = time.monotonic()
+        expires_at = now + self.ttl
+        if token_exp is not None:
+            expires_at = min(expires_at, now + (token_exp - time.time()))
+        with self._lock:
+            self._tokens.put(token, user_id, expires_at)
+
+    def get_user(self, session, model, user_id):
+        """Attach a cached user to `session` without a query (None on miss)."""
+        if not self.enabled:
+            return None
+        with self._lock:
+            values = self._users.get(user_id, time.monotonic())
+        if values is None:
+            return None
+        user = model(**values)
+        make_transient_to_detached(user)
+        return session.merge(user, load=False)
+
+    def put_user(self, user):
+        if not self.enabled:
+            return
+        values = {column.key: getattr(user, column.key) for column in inspect(user).mapper.column_attrs}
+        with self._lock:
+            self._users.put(user.id, values, time.monotonic() + self.ttl)
+
+    def invalidate_user(self, user_id):
+        """Forget a user and every token that resolved to them."""
+        with self._lock:
+            self._users.pop(user_id)
+            stale = [token for token, cached_id in self._tokens.items() if cached_id == user_id]
+            for token in stale:
+                self._tokens.pop(token)
+
+    def clear(self):
+        with self._lock:
+            self._tokens.clear()
+            self._users.clear()
+
+
+auth_cache = AuthCache()
@@ -0,0 +1,140 @@
+import codecs
+import csv
+import json
+from urllib.parse import urlsplit, urlunsplit
+
+from app import db
+from app.config import BULK_IMPORT_BATCH_SIZE, BULK_IMPORT_MAX_ROWS
+from app.models import Website
+from app.utils.scheduler import ALLOWED_FREQUENCIES, DEFAULT_FREQUENCY
+
+_DEFAULT_PORTS = {"http": 80, "https": 443}
+_URL_MAX = Website.__table__.c.url.type.length
+_NAME_MAX = Website.__table__.c.name.type.length
+
+
+def normalize_url(raw):
+    """Canonical form used for validation and de-duplication; raises ValueError."""
+    if raw is not None and not isinstance(raw, str):
+        raise ValueError("URL must be a string")
+    url = (raw or "").strip()
+    if not url:
+        raise ValueError("URL is required")
+    if "://" not in url:
+        url = "https://" + url
+    parts = urlsplit(url)
+    scheme = parts.scheme.lower()
+    if scheme not in _DEFAULT_PORTS:
+        raise ValueError("URL must use http or https")
+    host = (parts.hostname or "").rstrip(".")
+    if not host or " " in host or "." not in host and ":" not in host and host != "localhost":
+        raise ValueError("URL has no valid host")
+    try:
+        port = parts.port
+    except ValueError:
+        raise ValueError("URL has an invalid port")
+    if ":" in host:
+        host = f"[{host}]"   # IPv6 literals keep their brackets
+    netloc = host if port in (None, _DEFAULT_PORTS[scheme]) else f"{host}:{port}"
+    path = parts.path if parts.path not in ("", "/") else ""
+    normalized = urlunsplit((scheme, netloc, path, parts.query, ""))
+    if len(normalized) > _URL_MAX:
+        raise ValueError(f"URL is longer than {_URL_MAX} characters")
+    return normalized
+
+
+def iter_rows(stream, content_type):
+    """Yield (row_number, dict) from a JSON, NDJSON or CSV request body.
+
+    NDJSON and CSV are read line by line from the stream, so large imports
+    never sit in memory whole; a JSON body is parsed at once.
+    """
+    if "csv" in content_type:
+        reader = csv.DictReader(codecs.iterdecode(stream, "utf-8-sig"))
+        for number, row in enumerate(reader, start=1):
+            yield number, {key.strip().lower(): (value or "").strip() for key, value in row.items() if key}
+    elif "ndjson" in content_type or "jsonl" in content_type:
+        for number, line in enumerate(stream, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield number, json.loads(line)
+            except ValueError:
+                yield number, {"__error__": "Invalid JSON line"}
+    else:
+        data = json.load(stream)
+        if isinstance(data, dict):
+            data = data.get("websites", [])
+        if not isinstance(data, list):
+            raise ValueError("expected a JSON list of websites")
+        for number, row in enumerate(data, start=1):
+            yield number, row if isinstance(row, dict) else {"url": row}
+
+
+def _parse_row(row):
+    """Validate one input row -> (url, name, frequency); raises ValueError."""
+    if "__error__" in row:
+        raise ValueError(row["__error__"])
+    url = normalize_url(row.get("url"))
+    name = row.get("name") or ""
+    if not isinstance(name, str):
+        raise ValueError("Name must be a string")
+    name = name.strip() or urlsplit(url).hostname
+    if len(name) > _NAME_MAX:
+        raise ValueError(f"Name is longer than {_NAME_MAX} characters")
+    frequency = row.get("frequency") or DEFAULT_FREQUENCY
+    if isinstance(frequency, bool) or not isinstance(frequency, (int, float, str)):
+        raise ValueError("Frequency must be a whole number")
+    try:
+        frequency = int(frequency)
+    except ValueError:
+        raise ValueError("Frequency must be a whole number")
+    #Same values the frequency API accepts
+    if frequency not in ALLOWED_FREQUENCIES:
+        raise ValueError(f"Frequency must be one of {', '.join(map(str, ALLOWED_FREQUENCIES))} seconds")
+    return url, name, frequency
+
+
+def import_websites(user_id, rows, batch_size=BULK_IMPORT_BATCH_SIZE, max_rows=BULK_IMPORT_MAX_ROWS):
+    """Validate, de-duplicate and batch-insert websites for a user (caller commits).
+
+    Returns a summary with the created websites and per-row errors.
+    """
+    known = set()
+    for (url,) in db.session.execute(db.select(Website.url).where(Website.user_id == user_id)):
+        try:
+            known.add(normalize_url(url))
+        except ValueError:
+            known.add(url)
+
+    created, errors, duplicates, batch = [], [], 0, []
+
+    def flush():
+        if batch:
+            for website_id, url, name, frequency in db.session.execute(
+                db.insert(Website).returning(Website.id, Website.url, Website.name, Website.frequency), batch
+            ).all():
+                created.append({"id": website_id, "url": url, "name": name, "frequency": frequency})
+            batch.clear()
+
+    for number, row in rows:
+        if number > max_rows:
+            errors.append({"row": number, "error": f"Import is limited to {max_rows} rows; the rest was skipped"})
+            break
+        try:
+            url, name, frequency = _parse_row(row if isinstance(row, dict) else {})
+        except ValueError as e:
+            errors.append({"row": number, "url": row.get("url") if isinstance(row, dict) else None, "error": str(e)})
+            continue
+        if url in known:
+            duplicates += 1
+            continue
+        known.add(url)
+        batch.append({"user_id": user_id, "url": url, "name": name, "frequency": frequency})
+        if len(batch) >= batch_size:
+            flush()
+    flush()
+
+    return {"created": len(created), "duplicates": duplicates, "failed": len(errors),
+            "websites": created, "errors": errors}
@@ -0,0 +1,39 @@
+from collections import OrderedDict
+
+
+class TTLCache:
+    """Bounded LRU of (value, expires_at) with lazy TTL expiry. Not thread-safe; callers lock."""
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self._data = OrderedDict()
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, key, now):
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at <= now:
+            del self._data[key]
+            return None
+        self._data.move_to_end(key)
+        return value
+
+    def put(self, key, value, expires_at):
+        self._data[key] = (value, expires_at)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_size:
+            self._data.popitem(last=False)
+
+    def items(self):
+        """(key, value) pairs, expired ones included."""
+        return [(key, value) for key, (value, _) in self._data.items()]
+
+    def pop(self, key):
+        return self._data.pop(key, None)
+
+    def clear(self):
+        self._data.clear()
@@ -0,0 +1,106 @@
+import zlib
+
+#Compressed encoding for one site's run of probe results.
+#  header   : version byte, varint point count
+#  timestamp: epoch ms of the first point, then the first delta, then
+#             delta-of-deltas (all zigzag varints; regular probes encode as 0s)
+#  uptime   : one bit per point
+#  latency  : response time quantized to LATENCY_QUANTUM_MS, delta-encoded
+#The whole payload is then zlib-compressed, which squeezes the runs of zeros.
+VERSION = 1
+LATENCY_QUANTUM_MS = 0.1
+
+
+def _zigzag(n):
+    return (n << 1) ^ (n >> 63)
+
+
+def _unzigzag(n):
+    return (n >> 1) ^ -(n & 1)
+
+
+def _put_varint(out, n):
+    while n > 0x7F:
+        out.append((n & 0x7F) | 0x80)
+        n >>= 7
+    out.append(n)
+
+
+def _get_varint(data, pos):
+    result = shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        result |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return result, pos
+        shift += 7
+
+
+def encode_points(points):
+    """points: [(epoch_ms, up, latency_ms)] sorted by time -> compressed bytes.
+
+    Lossy only where it doesn't matter: uptime becomes a flag and latency is
+    rounded to LATENCY_QUANTUM_MS.
+    """
+    out = bytearray([VERSION])
+    _put_varint(out, len(points))
+
+    prev_ts = prev_delta = 0
+    for index, (ts, _, _) in enumerate(points):
+        if index == 0:
+            _put_varint(out, ts)
+        else:
+            delta = ts - prev_ts
+            _put_varint(out, _zigzag(delta if index == 1 else delta - prev_delta))
+            prev_delta = delta
+        prev_ts = ts
+
+    bits = bytearray((len(points) + 7) // 8)
+    for index, (_, up, _) in enumerate(points):
+        if up:
+            bits[index >> 3] |= 1 << (index & 7)
+    out += bits
+
+    prev = 0
+    for _, _, latency in points:
+        quantized = int(round((latency or 0) / LATENCY_QUANTUM_MS))
+        _put_varint(out, _zigzag(quantized - prev))
+        prev = quantized
+
+    return zlib.compress(bytes(out), 6)
+
+
+def decode_points(blob):
+    """Inverse of encode_points: compressed bytes -> [(epoch_ms, up, latency_ms)]."""
+    data = zlib.decompress(blob)
+    if data[0] != VERSION:
+        raise ValueError(f"Unknown chunk version {data[0]}")
+    count, pos = _get_varint(data, 1)
+
+    timestamps = []
+    prev_ts = prev_delta = 0
+    for index in range(count):
+        value, pos = _get_varint(data, pos)
+        if index == 0:
+            ts = value
+        elif index == 1:
+            prev_delta = _unzigzag(value)
+            ts = prev_ts + prev_delta
+        else:
+            prev_delta += _unzigzag(value)
+            ts = prev_ts + prev_delta
+        timestamps.append(ts)
+        prev_ts = ts
+
+    bits = data[pos:pos + (count + 7) // 8]
+    pos += len(bits)
+
+    points = []
+    prev = 0
+    for index in range(count):
+        value, pos = _get_varint(data, pos)
+        prev += _unzigzag(value)
+        up = bool(bits[index >> 3] & (1 << (index & 7)))
+        points.append((timestamps[index], up, round(prev * LATENCY_QUANTUM_MS, 3)))
+    return points
@@ -0,0 +1,160 @@
+import threading
+import time
+
+from sqlalchemy import event, text
+from sqlalchemy.exc import OperationalError, TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import NullPool, QueuePool
+
+from app.config import (
+    DB_POOL_CLASS,
+    DB_POOL_SIZE,
+    DB_MAX_OVERFLOW,
+    DB_POOL_TIMEOUT,
+    DB_POOL_RECYCLE,
+    DB_POOL_PRE_PING,
+    DB_CONNECT_RETRIES,
+    DB_CONNECT_BACKOFF_SECONDS,
+    DB_CONNECT_TIMEOUT,
+)
+from app.utils.logger import logger
+
+
+class PoolStats:
+    """Checkout counters shared by every pool the engine creates (dispose() recreates it)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.checkouts = 0
+        self.no_idle = 0           # Checkouts that had to wait or open a new connection
+        self.wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+        self.timeouts = 0
+        self.connects = 0
+        self.connect_retries = 0
+        self.connect_seconds = 0.0
+
+    def record_checkout(self, wait, had_idle):
+        with self._lock:
+            self.checkouts += 1
+            if not had_idle:
+                self.no_idle += 1
+            self.wait_seconds += wait
+            self.max_wait_seconds = max(self.max_wait_seconds, wait)
+
+    def record_timeout(self):
+        with self._lock:
+            self.timeouts += 1
+
+    def record_connect(self, seconds, retries):
+        with self._lock:
+            self.connects += 1
+            self.connect_retries += retries
+            self.connect_seconds += seconds
+
+    def as_dict(self):
+        with self._lock:
+            return {
+                "checkouts": self.checkouts,
+                "checkouts_no_idle": self.no_idle,
+                "avg_wait_ms": 1000 * self.wait_seconds / self.checkouts if self.checkouts else 0.0,
+                "max_wait_ms": 1000 * self.max_wait_seconds,
+                "timeouts": self.timeouts,
+                "connects": self.connects,
+                "connect_retries": self.connect_retries,
+                "avg_connect_ms": 1000 * self.connect_seconds / self.connects if self.connects else 0.0,
+            }
+
+
+pool_stats = PoolStats()
+
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool that records how long each checkout waited for a connection."""
+
+    def _do_get(self):
+        had_idle = self.checkedin() > 0
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            pool_stats.record_timeout()
+            raise
+        finally:
+            pool_stats.record_checkout(time.perf_counter() - start, had_idle)
+
+
+def engine_options(database_url):
+    """SQLAlchemy engine options for a database URL, from the DB_* settings."""
+    if database_url.startswith("sqlite"):
+        return {"pool_pre_ping": DB_POOL_PRE_PING}
+    if DB_POOL_CLASS == "null":
+        # For an external transaction pooler (pgbouncer) that already pools connections
+        return {"poolclass": NullPool, "pool_pre_ping": DB_POOL_PRE_PING,
+                "connect_args": {"connect_timeout": DB_CONNECT_TIMEOUT}}
+    return {
+        "poolclass": InstrumentedQueuePool,
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,   # Recycle before Neon/proxies drop idle connections
+        "pool_pre_ping": DB_POOL_PRE_PING,
+        "pool_use_lifo": True,             # Reuse warm connections; let extras idle out
+        "connect_args": {"connect_timeout": DB_CONNECT_TIMEOUT},
+    }
+
+
+def install_connect_retry(engine, retries=DB_CONNECT_RETRIES, backoff=DB_CONNECT_BACKOFF_SECONDS):
+    """Retry new connections while a scaled-to-zero (Neon) database wakes up."""
+
+    @event.listens_for(engine, "do_connect")
+    def connect_with_retry(dialect, conn_rec, cargs, cparams):
+        start = time.perf_counter()
+        for attempt in range(retries + 1):
+            try:
+                connection = dialect.connect(*cargs, **cparams)
+            except dialect.loaded_dbapi.OperationalError as e:
+                if attempt == retries:
+                    raise
+                delay = backoff * 2 ** attempt
+                logger.warning("🚀 Database is waking up (%s); retrying in %.1fs...", str(e).strip(), delay)
+                time.sleep(delay)
+                continue
+            pool_stats.record_connect(time.perf_counter() - start, attempt)
+            return connection
+
+
+def warm_up(engine, connections):
+    """Open `connections` pooled connections now, so the first requests don't pay for them."""
+    if connections <= 0:
+        return 0
+    opened = []
+    try:
+        for _ in range(connections):
+            conn = engine.connect()
+            conn.execute(text("SELECT 1"))
+            opened.append(conn)
+    except OperationalError as e:
+        logger.error("❌ Database warm-up stopped after %d connections: %s", len(opened), e)
+    finally:
+        for conn in opened:
+            conn.close()
+    logger.info("🔥 Warmed up %d database connections", len(opened))
+    return len(opened)
+
+
+def pool_status(engine):
+    """Pool occupancy plus checkout/connect statistics."""
+    pool = engine.pool
+    status = {"pool": type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        status.update({
+            "size": pool.size(),
+            "checked_in": pool.checkedin(),
+            "checked_out": pool.checkedout(),
+            "overflow": pool.overflow(),
+        })
+    status.update(pool_stats.as_dict())
+    return status
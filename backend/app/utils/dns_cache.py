@@ -0,0 +1,104 @@
+import asyncio
+import ipaddress
+import socket
+import time
+
+import httpcore
+
+from app.config import DNS_CACHE_SECONDS, DNS_CACHE_SIZE
+from app.utils.cache import TTLCache
+from app.utils import telemetry
+
+DNS_LOOKUPS = telemetry.registry.counter("watchly_dns_lookups_total", "Probe host lookups.", ["result"])
+
+
+class DNSCache:
+    """Resolved addresses per host, reused for `ttl` seconds.
+
+    getaddrinfo() doesn't expose record TTLs, so one fixed TTL applies to
+    every host. Concurrent lookups of the same host share one resolution.
+    """
+
+    def __init__(self, ttl=DNS_CACHE_SECONDS, max_size=DNS_CACHE_SIZE):
+        self.ttl = ttl
+        self._cache = TTLCache(max_size)
+        self._pending = {}      # host -> Future of an in-flight lookup
+
+    async def resolve(self, host, port, timeout=None, timer=None):
+        """Addresses for host; the time spent resolving is added to timer.dns."""
+        now = time.monotonic()
+        addresses = self._cache.get(host, now)
+        if addresses is not None:
+            DNS_LOOKUPS.inc(result="hit")
+            return addresses
+
+        started = time.perf_counter()
+        pending = self._pending.get(host)
+        if pending is None:
+            pending = self._pending[host] = asyncio.ensure_future(self._lookup(host, port))
+            pending.add_done_callback(lambda future: future.cancelled() or future.exception())  # Never "unretrieved"
+        try:
+            addresses = await asyncio.wait_for(asyncio.shield(pending), timeout)
+        except asyncio.TimeoutError:
+            DNS_LOOKUPS.inc(result="timeout")
+            raise httpcore.ConnectTimeout(f"DNS lookup for {host} timed out")
+        except OSError as e:
+            DNS_LOOKUPS.inc(result="error")
+            raise httpcore.ConnectError(f"DNS lookup for {host} failed: {e}")
+        finally:
+            if timer is not None:
+                timer.dns += time.perf_counter() - started
+
+        DNS_LOOKUPS.inc(result="miss")
+        self._cache.put(host, addresses, time.monotonic() + self.ttl)
+        return addresses
+
+    async def _lookup(self, host, port):
+        try:
+            infos = await asyncio.get_running_loop().getaddrinfo(host, port, type=socket.SOCK_STREAM)
+        finally:
+            self._pending.pop(host, None)
+        #Keep resolver order (it already prefers what the host can reach), drop duplicates
+        return list(dict.fromkeys(info[4][0] for info in infos))
+
+    def evict(self, host):
+        self._cache.pop(host)
+
+    def clear(self):
+        self._cache.clear()
+
+
+class CachingNetworkBackend(httpcore.AsyncNetworkBackend):
+    """httpcore network backend that resolves hosts through a DNSCache.
+
+    Connecting by address keeps TLS intact: httpcore still passes the original
+    host name for SNI and certificate checks.
+    """
+
+    def __init__(self, dns_cache, timer_var, backend=None, max_addresses=2):
+        self.dns_cache = dns_cache
+        self.timer_var = timer_var
+        self.backend = backend or httpcore.AnyIOBackend()
+        self.max_addresses = max_addresses
+
+    async def connect_tcp(self, host, port, timeout=None, local_address=None, socket_options=None):
+        try:
+            ipaddress.ip_address(host)
+            addresses = [host]
+        except ValueError:
+            addresses = await self.dns_cache.resolve(host, port, timeout, self.timer_var.get())
+        error = None
+        for address in addresses[:self.max_addresses]:
+            try:
+                return await self.backend.connect_tcp(address, port, timeout, local_address, socket_options)
+            except (httpcore.ConnectError, httpcore.ConnectTimeout) as e:
+                error = e
+        # The host may have moved: resolve again next time
+        self.dns_cache.evict(host)
+        raise error
+
+    async def connect_unix_socket(self, path, timeout=None, socket_options=None):
+        return await self.backend.connect_unix_socket(path, timeout, socket_options)
+
+    async def sleep(self, seconds):
+        await self.backend.sleep(seconds)
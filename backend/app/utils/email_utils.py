@@ -2,6 +2,7 @@ import os
 import asyncio
 import requests
 import httpx
+from concurrent.futures import ThreadPoolExecutor
 from sendgrid import SendGridAPIClient
 from sendgrid.helpers.mail import Mail
 from dotenv import load_dotenv
@@ -21,9 +22,14 @@ if not FROM_EMAIL:
     logger.error("❌ ERROR: FROM_EMAIL is missing! Make sure it's a verified sender in SendGrid.")
     exit(1)
 
-async def send_email_via_cloudflare(to_email, subject, message):
+# SendGrid's client is blocking, so it gets its own small pool instead of the default executor
+_sendgrid_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="sendgrid")
+_sendgrid_client = None
+
+async def send_email_via_cloudflare(to_email, subject, message, client=None):
     """
     Sends an email using Cloudflare Worker as a proxy.
+    Pass a long-lived httpx.AsyncClient to reuse its connections.
     """
     data = {
         "to": to_email,
@@ -31,20 +37,28 @@ async def send_email_via_cloudflare(to_email, subject, message):
         "message": message
     }
 
-    async with httpx.AsyncClient() as client:
-        try:
-            response = await client.post(CLOUDFLARE_WORKER_URL, json=data)
-            logger.info(f"📨 Cloudflare Worker Response: {response.status_code}, {response.text}")
-            return response.status_code == 200  # Return True if success
-        except Exception as e:
-            logger.error(f"❌ Failed to send email via Cloudflare: {str(e)}")
-            return False
+    if client is None:
+        async with httpx.AsyncClient() as client:
+            return await _post_to_cloudflare(client, data)
+    return await _post_to_cloudflare(client, data)
+
+async def _post_to_cloudflare(client, data):
+    try:
+        response = await client.post(CLOUDFLARE_WORKER_URL, json=data)
+        logger.info(f"📨 Cloudflare Worker Response: {response.status_code}, {response.text}")
+        return response.status_code == 200  # Return True if success
+    except Exception as e:
+        logger.error(f"❌ Failed to send email via Cloudflare: {str(e)}")
+        return False
 
-async def send_email_via_sendgrid(to_email, subject, message):
+async def send_email_via_sendgrid(to_email, subject, message, max_retries=3):
     """
     Sends an email directly via SendGrid.
     """
-    sg = SendGridAPIClient(SENDGRID_API_KEY)
+    global _sendgrid_client
+    if _sendgrid_client is None:
+        _sendgrid_client = SendGridAPIClient(SENDGRID_API_KEY)
+    sg = _sendgrid_client
     email = Mail(
         from_email=FROM_EMAIL,
         to_emails=to_email,
@@ -52,12 +66,11 @@ async def send_email_via_sendgrid(to_email, subject, message):
         plain_text_content=message
     )
 
-    loop = asyncio.get_event_loop()
-    max_retries = 3  # Retry up to 3 times
+    loop = asyncio.get_running_loop()
 
     for attempt in range(max_retries):
         try:
-            response = await loop.run_in_executor(None, sg.send, email)
+            response = await loop.run_in_executor(_sendgrid_executor, sg.send, email)
             logger.info(f"✅ Email Sent via SendGrid! Status Code: {response.status_code}")
             return True
         except Exception as e:
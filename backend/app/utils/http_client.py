@@ -0,0 +1,274 @@
+import asyncio
+import contextlib
+import contextvars
+import importlib.util
+import ssl
+import time
+from urllib.parse import urlsplit
+
+import certifi
+import httpcore
+import httpx
+
+from app.config import (
+    PROBE_TIMEOUT,
+    PROBE_MAX_CONNECTIONS,
+    PROBE_MAX_KEEPALIVE,
+    PROBE_KEEPALIVE_EXPIRY,
+    PROBE_MAX_PER_HOST,
+    PROBE_HTTP2,
+    DNS_CACHE_SECONDS,
+)
+from app.utils.dns_cache import DNSCache, CachingNetworkBackend
+from app.utils.logger import logger
+
+#Loading the CA bundle is the expensive part of TLS setup, so do it once per process
+_ssl_context = None
+
+
+def get_ssl_context():
+    global _ssl_context
+    if _ssl_context is None:
+        _ssl_context = ssl.create_default_context(cafile=certifi.where())
+    return _ssl_context
+
+
+def http2_available():
+    """HTTP/2 needs the optional 'h2' package (pip install httpx[http2])."""
+    return importlib.util.find_spec("h2") is not None
+
+
+#The probe being timed in the current task, so the DNS cache can report into it
+_current_timer = contextvars.ContextVar("probe_timer", default=None)
+
+
+class ProbeTimer:
+    """Per-phase timings of one probe, fed by httpcore trace events and the DNS cache.
+
+    Phases of every hop of a redirect chain add up. Connect time excludes DNS.
+    """
+
+    __slots__ = ("dns", "connect", "tls", "ttfb", "body", "_marks")
+
+    def __init__(self):
+        self.dns = self.connect = self.tls = self.ttfb = self.body = 0.0
+        self._marks = {}
+
+    async def trace(self, event_name, info):
+        now = time.perf_counter()
+        step, _, state = event_name.rpartition(".")
+        step = step.rpartition(".")[2]      # "http11.receive_response_body" -> "receive_response_body"
+        if state == "started":
+            self._marks[step] = now
+            return
+        if state not in ("complete", "failed"):
+            return
+        if step == "receive_response_headers":
+            #TTFB runs from the first request byte to the response headers
+            started = self._marks.pop("send_request_headers", None)
+        elif step in ("connect_tcp", "start_tls", "receive_response_body"):
+            started = self._marks.pop(step, None)
+        else:
+            return
+        if started is None:
+            return
+        if step == "connect_tcp":
+            self.connect += now - started
+        elif step == "start_tls":
+            self.tls += now - started
+        elif step == "receive_response_headers":
+            self.ttfb += now - started
+        elif step == "receive_response_body":
+            self.body += now - started
+
+    def as_dict(self):
+        """Milliseconds per phase; None for phases that didn't happen (cached DNS, reused connection)."""
+        connect = max(self.connect - self.dns, 0.0) if self.connect else 0.0
+        return {
+            f"{name}_ms": round(value * 1000, 2) if value else None
+            for name, value in (("dns", self.dns), ("connect", connect), ("tls", self.tls),
+                                ("ttfb", self.ttfb), ("body", self.body))
+        }
+
+
+#httpcore errors -> the httpx errors callers catch, most specific first
+_ERRORS = [
+    (httpcore.ConnectTimeout, httpx.ConnectTimeout),
+    (httpcore.ReadTimeout, httpx.ReadTimeout),
+    (httpcore.WriteTimeout, httpx.WriteTimeout),
+    (httpcore.PoolTimeout, httpx.PoolTimeout),
+    (httpcore.TimeoutException, httpx.TimeoutException),
+    (httpcore.ConnectError, httpx.ConnectError),
+    (httpcore.ReadError, httpx.ReadError),
+    (httpcore.WriteError, httpx.WriteError),
+    (httpcore.NetworkError, httpx.NetworkError),
+    (httpcore.ProxyError, httpx.ProxyError),
+    (httpcore.UnsupportedProtocol, httpx.UnsupportedProtocol),
+    (httpcore.LocalProtocolError, httpx.LocalProtocolError),
+    (httpcore.RemoteProtocolError, httpx.RemoteProtocolError),
+    (httpcore.ProtocolError, httpx.ProtocolError),
+]
+
+
+@contextlib.contextmanager
+def _httpx_errors():
+    try:
+        yield
+    except Exception as e:
+        for source, target in _ERRORS:
+            if isinstance(e, source):
+                raise target(str(e)) from e
+        raise
+
+
+class _PoolStream(httpx.AsyncByteStream):
+    def __init__(self, stream):
+        self._stream = stream
+
+    async def __aiter__(self):
+        with _httpx_errors():
+            async for part in self._stream:
+                yield part
+
+    async def aclose(self):
+        if hasattr(self._stream, "aclose"):
+            await self._stream.aclose()
+
+
+class PoolTransport(httpx.AsyncBaseTransport):
+    """httpx transport over an httpcore connection pool we build ourselves.
+
+    AsyncHTTPTransport doesn't take a network backend, so this is how the
+    probe pool gets the DNS-caching one.
+    """
+
+    def __init__(self, pool):
+        self.pool = pool
+
+    async def handle_async_request(self, request):
+        core_request = httpcore.Request(
+            method=request.method,
+            url=httpcore.URL(
+                scheme=request.url.raw_scheme,
+                host=request.url.raw_host,
+                port=request.url.port,
+                target=request.url.raw_path,
+            ),
+            headers=request.headers.raw,
+            content=request.stream,
+            extensions=request.extensions,
+        )
+        with _httpx_errors():
+            response = await self.pool.handle_async_request(core_request)
+        return httpx.Response(
+            status_code=response.status,
+            headers=response.headers,
+            stream=_PoolStream(response.stream),
+            extensions=response.extensions,
+        )
+
+    async def aclose(self):
+        await self.pool.aclose()
+
+
+class ProbeClient:
+    """Long-lived pooled httpx client shared by every probe in the process."""
+
+    def __init__(self, timeout=PROBE_TIMEOUT, max_connections=PROBE_MAX_CONNECTIONS,
+                 max_keepalive=PROBE_MAX_KEEPALIVE, keepalive_expiry=PROBE_KEEPALIVE_EXPIRY,
+                 max_per_host=PROBE_MAX_PER_HOST, http2=PROBE_HTTP2, dns_cache_seconds=DNS_CACHE_SECONDS):
+        self.timeout = timeout
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self.max_per_host = max_per_host
+        self.http2 = http2
+        if http2 and not http2_available():
+            logger.warning("⚠️ PROBE_HTTP2 is set but 'h2' is not installed, falling back to HTTP/1.1")
+            self.http2 = False
+        self.dns_cache = DNSCache(dns_cache_seconds) if dns_cache_seconds else None
+        self._client = None
+        self._host_slots = {}       # host -> [Semaphore, probes holding or waiting]; dropped when idle
+
+    @property
+    def client(self):
+        """The underlying httpx client, created on first use."""
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                transport=self._transport(),
+                timeout=self.timeout,
+                follow_redirects=True,
+            )
+        return self._client
+
+    def _transport(self):
+        if self.dns_cache is None:
+            return httpx.AsyncHTTPTransport(limits=self.limits, http2=self.http2, verify=get_ssl_context())
+        return PoolTransport(httpcore.AsyncConnectionPool(
+            ssl_context=get_ssl_context(),
+            max_connections=self.limits.max_connections,
+            max_keepalive_connections=self.limits.max_keepalive_connections,
+            keepalive_expiry=self.limits.keepalive_expiry,
+            http1=True,
+            http2=self.http2,
+            network_backend=CachingNetworkBackend(self.dns_cache, _current_timer),
+        ))
+
+    @contextlib.asynccontextmanager
+    async def _host_slot(self, url):
+        """Hold one of the host's max_per_host slots; waiting for it counts against the timeout."""
+        host = urlsplit(url).hostname or ""
+        entry = self._host_slots.get(host)
+        if entry is None:
+            entry = self._host_slots[host] = [asyncio.Semaphore(self.max_per_host), 0]
+        entry[1] += 1
+        try:
+            try:
+                await asyncio.wait_for(entry[0].acquire(), self.timeout)
+            except asyncio.TimeoutError:
+                raise httpx.PoolTimeout(f"No free connection slot for {host} within {self.timeout}s")
+            try:
+                yield
+            finally:
+                entry[0].release()
+        finally:
+            entry[1] -= 1
+            if not entry[1] and self._host_slots.get(host) is entry:
+                del self._host_slots[host]
+
+    async def probe(self, url, timer=None, **kwargs):
+        """GET a URL under the per-host limit; returns (response, seconds).
+
+        The seconds start once the host slot is held, so queueing behind other
+        probes of the same host isn't reported as a slow site. A failed request
+        carries the same measure as `probe_seconds` on its exception (absent
+        when the host slot itself timed out). A ProbeTimer collects phase timings.
+        """
+        if timer is not None:
+            kwargs["extensions"] = {"trace": timer.trace}
+        token = _current_timer.set(timer)
+        try:
+            async with self._host_slot(url):
+                started = time.perf_counter()
+                try:
+                    response = await self.client.get(url, **kwargs)
+                except httpx.HTTPError as e:
+                    e.probe_seconds = time.perf_counter() - started
+                    raise
+                return response, time.perf_counter() - started
+        finally:
+            _current_timer.reset(token)
+
+    async def get(self, url, timer=None, **kwargs):
+        """GET a URL, honouring the per-host connection limit."""
+        response, _ = await self.probe(url, timer=timer, **kwargs)
+        return response
+
+    async def aclose(self):
+        """Close pooled connections; the next request opens a fresh pool."""
+        if self._client is not None:
+            await self._client.aclose()
+        self._client = None
+        self._host_slots = {}
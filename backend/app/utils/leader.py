@@ -0,0 +1,165 @@
+import hashlib
+import os
+import threading
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.pool import NullPool
+
+from app.utils.logger import logger
+
+try:
+    import fcntl
+except ImportError:  # Windows has no flock; local runs there just become leader
+    fcntl = None
+
+
+def _lock_key(name):
+    """Stable signed 64-bit key for pg advisory locks."""
+    digest = hashlib.sha256(name.encode()).digest()
+    return int.from_bytes(digest[:8], "big", signed=True)
+
+
+class PostgresAdvisoryLock:
+    """Session-level pg advisory lock held on a dedicated connection.
+
+    Postgres drops the lock as soon as the holding session dies, so a crashed
+    leader is replaced on the next follower retry. Needs a direct (not
+    transaction-pooled) connection.
+    """
+
+    def __init__(self, engine, name):
+        self.engine = engine
+        self.name = name
+        self.key = _lock_key(name)
+        self._conn = None
+
+    def try_acquire(self):
+        try:
+            conn = self.engine.connect().execution_options(isolation_level="AUTOCOMMIT")
+        except Exception as e:
+            logger.error("❌ Leader election: cannot connect to database: %s", e)
+            return False
+        try:
+            acquired = conn.execute(text("SELECT pg_try_advisory_lock(:key)"), {"key": self.key}).scalar()
+        except Exception as e:
+            logger.error("❌ Leader election: advisory lock query failed: %s", e)
+            acquired = False
+        if not acquired:
+            conn.close()
+            return False
+        self._conn = conn
+        return True
+
+    def is_held(self):
+        if self._conn is None:
+            return False
+        try:
+            self._conn.execute(text("SELECT 1"))
+            return True
+        except Exception as e:
+            logger.error("❌ Leader election: lost lock connection: %s", e)
+            return False
+
+    def release(self):
+        if self._conn is None:
+            return
+        try:
+            self._conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": self.key})
+        except Exception:
+            pass  # The session is gone, and the lock with it
+        finally:
+            self._conn.close()
+            self._conn = None
+
+
+class FileLock:
+    """flock()-based stand-in for local and SQLite runs on a single host."""
+
+    def __init__(self, path):
+        self.path = path
+        self._fd = None
+
+    def try_acquire(self):
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        if fcntl is not None:
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                os.close(fd)
+                return False
+        os.ftruncate(fd, 0)
+        os.write(fd, str(os.getpid()).encode())
+        self._fd = fd
+        return True
+
+    def is_held(self):
+        return self._fd is not None
+
+    def release(self):
+        if self._fd is None:
+            return
+        if fcntl is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+        os.close(self._fd)
+        self._fd = None
+
+
+def create_leader_lock(engine, name, lock_file, lock_url=None):
+    """Pick an advisory lock for Postgres, a file lock for anything else."""
+    if lock_url:
+        engine = create_engine(lock_url.replace("postgres://", "postgresql://", 1), poolclass=NullPool)
+    if engine.dialect.name == "postgresql":
+        return PostgresAdvisoryLock(engine, name)
+    return FileLock(lock_file)
+
+
+class LeaderElector:
+    """Background thread that campaigns for a lock and runs the leader callbacks."""
+
+    def __init__(self, lock, on_elected, on_demoted, retry_seconds=5):
+        self.lock = lock
+        self.on_elected = on_elected
+        self.on_demoted = on_demoted
+        self.retry_seconds = retry_seconds
+        self.is_leader = False
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="watchly-leader", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while not self._stop.is_set():
+            if not self.is_leader:
+                if self.lock.try_acquire():
+                    self.is_leader = True
+                    logger.info("👑 Elected monitor leader (pid %d)", os.getpid())
+                    self._call(self.on_elected)
+            elif not self.lock.is_held():
+                logger.warning("⚠️ Monitor leadership lost (pid %d)", os.getpid())
+                self._demote()
+            self._stop.wait(self.retry_seconds)
+
+    def _demote(self):
+        self.is_leader = False
+        logger.info("👋 Stepping down as monitor leader (pid %d)", os.getpid())
+        self._call(self.on_demoted)
+        self.lock.release()
+
+    def _call(self, callback):
+        try:
+            callback()
+        except Exception as e:
+            logger.error("❌ Leader callback failed: %s", e)
+
+    def stop(self, timeout=None):
+        """Stop campaigning, step down and release the lock."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        if self.is_leader:
+            self._demote()
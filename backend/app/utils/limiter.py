@@ -0,0 +1,126 @@
+import asyncio
+from collections import deque
+
+from app.config import (
+    PROBE_CONCURRENCY_MIN,
+    PROBE_CONCURRENCY_MAX,
+    PROBE_CONCURRENCY_INITIAL,
+    PROBE_CONCURRENCY_LATENCY_TOLERANCE,
+    PROBE_CONCURRENCY_TIMEOUT_RATE,
+    PROBE_CONCURRENCY_BACKOFF,
+)
+from app.utils.logger import logger
+
+MIN_WINDOW = 10     # Probes per adjustment when the limit is small
+
+
+class AdaptiveLimiter:
+    """AIMD limit on in-flight probes, shared by every cycle on the loop.
+
+    After each window of about `limit` probes it compares the window's median
+    latency with a healthy baseline and counts timeouts:
+    - degraded (median > tolerance x baseline, or too many timeouts): limit x backoff
+    - healthy and the limit was actually reached: limit doubles until the
+      first back-off (slow start), then grows by one per window
+    Waiters are served in FIFO order. Not thread-safe: use from one event loop.
+    """
+
+    def __init__(self, initial=PROBE_CONCURRENCY_INITIAL, min_limit=PROBE_CONCURRENCY_MIN,
+                 max_limit=PROBE_CONCURRENCY_MAX, latency_tolerance=PROBE_CONCURRENCY_LATENCY_TOLERANCE,
+                 timeout_rate=PROBE_CONCURRENCY_TIMEOUT_RATE, backoff=PROBE_CONCURRENCY_BACKOFF):
+        self.min_limit = max(1, min_limit)
+        self.max_limit = max(self.min_limit, max_limit)
+        self.limit = self._clamp(initial)
+        self.latency_tolerance = latency_tolerance
+        self.timeout_rate = timeout_rate
+        self.backoff = backoff
+        self.in_flight = 0
+        self.baseline = None        # Median latency (s) of healthy windows, smoothed
+        self.slow_start = True
+        self._waiters = deque()
+        self._latencies = []
+        self._timeouts = 0
+        self._peak = 0
+        self.stats = {"increases": 0, "decreases": 0}
+
+    def _clamp(self, limit):
+        return max(self.min_limit, min(self.max_limit, int(limit)))
+
+    async def acquire(self):
+        """Wait for a probe slot."""
+        if self.in_flight < self.limit and not self._waiters:
+            self._take()
+            return
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.append(future)
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                self._give_back()   # The slot was handed over just as we were cancelled
+            else:
+                self._waiters.remove(future)
+            raise
+
+    def release(self, latency, timed_out=False):
+        """Return a slot with the probe's outcome (latency None: no sample, e.g. it never reached the host)."""
+        if latency is not None:
+            self._latencies.append(latency)
+            if timed_out:
+                self._timeouts += 1
+            if len(self._latencies) >= max(self.limit, MIN_WINDOW):
+                self._adjust()
+        self._give_back()
+
+    def _take(self):
+        self.in_flight += 1
+        self._peak = max(self._peak, self.in_flight)
+
+    def _give_back(self):
+        self.in_flight -= 1
+        while self._waiters and self.in_flight < self.limit:
+            future = self._waiters.popleft()
+            if not future.done():
+                self._take()
+                future.set_result(None)
+
+    def _adjust(self):
+        latencies = sorted(self._latencies)
+        median = latencies[len(latencies) // 2]
+        timeout_share = self._timeouts / len(latencies)
+        saturated = self._peak >= self.limit
+        self._latencies, self._timeouts, self._peak = [], 0, self.in_flight
+
+        if self.baseline is None:
+            self.baseline = median
+        degraded = timeout_share > self.timeout_rate or median > self.baseline * self.latency_tolerance
+        previous = self.limit
+        if degraded:
+            self.limit = self._clamp(self.limit * self.backoff)
+            self.slow_start = False
+            # Drift slowly towards the new latency in case the fleet itself got slower
+            self.baseline = 0.95 * self.baseline + 0.05 * median
+        else:
+            self.baseline = 0.9 * self.baseline + 0.1 * median
+            if saturated:
+                self.limit = self._clamp(self.limit * 2 if self.slow_start else self.limit + 1)
+
+        if self.limit < previous:
+            self.stats["decreases"] += 1
+            logger.info("📉 Probe concurrency %d -> %d (median %.0f ms, %.0f%% timeouts)",
+                        previous, self.limit, median * 1000, timeout_share * 100)
+        elif self.limit > previous:
+            self.stats["increases"] += 1
+            logger.debug("📈 Probe concurrency %d -> %d (median %.0f ms)", previous, self.limit, median * 1000)
+
+    def as_dict(self):
+        return {
+            "limit": self.limit,
+            "in_flight": self.in_flight,
+            "waiting": len(self._waiters),
+            "min": self.min_limit,
+            "max": self.max_limit,
+            "baseline_ms": round(self.baseline * 1000, 2) if self.baseline is not None else None,
+            "slow_start": self.slow_start,
+            **self.stats,
+        }
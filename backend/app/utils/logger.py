@@ -1,22 +1,128 @@
+import atexit
+import json
 import logging
+import logging.handlers
 import os
+import queue
+import threading
+import time
+from datetime import datetime, timezone
 
-#Ensure logs directory exists
-log_dir = "logs"
-os.makedirs(log_dir, exist_ok=True)
+from app.config import (
+    LOG_LEVEL,
+    LOG_FORMAT,
+    LOG_FILE,
+    LOG_QUEUE_SIZE,
+    LOG_RATE_LIMIT,
+    LOG_RATE_WINDOW_SECONDS,
+)
 
-#Configure logging
-log_file = os.path.join(log_dir, "app.log")
+#Callers only filter and enqueue; formatting and file/console I/O happen on the listener thread
 
 
-logging.basicConfig(
-    level=logging.DEBUG,        #Set to debug for detailed logs
-    format="%(asctime)s - %(levelname)s - %(message)s",
-    handlers=[
-        logging.FileHandler(log_file),      #Save the logs
-        logging.StreamHandler()         #Print the logs to the console
-    ]
-)
+class RateLimitFilter(logging.Filter):
+    """Lets each message template through at most `limit` times per window.
+
+    Keyed on the unformatted message, so "Checking website: %s" for a thousand
+    sites is one key. The first record after a window reports how many were
+    suppressed. WARNING and above always pass.
+    """
+
+    def __init__(self, limit=LOG_RATE_LIMIT, window=LOG_RATE_WINDOW_SECONDS):
+        super().__init__()
+        self.limit = limit
+        self.window = window
+        self._lock = threading.Lock()
+        self._windows = {}      # (logger, level, template) -> [window start, passed, suppressed]
+
+    def filter(self, record):
+        if not self.limit or record.levelno >= logging.WARNING:
+            return True
+        key = (record.name, record.levelno, record.msg)
+        now = time.monotonic()
+        with self._lock:
+            state = self._windows.get(key)
+            if state is None or now - state[0] >= self.window:
+                suppressed = state[2] if state else 0
+                self._windows[key] = [now, 1, 0]
+                if len(self._windows) > 10000:
+                    self._windows = {key: self._windows[key]}
+            elif state[1] < self.limit:
+                state[1] += 1
+                return True
+            else:
+                state[2] += 1
+                return False
+        if suppressed:
+            record.msg = f"{record.getMessage()} (+{suppressed} similar suppressed)"
+            record.args = None
+        return True
+
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that drops records when the queue is full instead of raising."""
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        #Merge the args now (they may change later) but leave formatting to the listener
+        record = logging.makeLogRecord(record.__dict__)
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "process": record.process,
+            "thread": record.threadName,
+        }
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+
+def _formatter():
+    if LOG_FORMAT == "json":
+        return JsonFormatter()
+    return logging.Formatter("%(asctime)s - %(levelname)s - %(message)s")
+
+
+def _handlers():
+    handlers = [logging.StreamHandler()]        #Print the logs to the console
+    if LOG_FILE:
+        os.makedirs(os.path.dirname(LOG_FILE) or ".", exist_ok=True)
+        handlers.append(logging.FileHandler(LOG_FILE))      #Save the logs
+    formatter = _formatter()
+    for handler in handlers:
+        handler.setFormatter(formatter)
+    return handlers
+
+
+#Configure logging: the root logger feeds one queue, drained by a background listener
+log_queue = queue.Queue(LOG_QUEUE_SIZE)
+queue_handler = NonBlockingQueueHandler(log_queue)
+queue_handler.addFilter(RateLimitFilter())
+listener = logging.handlers.QueueListener(log_queue, *_handlers(), respect_handler_level=True)
+
+root = logging.getLogger()
+root.setLevel(LOG_LEVEL)
+root.handlers = [queue_handler]
+listener.start()
+atexit.register(listener.stop)  # Flushes whatever is still queued
 
 #Create a logger instance
 logger = logging.getLogger("WatchlyLogger")
@@ -26,4 +132,4 @@ if __name__ == "__main__":
     logger.info("Logging system initialized successfully.")
     logger.warning("This is a warning log")
     logger.error("This is an error log.")
-    logger.debug("Debugging details go here.")
\ No newline at end of file
+    logger.debug("Debugging details go here.")
@@ -0,0 +1,240 @@
+import calendar
+from datetime import datetime, timedelta
+
+from sqlalchemy import and_, tuple_
+from sqlalchemy.dialects import postgresql, sqlite
+
+from app import db
+from app.config import METRIC_COMPACT_AFTER_HOURS, METRIC_CHUNK_MAX_POINTS
+from app.models import Metric, MetricChunk, MetricTiming, LatestStatus
+from app.utils.chunk_codec import decode_points, encode_points
+from app.utils.logger import logger
+from app.utils.pagination import decode_cursor, encode_cursor
+from app.utils.rollups import update_rollups
+from app.utils.versioning import bump_site_versions
+
+_INSERTS = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}
+_EPOCH = datetime(1970, 1, 1)
+
+#Metric history lives in two places: recent probes as plain `metric` rows
+#(cheap appends), older ones compacted into compressed `metric_chunk` rows.
+#Everything reads through read_metrics()/read_points(), which merge both.
+
+
+def record_metrics(rows, commit=True, return_ids=False):
+    """Append metric rows and keep every derived table in step, in one transaction.
+
+    rows: dicts with website_id, response_time, uptime and timestamp, plus an
+    optional "timings" dict (dns_ms, connect_ms, tls_ms, ttfb_ms, body_ms).
+    With return_ids, each row dict gets the "id" of its inserted Metric.
+    """
+    if not rows:
+        return
+    db.session.bulk_insert_mappings(Metric, rows, return_defaults=return_ids)
+    timings = [
+        {"website_id": row["website_id"], "timestamp": row["timestamp"], **row["timings"]}
+        for row in rows if row.get("timings")
+    ]
+    if timings:
+        db.session.bulk_insert_mappings(MetricTiming, timings)
+    update_latest_status(rows)
+    update_rollups(rows)
+    bump_site_versions({row["website_id"] for row in rows})
+    if commit:
+        db.session.commit()
+
+
+def update_latest_status(rows):
+    """Upsert the newest row per website into latest_status (caller commits)."""
+    latest = {}
+    for row in rows:
+        current = latest.get(row["website_id"])
+        if current is None or row["timestamp"] >= current["timestamp"]:
+            latest[row["website_id"]] = row
+    values = [
+        {
+            "website_id": row["website_id"],
+            "response_time": row["response_time"],
+            "uptime": row["uptime"],
+            "timestamp": row["timestamp"],
+        }
+        for row in latest.values()
+    ]
+
+    insert = _INSERTS.get(db.session.get_bind().dialect.name)
+    if insert is not None:
+        stmt = insert(LatestStatus).values(values)
+        db.session.execute(stmt.on_conflict_do_update(
+            index_elements=[LatestStatus.website_id],
+            set_={
+                "response_time": stmt.excluded.response_time,
+                "uptime": stmt.excluded.uptime,
+                "timestamp": stmt.excluded.timestamp,
+            },
+            # Never let a late, older write overwrite a newer status
+            where=stmt.excluded.timestamp >= LatestStatus.timestamp,
+        ))
+        return
+
+    # Other databases: read-modify-write
+    existing = {
+        status.website_id: status
+        for status in db.session.execute(
+            db.select(LatestStatus).where(LatestStatus.website_id.in_(list(latest)))
+        ).scalars()
+    }
+    for value in values:
+        status = existing.get(value["website_id"])
+        if status is None:
+            db.session.add(LatestStatus(**value))
+        elif value["timestamp"] >= status.timestamp:
+            status.response_time = value["response_time"]
+            status.uptime = value["uptime"]
+            status.timestamp = value["timestamp"]
+
+
+def _to_ms(timestamp):
+    return calendar.timegm(timestamp.utctimetuple()) * 1000 + timestamp.microsecond // 1000
+
+
+def _from_ms(ms):
+    return _EPOCH + timedelta(milliseconds=ms)
+
+
+def _chunk_points(website_id, chunk):
+    """Decoded points of a chunk as metric-shaped dicts (id is None: chunks keep no row ids)."""
+    return [
+        {"id": None, "website_id": website_id, "uptime": 1.0 if up else 0.0,
+         "response_time": latency, "timestamp": _from_ms(ts)}
+        for ts, up, latency in decode_points(chunk.data)
+    ]
+
+
+def read_points(website_id, start=None, end=None):
+    """Range read: every metric for a website in [start, end), oldest first, from rows and chunks."""
+    chunk_query = db.select(MetricChunk).where(MetricChunk.website_id == website_id)
+    row_query = db.select(Metric).where(Metric.website_id == website_id)
+    if start is not None:
+        chunk_query = chunk_query.where(MetricChunk.end_ts >= start)
+        row_query = row_query.where(Metric.timestamp >= start)
+    if end is not None:
+        chunk_query = chunk_query.where(MetricChunk.start_ts < end)
+        row_query = row_query.where(Metric.timestamp < end)
+
+    points = []
+    for chunk in db.session.execute(chunk_query.order_by(MetricChunk.start_ts)).scalars():
+        points.extend(
+            point for point in _chunk_points(website_id, chunk)
+            if (start is None or point["timestamp"] >= start) and (end is None or point["timestamp"] < end)
+        )
+    points.extend(_row_dict(row) for row in db.session.execute(row_query.order_by(Metric.timestamp, Metric.id)).scalars())
+    points.sort(key=lambda point: point["timestamp"])
+    return points
+
+
+def _row_dict(metric):
+    return {"id": metric.id, "website_id": metric.website_id, "uptime": metric.uptime,
+            "response_time": metric.response_time, "timestamp": metric.timestamp}
+
+
+def read_metrics(website_id, cursor=None, size=10):
+    """One page of a website's metrics, newest first -> (points, next_cursor).
+
+    Recent rows are a keyset seek on (timestamp, id); once they run out the
+    page continues into compacted chunks, decoded one at a time.
+    Raises ValueError for a malformed cursor.
+    """
+    bound = decode_cursor(cursor) if cursor else None
+
+    query = db.select(Metric).where(Metric.website_id == website_id)
+    if bound is not None:
+        query = query.where(and_(
+            Metric.timestamp <= bound[0],
+            tuple_(Metric.timestamp, Metric.id) < tuple_(*bound),
+        ))
+    points = [
+        _row_dict(row) for row in db.session.execute(
+            query.order_by(Metric.timestamp.desc(), Metric.id.desc()).limit(size + 1)
+        ).scalars()
+    ]
+
+    if len(points) <= size:
+        before = points[-1]["timestamp"] if points else (bound[0] if bound else None)
+        while len(points) <= size:
+            # Next older chunk; fetched one at a time so deep history is never loaded wholesale
+            chunk_query = db.select(MetricChunk).where(MetricChunk.website_id == website_id)
+            if before is not None:
+                chunk_query = chunk_query.where(MetricChunk.start_ts < before)
+            chunk = db.session.execute(chunk_query.order_by(MetricChunk.end_ts.desc()).limit(1)).scalar()
+            if chunk is None:
+                break
+            older = [point for point in reversed(_chunk_points(website_id, chunk))
+                     if before is None or point["timestamp"] < before]
+            points.extend(older[:size + 1 - len(points)])
+            before = chunk.start_ts
+
+    if len(points) <= size:
+        return points, None
+    points = points[:size]
+    return points, encode_cursor(points[-1]["timestamp"], points[-1]["id"] or 0)
+
+
+def iter_chunk_rows():
+    """Every compacted chunk as a list of metric dicts, one chunk at a time."""
+    last_id = 0
+    while True:
+        chunk = db.session.execute(
+            db.select(MetricChunk).where(MetricChunk.id > last_id).order_by(MetricChunk.id).limit(1)
+        ).scalar()
+        if chunk is None:
+            return
+        yield _chunk_points(chunk.website_id, chunk)
+        last_id = chunk.id
+
+
+def compact_metrics(now=None, compact_after_hours=METRIC_COMPACT_AFTER_HOURS, max_points=METRIC_CHUNK_MAX_POINTS):
+    """Move metric rows from before the last whole UTC day past `compact_after_hours` into chunks.
+
+    Each chunk holds one site's points from a single UTC day (split further at
+    max_points), so repeated runs never produce tiny chunks.
+    Returns the number of rows compacted.
+    """
+    now = now or datetime.utcnow()
+    cutoff = (now - timedelta(hours=compact_after_hours)).replace(hour=0, minute=0, second=0, microsecond=0)
+    website_ids = db.session.execute(
+        db.select(Metric.website_id).where(Metric.timestamp < cutoff).distinct()
+    ).scalars().all()
+
+    compacted = 0
+    for website_id in website_ids:
+        while True:
+            rows = db.session.execute(
+                db.select(Metric.id, Metric.timestamp, Metric.uptime, Metric.response_time)
+                .where(Metric.website_id == website_id, Metric.timestamp < cutoff)
+                .order_by(Metric.timestamp, Metric.id).limit(max_points)
+            ).all()
+            if not rows:
+                break
+            # A full batch may end mid-day: leave that day's tail for the next pass
+            if len(rows) == max_points and rows[0].timestamp.date() != rows[-1].timestamp.date():
+                last_day = rows[-1].timestamp.date()
+                rows = [row for row in rows if row.timestamp.date() != last_day]
+
+            groups = {}
+            for row in rows:
+                groups.setdefault(row.timestamp.date(), []).append(row)
+            for day_rows in groups.values():
+                db.session.add(MetricChunk(
+                    website_id=website_id,
+                    start_ts=day_rows[0].timestamp,
+                    end_ts=day_rows[-1].timestamp,
+                    count=len(day_rows),
+                    data=encode_points([(_to_ms(row.timestamp), bool(row.uptime), row.response_time) for row in day_rows]),
+                ))
+            db.session.execute(db.delete(Metric).where(Metric.id.in_([row.id for row in rows])))
+            db.session.commit()
+            compacted += len(rows)
+
+    if compacted:
+        logger.info("🗜️ Compacted %d metrics for %d websites into chunks", compacted, len(website_ids))
+    return compacted
@@ -0,0 +1,174 @@
+import asyncio
+import random
+import time
+from collections import deque
+
+import httpx
+
+from app.config import (
+    NOTIFY_QUEUE_SIZE,
+    NOTIFY_CONCURRENCY,
+    NOTIFY_MAX_ATTEMPTS,
+    NOTIFY_BACKOFF_SECONDS,
+    NOTIFY_TIMEOUT,
+    NOTIFY_TRANSPORT,
+    NOTIFY_DEAD_LETTER_SIZE,
+)
+from app.utils.logger import logger
+from app.utils.telemetry import EMAILS
+
+
+class Notification:
+    __slots__ = ("to_email", "subject", "content", "attempts", "created_at", "last_error")
+
+    def __init__(self, to_email, subject, content):
+        self.to_email = to_email
+        self.subject = subject
+        self.content = content
+        self.attempts = 0
+        self.created_at = time.time()
+        self.last_error = None
+
+    def as_dict(self):
+        return {
+            "to_email": self.to_email,
+            "subject": self.subject,
+            "content": self.content,
+            "attempts": self.attempts,
+            "created_at": self.created_at,
+            "last_error": self.last_error,
+        }
+
+
+class NotificationDispatcher:
+    """Bounded email queue drained by a few workers on the monitor's event loop.
+
+    enqueue() never waits: probing and alerting hand messages off and move on.
+    Failed sends are retried with exponential backoff; messages that keep
+    failing (or don't fit in the queue) go to a bounded dead-letter list and
+    to `on_dead_letter`, which must not block (the monitor hands them to its
+    database thread).
+    """
+
+    def __init__(self, transport=NOTIFY_TRANSPORT, max_queue=NOTIFY_QUEUE_SIZE, concurrency=NOTIFY_CONCURRENCY,
+                 max_attempts=NOTIFY_MAX_ATTEMPTS, backoff=NOTIFY_BACKOFF_SECONDS, send=None, on_dead_letter=None):
+        self.transport = transport
+        self.max_queue = max_queue
+        self.concurrency = concurrency
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self._send = send
+        self.on_dead_letter = on_dead_letter
+        self._queue = None
+        self._workers = []
+        self._retries = {}         # Notification -> TimerHandle of its pending retry
+        self._client = None
+        self.dead_letters = deque(maxlen=NOTIFY_DEAD_LETTER_SIZE)
+        self.stats = {"queued": 0, "sent": 0, "retried": 0, "dead_lettered": 0}
+
+    @property
+    def running(self):
+        return bool(self._workers)
+
+    @property
+    def depth(self):
+        return self._queue.qsize() if self._queue is not None else 0
+
+    async def start(self):
+        """Start the workers on the running loop."""
+        if self.running:
+            return
+        self._queue = asyncio.Queue(maxsize=self.max_queue)
+        self._client = httpx.AsyncClient(timeout=NOTIFY_TIMEOUT)
+        self._workers = [asyncio.ensure_future(self._worker()) for _ in range(self.concurrency)]
+
+    def enqueue(self, to_email, subject, content):
+        """Queue an email without waiting; returns False if it was dead-lettered instead."""
+        notification = Notification(to_email, subject, content)
+        if not self.running:
+            self._dead_letter(notification, "dispatcher not running")
+            return False
+        try:
+            self._queue.put_nowait(notification)
+        except asyncio.QueueFull:
+            self._dead_letter(notification, "queue full")
+            return False
+        self.stats["queued"] += 1
+        EMAILS.inc(outcome="queued")
+        return True
+
+    async def _worker(self):
+        while True:
+            notification = await self._queue.get()
+            try:
+                await self._deliver(notification)
+            finally:
+                self._queue.task_done()
+
+    async def _deliver(self, notification):
+        notification.attempts += 1
+        try:
+            ok = await self._send_one(notification)
+        except Exception as e:
+            ok = False
+            notification.last_error = str(e)
+        if ok:
+            self.stats["sent"] += 1
+            EMAILS.inc(outcome="sent")
+            return
+        if notification.attempts >= self.max_attempts:
+            self._dead_letter(notification, notification.last_error or "send failed")
+            return
+        # Retry later without holding a worker
+        delay = self.backoff * 2 ** (notification.attempts - 1) * (0.5 + random.random())
+        self.stats["retried"] += 1
+        EMAILS.inc(outcome="retried")
+        self._retries[notification] = asyncio.get_running_loop().call_later(delay, self._requeue, notification)
+
+    def _requeue(self, notification):
+        self._retries.pop(notification, None)
+        try:
+            self._queue.put_nowait(notification)
+        except asyncio.QueueFull:
+            self._dead_letter(notification, "queue full on retry")
+
+    async def _send_one(self, notification):
+        if self._send is not None:
+            return await self._send(notification.to_email, notification.subject, notification.content)
+        from app.utils.email_utils import send_email_via_cloudflare, send_email_via_sendgrid
+        if self.transport == "sendgrid":
+            return await send_email_via_sendgrid(notification.to_email, notification.subject, notification.content, max_retries=1)
+        return await send_email_via_cloudflare(notification.to_email, notification.subject, notification.content, client=self._client)
+
+    def _dead_letter(self, notification, reason):
+        notification.last_error = reason
+        self.dead_letters.append(notification)
+        self.stats["dead_lettered"] += 1
+        EMAILS.inc(outcome="dead_lettered")
+        logger.error("❌ Email to %s dead-lettered after %d attempts: %s", notification.to_email, notification.attempts, reason)
+        if self.on_dead_letter is not None:
+            try:
+                self.on_dead_letter(notification)
+            except Exception as e:
+                logger.error("❌ Failed to hand off dead-lettered email: %s", e)
+
+    async def stop(self, timeout=10):
+        """Give queued emails up to `timeout` seconds to go out, then stop the workers."""
+        if not self.running:
+            return
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning("⚠️ Stopping notifier with %d emails still queued", self.depth)
+        for notification, handle in self._retries.items():
+            handle.cancel()
+            self._dead_letter(notification, "dispatcher stopped before retry")
+        self._retries = {}
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        while not self._queue.empty():
+            self._dead_letter(self._queue.get_nowait(), "dispatcher stopped")
+        await self._client.aclose()
+        self._client = None
@@ -0,0 +1,107 @@
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime
+
+import httpx
+
+from app.config import STATUS_CACHE_SECONDS, STATUS_MAX_IN_FLIGHT
+from app.utils.async_runner import BackgroundLoop
+from app.utils.http_client import ProbeClient
+from app.utils.logger import logger
+
+
+class TooManyChecks(Exception):
+    pass
+
+
+class OnDemandChecker:
+    """Runs ad-hoc URL checks on a background event loop for the web workers.
+
+    Concurrent requests for the same URL share one in-flight probe, and a
+    finished result is served from cache for `cache_seconds`. Callers get a
+    concurrent Future and decide how long (if at all) to wait on it.
+    """
+
+    def __init__(self, cache_seconds=STATUS_CACHE_SECONDS, max_in_flight=STATUS_MAX_IN_FLIGHT, on_result=None):
+        self.cache_seconds = cache_seconds
+        self.max_in_flight = max_in_flight
+        self.on_result = on_result   # Called off the loop with (url, result, website_ids)
+        self.runner = BackgroundLoop("watchly-checks")
+        # One thread writes results in order, off the loop so a slow database never stalls other probes
+        self._recorder = ThreadPoolExecutor(max_workers=1, thread_name_prefix="watchly-checks-db")
+        self.client = ProbeClient()
+        self._cache = {}       # url -> (result, expires_at)
+        self._in_flight = {}   # url -> (Future, website_ids to record the result for)
+        self._lock = threading.Lock()
+        self.stats = {"probes": 0, "coalesced": 0, "cache_hits": 0}
+
+    def check(self, url, website_id=None):
+        """Future with the probe result for `url`; raises TooManyChecks when saturated."""
+        now = time.monotonic()
+        with self._lock:
+            cached = self._cache.get(url)
+            if cached is not None and cached[1] > now:
+                self.stats["cache_hits"] += 1
+                future = Future()
+                future.set_result(cached[0])
+                return future
+
+            in_flight = self._in_flight.get(url)
+            if in_flight is not None:
+                self.stats["coalesced"] += 1
+                if website_id is not None:
+                    in_flight[1].add(website_id)
+                return in_flight[0]
+
+            if len(self._in_flight) >= self.max_in_flight:
+                raise TooManyChecks()
+            if not self.runner.running:
+                self.runner.start()
+            website_ids = {website_id} if website_id is not None else set()
+            future = self.runner.submit(self._probe(url))
+            self._in_flight[url] = (future, website_ids)
+            self.stats["probes"] += 1
+        future.add_done_callback(lambda done: self._finish(url, done, website_ids))
+        return future
+
+    def _finish(self, url, future, website_ids):
+        with self._lock:
+            self._in_flight.pop(url, None)
+            if future.cancelled() or future.exception() is not None:
+                return
+            result = future.result()
+            self._cache[url] = (result, time.monotonic() + self.cache_seconds)
+            if len(self._cache) > 4 * self.max_in_flight:
+                now = time.monotonic()
+                self._cache = {key: value for key, value in self._cache.items() if value[1] > now}
+        if self.on_result is not None and website_ids:
+            self._recorder.submit(self._record, url, result, website_ids)
+
+    def _record(self, url, result, website_ids):
+        try:
+            self.on_result(url, result, website_ids)
+        except Exception as e:
+            logger.error("❌ Failed to record on-demand check for %s: %s", url, e)
+
+    async def _probe(self, url):
+        try:
+            response, elapsed = await self.client.probe(url)
+        except (httpx.HTTPError, httpx.InvalidURL, ValueError) as e:
+            # Unsupported scheme, bad URL, timeout...: all just mean the site isn't reachable
+            logger.warning("⚠️ On-demand check of %s failed: %s", url, e)
+            return {"status": "offline", "response_time": None, "status_code": None,
+                    "checked_at": datetime.utcnow().isoformat()}
+        response_time = elapsed * 1000
+        online = 200 <= response.status_code < 400   # Same rule as the monitor
+        return {"status": "online" if online else "offline", "response_time": response_time,
+                "status_code": response.status_code, "checked_at": datetime.utcnow().isoformat()}
+
+    def stop(self, timeout=5):
+        if self.runner.running:
+            try:
+                self.runner.submit(self.client.aclose()).result(timeout)
+            except Exception:
+                pass
+            self.runner.stop(timeout)
+        self._recorder.shutdown(wait=False)
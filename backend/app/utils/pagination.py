@@ -0,0 +1,59 @@
+import base64
+import json
+from datetime import datetime
+
+from sqlalchemy import and_, tuple_
+
+from app.config import API_MAX_PAGE_SIZE
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(timestamp, row_id):
+    """Opaque cursor for the row a page ended on."""
+    raw = json.dumps([timestamp.isoformat(), row_id], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    """Cursor -> (timestamp, id); raises ValueError if it was tampered with or is malformed."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        timestamp, row_id = json.loads(raw)
+        return datetime.fromisoformat(timestamp), int(row_id)
+    except (TypeError, ValueError, UnicodeDecodeError) as e:
+        raise ValueError("Invalid cursor") from e
+
+
+def page_size(requested, default):
+    """Clamp a requested page size to 1..API_MAX_PAGE_SIZE (<= 0 or missing -> default)."""
+    if not requested or requested <= 0:
+        requested = default
+    return min(requested, API_MAX_PAGE_SIZE)
+
+
+def keyset_page(query, timestamp_col, id_col, cursor, size):
+    """One page of `query`, newest first, strictly after `cursor`.
+
+    Seeks on (timestamp, id) instead of using OFFSET, so every page is an
+    index range scan no matter how deep it is. Returns (rows, next_cursor);
+    next_cursor is None on the last page.
+    """
+    if cursor:
+        cursor_ts, cursor_id = decode_cursor(cursor)
+        # The plain timestamp bound lets the planner use the index; the row
+        # comparison breaks ties between rows with the same timestamp
+        query = query.filter(and_(
+            timestamp_col <= cursor_ts,
+            tuple_(timestamp_col, id_col) < tuple_(cursor_ts, cursor_id),
+        ))
+    rows = query.order_by(timestamp_col.desc(), id_col.desc()).limit(size + 1).all()
+    if len(rows) <= size:
+        return rows, None
+    rows = rows[:size]
+    last = rows[-1]
+    return rows, encode_cursor(getattr(last, timestamp_col.key), getattr(last, id_col.key))
+
+
+def cursor_headers(next_cursor):
+    return {NEXT_CURSOR_HEADER: next_cursor} if next_cursor else {}
@@ -0,0 +1,83 @@
+import cProfile
+import hmac
+import os
+import time
+
+from flask import g, has_request_context, request
+from sqlalchemy import event
+
+from app.config import QUERY_BUDGET, QUERY_TIMING_HEADERS, PROFILE_TOKEN, PROFILE_DIR
+from app.utils import telemetry
+from app.utils.logger import logger
+
+PROFILE_HEADER = "X-Profile"
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    context._query_start = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    #Only API requests are counted; the monitor's queries run outside a request
+    if has_request_context() and "sql_count" in g:
+        g.sql_count += 1
+        g.sql_seconds += time.perf_counter() - context._query_start
+
+
+def _start_request():
+    g.request_start = time.perf_counter()
+    g.sql_count = 0
+    g.sql_seconds = 0.0
+    token = request.headers.get(PROFILE_HEADER)
+    if PROFILE_TOKEN and token and hmac.compare_digest(token, PROFILE_TOKEN):
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+            g.profiler = profiler
+        except ValueError:
+            logger.warning("⚠️ Another profiler is active on this thread, skipping the request profile")
+
+
+def _finish_request(response):
+    if "request_start" not in g:
+        return response
+    profiler = g.pop("profiler", None)
+    if profiler is not None:
+        profiler.disable()
+    elapsed = time.perf_counter() - g.request_start
+    endpoint = request.endpoint or "unmatched"
+    count, sql_seconds = g.sql_count, g.sql_seconds
+
+    telemetry.REQUEST_SECONDS.observe(elapsed, endpoint=endpoint, method=request.method)
+    telemetry.REQUEST_QUERIES.observe(count, endpoint=endpoint)
+    telemetry.REQUEST_SQL_SECONDS.observe(sql_seconds, endpoint=endpoint)
+    if QUERY_BUDGET and count > QUERY_BUDGET:
+        telemetry.QUERY_BUDGET_EXCEEDED.inc(endpoint=endpoint)
+        logger.warning("🐢 %s %s ran %d SQL statements (budget %d, %.1f ms in SQL)",
+                       request.method, endpoint, count, QUERY_BUDGET, sql_seconds * 1000)
+
+    if QUERY_TIMING_HEADERS:
+        response.headers["X-Query-Count"] = str(count)
+        response.headers["Server-Timing"] = (
+            f'db;dur={sql_seconds * 1000:.1f};desc="{count} queries", app;dur={elapsed * 1000:.1f}'
+        )
+    if profiler is not None:
+        response.headers["X-Profile-File"] = dump_profile(profiler, endpoint)
+    return response
+
+
+def dump_profile(profiler, endpoint):
+    """Write a .prof file (open with `python -m pstats` or snakeviz); returns its file name."""
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    name = f"{int(time.time() * 1000)}-{endpoint}.prof"
+    profiler.dump_stats(os.path.join(PROFILE_DIR, name))
+    logger.info("🔬 Request profile written to %s", os.path.join(PROFILE_DIR, name))
+    return name
+
+
+def install_request_profiling(app, engine):
+    """Count SQL statements/time per request, flag requests over QUERY_BUDGET and serve opt-in profiles."""
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    app.before_request(_start_request)
+    app.after_request(_finish_request)
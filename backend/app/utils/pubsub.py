@@ -0,0 +1,210 @@
+import json
+import select
+import threading
+import time
+from collections import deque
+
+from app.config import EVENT_BROKER, EVENT_CHANNEL, EVENT_LISTEN_URL, SSE_QUEUE_SIZE
+from app.utils.logger import logger
+
+_PG_PAYLOAD_LIMIT = 7500   # NOTIFY payloads must stay under 8000 bytes
+
+
+def user_topic(user_id):
+    """Topic a user's live streams listen on. Prefixed so user ids can't collide
+    with internal topics such as the monitor's "monitor:schedule"."""
+    return f"user:{user_id}"
+
+
+class Subscription:
+    """One client's bounded event queue. When it fills up the oldest events are
+    dropped and the client is told to resync, so a slow reader can't grow memory."""
+
+    def __init__(self, topic, max_size=SSE_QUEUE_SIZE):
+        self.topic = topic
+        self._events = deque(maxlen=max_size)
+        self._cond = threading.Condition()
+        self.dropped = 0
+        self.closed = False
+
+    def put(self, event):
+        with self._cond:
+            if len(self._events) == self._events.maxlen:
+                self.dropped += 1
+            self._events.append(event)
+            self._cond.notify()
+
+    def get(self, timeout):
+        """Wait up to `timeout` seconds; returns (events, dropped_since_last_get)."""
+        with self._cond:
+            if not self._events and not self.closed:
+                self._cond.wait(timeout)
+            events = list(self._events)
+            self._events.clear()
+            dropped, self.dropped = self.dropped, 0
+            return events, dropped
+
+    def close(self):
+        with self._cond:
+            self.closed = True
+            self._cond.notify_all()
+
+
+class InProcessBroker:
+    """Fans events out to the subscriptions of this process."""
+
+    def __init__(self):
+        self._subscribers = {}   # topic -> set of Subscription
+        self._lock = threading.Lock()
+
+    def subscribe(self, topic):
+        subscription = Subscription(topic)
+        with self._lock:
+            self._subscribers.setdefault(topic, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        subscription.close()
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.topic)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[subscription.topic]
+
+    @property
+    def subscriber_count(self):
+        with self._lock:
+            return sum(len(subscribers) for subscribers in self._subscribers.values())
+
+    def publish(self, events):
+        """events: iterable of (topic, event dict)."""
+        with self._lock:
+            targets = [(self._subscribers.get(topic, ()), event) for topic, event in events]
+            targets = [(list(subscribers), event) for subscribers, event in targets if subscribers]
+        for subscribers, event in targets:
+            for subscription in subscribers:
+                subscription.put(event)
+
+    def close(self):
+        pass
+
+
+class PostgresBroker(InProcessBroker):
+    """Relays events between processes with LISTEN/NOTIFY.
+
+    The monitor may run in another process (or gunicorn worker) than the one
+    holding a client's stream: every process LISTENs and fans NOTIFYs out to
+    its own subscribers. Needs a direct (not transaction-pooled) connection,
+    hence EVENT_LISTEN_URL.
+    """
+
+    def __init__(self, database_url, channel=EVENT_CHANNEL):
+        super().__init__()
+        from sqlalchemy import create_engine
+        from sqlalchemy.pool import NullPool
+        self.channel = channel
+        self._engine = create_engine(database_url.replace("postgres://", "postgresql://", 1), poolclass=NullPool)
+        self._publish_conn = None
+        self._publish_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._listen, name="watchly-events", daemon=True)
+        self._thread.start()
+
+    def _connect(self):
+        conn = self._engine.raw_connection()
+        conn.driver_connection.autocommit = True
+        return conn
+
+    def publish(self, events):
+        payloads, batch, size = [], [], 0
+        for topic, event in events:
+            item = json.dumps([topic, event], separators=(",", ":"), default=str)
+            if batch and size + len(item) + 1 > _PG_PAYLOAD_LIMIT:
+                payloads.append("[" + ",".join(batch) + "]")
+                batch, size = [], 0
+            batch.append(item)
+            size += len(item) + 1
+        if batch:
+            payloads.append("[" + ",".join(batch) + "]")
+        if not payloads:
+            return
+        with self._publish_lock:
+            try:
+                if self._publish_conn is None:
+                    self._publish_conn = self._connect()
+                cursor = self._publish_conn.cursor()
+                for payload in payloads:
+                    cursor.execute("SELECT pg_notify(%s, %s)", (self.channel, payload))
+                cursor.close()
+            except Exception as e:
+                logger.error("❌ Event publish failed: %s", e)
+                self._reset_publisher()
+
+    def _reset_publisher(self):
+        try:
+            if self._publish_conn is not None:
+                self._publish_conn.close()
+        except Exception:
+            pass
+        self._publish_conn = None
+
+    def _listen(self):
+        while not self._stop.is_set():
+            conn = None
+            try:
+                conn = self._connect()
+                cursor = conn.cursor()
+                cursor.execute(f'LISTEN "{self.channel}"')
+                driver = conn.driver_connection
+                while not self._stop.is_set():
+                    if select.select([driver], [], [], 5) == ([], [], []):
+                        continue
+                    driver.poll()
+                    while driver.notifies:
+                        notify = driver.notifies.pop(0)
+                        super().publish((topic, event) for topic, event in json.loads(notify.payload))
+            except Exception as e:
+                logger.error("❌ Event listener lost its connection: %s", e)
+                self._stop.wait(5)
+            finally:
+                if conn is not None:
+                    try:
+                        conn.close()
+                    except Exception:
+                        pass
+
+    def close(self):
+        self._stop.set()
+        with self._publish_lock:
+            self._reset_publisher()
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    """The process-wide broker, created on first use from EVENT_BROKER."""
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                import os
+                database_url = os.getenv("DATABASE_URL", "")
+                use_postgres = EVENT_BROKER == "postgres" or (
+                    EVENT_BROKER == "auto" and database_url.startswith(("postgres://", "postgresql"))
+                )
+                _broker = PostgresBroker(EVENT_LISTEN_URL or database_url) if use_postgres else InProcessBroker()
+    return _broker
+
+
+def publish(events):
+    """Publish (topic, event) pairs; never raises into the caller."""
+    events = list(events)
+    if not events:
+        return
+    try:
+        get_broker().publish(events)
+    except Exception as e:
+        logger.error("❌ Event publish failed: %s", e)
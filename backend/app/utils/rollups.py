@@ -0,0 +1,450 @@
+import calendar
+import math
+from datetime import datetime, timedelta
+
+from sqlalchemy import case, func, tuple_
+from sqlalchemy.dialects import postgresql, sqlite
+
+from app import db
+from app.models import Metric, MetricChunk, MetricRollup, MetricTiming
+from app.config import (
+    ROLLUP_MAX_POINTS,
+    METRIC_RAW_RETENTION_DAYS,
+    ROLLUP_RETENTION_DAYS,
+    PROBE_TIMING_RETENTION_DAYS,
+    PRUNE_BATCH_SIZE,
+)
+from app.utils.logger import logger
+
+MINUTE, HOUR, DAY = 60, 3600, 86400
+RESOLUTIONS = (MINUTE, HOUR, DAY)
+RESOLUTION_NAMES = {"1m": MINUTE, "1h": HOUR, "1d": DAY}
+_UNITS = {"s": 1, "m": MINUTE, "h": HOUR, "d": DAY}
+
+#Latency histogram: log-spaced buckets (x1.2 per bucket) from 1 ms to ~60 s,
+#stored sparsely as "index:count,..." so rollups can be merged and give percentiles
+_GROWTH = 1.2
+_BUCKETS = int(math.log(60000) / math.log(_GROWTH)) + 1
+HISTOGRAM_COMPACT_LENGTH = 1024     # Appended histograms longer than this are re-encoded right after the upsert
+
+_INSERTS = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}
+
+
+def to_epoch(timestamp):
+    """Naive-UTC datetime -> epoch seconds."""
+    return calendar.timegm(timestamp.utctimetuple())
+
+
+def from_epoch(seconds):
+    return datetime.utcfromtimestamp(seconds)
+
+
+def parse_timestamp(value):
+    """Parse an ISO-8601 string or epoch seconds into a naive-UTC datetime (None if invalid)."""
+    if value is None or value == "":
+        return None
+    try:
+        return from_epoch(float(value))
+    except (OverflowError, OSError):
+        return None     # inf, nan or far outside the datetime range
+    except ValueError:
+        pass
+    try:
+        parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    if parsed.tzinfo is not None:
+        parsed = datetime.utcfromtimestamp(parsed.timestamp())
+    return parsed
+
+
+def parse_duration(value):
+    """Parse "90", "5m", "1h" or "1d" into seconds (None if invalid)."""
+    if not value:
+        return None
+    value = value.strip().lower()
+    unit = _UNITS.get(value[-1])
+    number = value[:-1] if unit else value
+    try:
+        seconds = int(number) * (unit or 1)
+    except ValueError:
+        return None
+    return seconds if seconds > 0 else None
+
+
+def latency_bucket(ms):
+    if ms <= 1:
+        return 0
+    return min(_BUCKETS - 1, int(math.log(ms) / math.log(_GROWTH)))
+
+
+def encode_histogram(histogram):
+    return ",".join(f"{index}:{count}" for index, count in sorted(histogram.items()) if count)
+
+
+def decode_histogram(text):
+    histogram = {}
+    if text:
+        for part in text.split(","):
+            if part:
+                index, count = part.split(":")
+                histogram[int(index)] = histogram.get(int(index), 0) + int(count)
+    return histogram
+
+
+def merge_histograms(histograms):
+    merged = {}
+    for histogram in histograms:
+        for index, count in histogram.items():
+            merged[index] = merged.get(index, 0) + count
+    return merged
+
+
+def percentile(histogram, q):
+    """Estimate the q-th percentile (0-100) in ms from a bucket histogram."""
+    total = sum(histogram.values())
+    if not total:
+        return None
+    rank = q / 100 * total
+    seen = 0
+    for index in sorted(histogram):
+        seen += histogram[index]
+        if seen >= rank:
+            #Geometric middle of the bucket
+            return _GROWTH ** (index + 0.5)
+    return _GROWTH ** (max(histogram) + 0.5)
+
+
+def update_rollups(rows):
+    """Fold freshly inserted metric rows into the 1m/1h/1d rollups (caller commits).
+
+    rows: dicts with website_id, timestamp, uptime and response_time.
+    """
+    if not rows:
+        return
+    deltas = {}
+    for row in rows:
+        epoch = to_epoch(row["timestamp"])
+        for resolution in RESOLUTIONS:
+            key = (row["website_id"], resolution, epoch - epoch % resolution)
+            delta = deltas.get(key)
+            if delta is None:
+                delta = deltas[key] = {"count": 0, "up": 0, "latencies": []}
+            delta["count"] += 1
+            if row["uptime"]:
+                delta["up"] += 1
+            if row["response_time"] and row["response_time"] > 0:
+                delta["latencies"].append(row["response_time"])
+
+    values = []
+    for (website_id, resolution, bucket_start), delta in sorted(deltas.items()):
+        latencies = delta["latencies"]
+        histogram = {}
+        for latency in latencies:
+            index = latency_bucket(latency)
+            histogram[index] = histogram.get(index, 0) + 1
+        values.append({
+            "website_id": website_id,
+            "resolution": resolution,
+            "bucket_start": bucket_start,
+            "count": delta["count"],
+            "up_count": delta["up"],
+            "latency_count": len(latencies),
+            "latency_sum": sum(latencies),
+            "latency_min": min(latencies) if latencies else None,
+            "latency_max": max(latencies) if latencies else None,
+            "histogram": encode_histogram(histogram),
+        })
+
+    insert = _INSERTS.get(db.session.get_bind().dialect.name)
+    if insert is not None:
+        #Additive upsert: concurrent writers (monitor, /metrics/add, /status) merge instead of racing.
+        #Keys go in sorted order so two writers can't deadlock on each other's rows.
+        for offset in range(0, len(values), 500):
+            _upsert(insert, values[offset:offset + 500])
+        return
+
+    # Other databases: read-modify-write
+    existing = {
+        (rollup.website_id, rollup.resolution, rollup.bucket_start): rollup
+        for rollup in db.session.execute(
+            db.select(MetricRollup).where(
+                MetricRollup.website_id.in_({value["website_id"] for value in values}),
+                MetricRollup.bucket_start.in_({value["bucket_start"] for value in values}),
+            )
+        ).scalars()
+    }
+    for value in values:
+        rollup = existing.get((value["website_id"], value["resolution"], value["bucket_start"]))
+        if rollup is None:
+            db.session.add(MetricRollup(**value))
+            continue
+        rollup.count += value["count"]
+        rollup.up_count += value["up_count"]
+        if value["latency_count"]:
+            rollup.latency_count += value["latency_count"]
+            rollup.latency_sum += value["latency_sum"]
+            rollup.latency_min = value["latency_min"] if rollup.latency_min is None else min(rollup.latency_min, value["latency_min"])
+            rollup.latency_max = value["latency_max"] if rollup.latency_max is None else max(rollup.latency_max, value["latency_max"])
+            rollup.histogram = encode_histogram(merge_histograms([decode_histogram(rollup.histogram), decode_histogram(value["histogram"])]))
+
+
+def _upsert(insert, values):
+    stmt = insert(MetricRollup).values(values)
+    new = stmt.excluded
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[MetricRollup.website_id, MetricRollup.resolution, MetricRollup.bucket_start],
+        set_={
+            "count": MetricRollup.count + new.count,
+            "up_count": MetricRollup.up_count + new.up_count,
+            "latency_count": MetricRollup.latency_count + new.latency_count,
+            "latency_sum": MetricRollup.latency_sum + new.latency_sum,
+            "latency_min": case(
+                (MetricRollup.latency_min.is_(None), new.latency_min),
+                (new.latency_min < MetricRollup.latency_min, new.latency_min),
+                else_=MetricRollup.latency_min,
+            ),
+            "latency_max": case(
+                (MetricRollup.latency_max.is_(None), new.latency_max),
+                (new.latency_max > MetricRollup.latency_max, new.latency_max),
+                else_=MetricRollup.latency_max,
+            ),
+            # Histograms add up by concatenation (decode_histogram sums repeated buckets)
+            "histogram": case(
+                (new.histogram == "", MetricRollup.histogram),
+                (MetricRollup.histogram == "", new.histogram),
+                else_=MetricRollup.histogram + "," + new.histogram,
+            ),
+        },
+    ).returning(MetricRollup.website_id, MetricRollup.resolution, MetricRollup.bucket_start,
+                func.length(MetricRollup.histogram))
+    grown = [row[:3] for row in db.session.execute(stmt) if row[3] > HISTOGRAM_COMPACT_LENGTH]
+    if grown:
+        #The upsert already locked these rows for this transaction, so re-encoding them can't lose a write
+        _compact(grown)
+
+
+def _compact(keys):
+    """Re-encode the histograms of the given (website_id, resolution, bucket_start) rollups."""
+    rows = db.session.execute(
+        db.select(MetricRollup.website_id, MetricRollup.resolution, MetricRollup.bucket_start, MetricRollup.histogram)
+        .where(tuple_(MetricRollup.website_id, MetricRollup.resolution, MetricRollup.bucket_start).in_(keys))
+    ).all()
+    for website_id, resolution, bucket_start, histogram in rows:
+        db.session.execute(
+            db.update(MetricRollup)
+            .where(
+                MetricRollup.website_id == website_id,
+                MetricRollup.resolution == resolution,
+                MetricRollup.bucket_start == bucket_start,
+            )
+            .values(histogram=encode_histogram(decode_histogram(histogram)))
+        )
+
+
+def compact_histograms(batch_size=1000):
+    """Re-encode every histogram over HISTOGRAM_COMPACT_LENGTH; returns how many were compacted.
+
+    Upserts already compact the rows they grow, so this only catches leftovers
+    (rows written before that, or with a lowered threshold). Each rewrite only
+    applies if the histogram didn't change meanwhile, so a concurrent upsert is
+    never lost.
+    """
+    key = tuple_(MetricRollup.website_id, MetricRollup.resolution, MetricRollup.bucket_start)
+    compacted, last = 0, (0, 0, 0)
+    while True:
+        # Walk the primary key so every row is visited once, however many there are
+        rows = db.session.execute(
+            db.select(MetricRollup.website_id, MetricRollup.resolution, MetricRollup.bucket_start, MetricRollup.histogram)
+            .where(func.length(MetricRollup.histogram) > HISTOGRAM_COMPACT_LENGTH, key > last)
+            .order_by(MetricRollup.website_id, MetricRollup.resolution, MetricRollup.bucket_start)
+            .limit(batch_size)
+        ).all()
+        for website_id, resolution, bucket_start, histogram in rows:
+            compacted += db.session.execute(
+                db.update(MetricRollup)
+                .where(
+                    MetricRollup.website_id == website_id,
+                    MetricRollup.resolution == resolution,
+                    MetricRollup.bucket_start == bucket_start,
+                    MetricRollup.histogram == histogram,
+                )
+                .values(histogram=encode_histogram(decode_histogram(histogram)))
+            ).rowcount
+        db.session.commit()
+        if len(rows) < batch_size:
+            return compacted
+        last = tuple(rows[-1][:3])
+
+
+def retained_since(resolution, now=None):
+    """Oldest time rollups at `resolution` still cover (None when they are kept forever)."""
+    days = ROLLUP_RETENTION_DAYS.get(resolution)
+    if not days:
+        return None
+    return (now or datetime.utcnow()) - timedelta(days=days)
+
+
+def pick_resolution(start, end, max_points=ROLLUP_MAX_POINTS, now=None):
+    """Finest rollup resolution that keeps a time range under max_points buckets and still covers its start."""
+    span = max((end - start).total_seconds(), 0)
+    for resolution in RESOLUTIONS:
+        since = retained_since(resolution, now)
+        if span / resolution <= max_points and (since is None or start >= since):
+            return resolution
+    return DAY
+
+
+def aggregate_source(bucket):
+    """Rollup resolution aggregate_metrics() builds `bucket`-second buckets from."""
+    return max(resolution for resolution in RESOLUTIONS if bucket % resolution == 0)
+
+
+def serialize_rollup(rollup):
+    histogram = decode_histogram(rollup.histogram)
+    return {
+        "timestamp": from_epoch(rollup.bucket_start).isoformat(),
+        "resolution": rollup.resolution,
+        "count": rollup.count,
+        "uptime": rollup.up_count / rollup.count if rollup.count else 0.0,
+        "avg_response_time": rollup.latency_sum / rollup.latency_count if rollup.latency_count else None,
+        "min_response_time": rollup.latency_min,
+        "max_response_time": rollup.latency_max,
+        "p95_response_time": percentile(histogram, 95),
+    }
+
+
+def read_rollups(website_id, start, end, resolution=None):
+    """Rollup rows for a website in [start, end), at the given or best-fitting resolution."""
+    resolution = resolution or pick_resolution(start, end)
+    first = to_epoch(start)
+    rollups = db.session.execute(
+        db.select(MetricRollup).where(
+            MetricRollup.website_id == website_id,
+            MetricRollup.resolution == resolution,
+            MetricRollup.bucket_start >= first - first % resolution,
+            MetricRollup.bucket_start < to_epoch(end),
+        ).order_by(MetricRollup.bucket_start)
+    ).scalars().all()
+    return resolution, rollups
+
+
+def aggregate_metrics(website_id, start, end, bucket):
+    """Uptime/latency stats per `bucket` seconds for a website in [start, end).
+
+    Grouped in SQL over the coarsest rollup that divides the bucket, so the
+    cost depends on the number of rollup rows, not on raw probe history.
+    bucket must be a whole number of minutes.
+    """
+    source = aggregate_source(bucket)
+    first = to_epoch(start)
+    bucket_key = (MetricRollup.bucket_start - MetricRollup.bucket_start % bucket).label("bucket")
+    rows = db.session.execute(
+        db.select(
+            bucket_key,
+            func.sum(MetricRollup.count).label("count"),
+            func.sum(MetricRollup.up_count).label("up_count"),
+            func.sum(MetricRollup.latency_count).label("latency_count"),
+            func.sum(MetricRollup.latency_sum).label("latency_sum"),
+            func.min(MetricRollup.latency_min).label("latency_min"),
+            func.max(MetricRollup.latency_max).label("latency_max"),
+            func.aggregate_strings(MetricRollup.histogram, ",").label("histogram"),
+        ).where(
+            MetricRollup.website_id == website_id,
+            MetricRollup.resolution == source,
+            MetricRollup.bucket_start >= first - first % bucket,
+            MetricRollup.bucket_start < to_epoch(end),
+        ).group_by(bucket_key).order_by(bucket_key)
+    ).all()
+
+    buckets = []
+    for row in rows:
+        histogram = decode_histogram(row.histogram)
+        buckets.append({
+            "timestamp": from_epoch(row.bucket).isoformat(),
+            "count": row.count,
+            "failures": row.count - row.up_count,
+            "uptime_pct": round(100.0 * row.up_count / row.count, 3) if row.count else 0.0,
+            "avg_response_time": row.latency_sum / row.latency_count if row.latency_count else None,
+            "min_response_time": row.latency_min,
+            "max_response_time": row.latency_max,
+            "p50_response_time": percentile(histogram, 50),
+            "p95_response_time": percentile(histogram, 95),
+            "p99_response_time": percentile(histogram, 99),
+        })
+    return buckets
+
+
+def _delete_batched(model, condition, batch_size):
+    """Delete matching rows by primary key, batch_size per transaction, so no delete holds locks for long."""
+    key = list(model.__table__.primary_key.columns)
+    deleted = 0
+    while True:
+        keys = db.session.execute(db.select(*key).where(condition).limit(batch_size)).all()
+        if keys:
+            if len(key) == 1:
+                match = key[0].in_([row[0] for row in keys])
+            else:
+                match = tuple_(*key).in_([tuple(row) for row in keys])
+            deleted += db.session.execute(db.delete(model).where(match)).rowcount
+        db.session.commit()
+        if len(keys) < batch_size:
+            return deleted
+
+
+def prune_history(now=None, batch_size=PRUNE_BATCH_SIZE):
+    """Downsampling: drop raw metrics, probe timings and fine rollups past their retention (0 = keep forever)."""
+    now = now or datetime.utcnow()
+    deleted = 0
+    if METRIC_RAW_RETENTION_DAYS:
+        cutoff = now - timedelta(days=METRIC_RAW_RETENTION_DAYS)
+        deleted += _delete_batched(Metric, Metric.timestamp < cutoff, batch_size)
+        deleted += _delete_batched(MetricChunk, MetricChunk.end_ts < cutoff, batch_size)
+    if PROBE_TIMING_RETENTION_DAYS:
+        cutoff = now - timedelta(days=PROBE_TIMING_RETENTION_DAYS)
+        deleted += _delete_batched(MetricTiming, MetricTiming.timestamp < cutoff, batch_size)
+    for resolution, days in ROLLUP_RETENTION_DAYS.items():
+        if days:
+            cutoff = to_epoch(now - timedelta(days=days))
+            deleted += _delete_batched(
+                MetricRollup,
+                (MetricRollup.resolution == resolution) & (MetricRollup.bucket_start < cutoff),
+                batch_size,
+            )
+    if deleted:
+        logger.info("🧹 Pruned %d expired metric/rollup rows", deleted)
+    return deleted
+
+
+def backfill_rollups(batch_size=5000):
+    """Build rollups from the raw metric history (run once after upgrading)."""
+    db.session.execute(db.delete(MetricRollup))
+    last_id = 0
+    total = 0
+    while True:
+        batch = db.session.execute(
+            db.select(Metric.id, Metric.website_id, Metric.timestamp, Metric.uptime, Metric.response_time)
+            .where(Metric.id > last_id).order_by(Metric.id).limit(batch_size)
+        ).all()
+        if not batch:
+            break
+        update_rollups([row._asdict() for row in batch])
+        db.session.flush()
+        last_id = batch[-1].id
+        total += len(batch)
+    # Compacted history too
+    from app.utils.metric_store import iter_chunk_rows
+    for rows in iter_chunk_rows():
+        update_rollups(rows)
+        db.session.flush()
+        total += len(rows)
+    db.session.commit()
+    logger.info("✅ Rolled up %d metrics", total)
+    return total
+
+
+if __name__ == "__main__":
+    from app import create_app
+    app = create_app()
+    with app.app_context():
+        backfill_rollups()
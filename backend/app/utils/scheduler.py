@@ -0,0 +1,114 @@
+import heapq
+import time
+
+#Allowed monitoring frequencies (seconds), shared with the frequency API
+ALLOWED_FREQUENCIES = [10, 30, 60, 300, 600, 1800, 3600]
+MIN_FREQUENCY = ALLOWED_FREQUENCIES[0]
+MAX_FREQUENCY = ALLOWED_FREQUENCIES[-1]
+DEFAULT_FREQUENCY = 300
+
+
+def frequency_to_seconds(frequency):
+    """Convert a Website.frequency value into a probe interval in seconds.
+
+    Values below the 10 s minimum are legacy minute values (the old default
+    was 5 "minutes"), everything else is clamped to the allowed range.
+    """
+    if not frequency or frequency <= 0:
+        return DEFAULT_FREQUENCY
+    if frequency < MIN_FREQUENCY:
+        frequency = frequency * 60
+    return max(MIN_FREQUENCY, min(MAX_FREQUENCY, int(frequency)))
+
+
+def _phase(website_id, interval):
+    """Stable offset inside the interval so sites don't all fire at once."""
+    return ((website_id * 2654435761) % 2**32) / 2**32 * interval
+
+
+class ProbeScheduler:
+    """Min-heap of websites keyed on their next due time."""
+
+    def __init__(self, clock=time.time):
+        self._clock = clock
+        self._heap = []         # (next_due, website_id, generation)
+        self._entries = {}      # website_id -> (interval, next_due, generation)
+        self._generation = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, website_id):
+        return website_id in self._entries
+
+    def interval(self, website_id):
+        entry = self._entries.get(website_id)
+        return entry[0] if entry else None
+
+    def _push(self, website_id, interval, next_due):
+        self._generation += 1
+        self._entries[website_id] = (interval, next_due, self._generation)
+        heapq.heappush(self._heap, (next_due, website_id, self._generation))
+
+    def add(self, website_id, frequency, now=None):
+        """Schedule a website, or reschedule it if its frequency changed."""
+        interval = frequency_to_seconds(frequency)
+        entry = self._entries.get(website_id)
+        if entry and entry[0] == interval:
+            return
+        now = self._clock() if now is None else now
+        #Start inside the next interval at the site's stable phase
+        offset = _phase(website_id, interval)
+        next_due = now - (now % interval) + offset
+        if next_due <= now:
+            next_due += interval
+        if entry:
+            #Never push an existing site further out than its old due time
+            next_due = min(next_due, max(entry[1], now))
+        self._push(website_id, interval, next_due)
+
+    def remove(self, website_id):
+        #Heap entries are dropped lazily when popped
+        self._entries.pop(website_id, None)
+
+    def sync(self, sites, now=None):
+        """Make the schedule match (website_id, frequency) pairs from the database."""
+        now = self._clock() if now is None else now
+        seen = set()
+        for website_id, frequency in sites:
+            seen.add(website_id)
+            self.add(website_id, frequency, now=now)
+        for website_id in list(self._entries):
+            if website_id not in seen:
+                self.remove(website_id)
+
+    def next_due(self):
+        """Return the earliest due time, or None if nothing is scheduled."""
+        self._discard_stale()
+        return self._heap[0][0] if self._heap else None
+
+    def pop_due(self, now=None):
+        """Return [(website_id, due_time)] for every due site and reschedule them."""
+        now = self._clock() if now is None else now
+        due = []
+        while True:
+            self._discard_stale()
+            if not self._heap or self._heap[0][0] > now:
+                break
+            next_due, website_id, _ = heapq.heappop(self._heap)
+            interval = self._entries[website_id][0]
+            due.append((website_id, next_due))
+            #Keep the phase; skip missed slots instead of bursting to catch up
+            following = next_due + interval
+            if following <= now:
+                following += interval * ((now - following) // interval + 1)
+            self._push(website_id, interval, following)
+        return due
+
+    def _discard_stale(self):
+        while self._heap:
+            next_due, website_id, generation = self._heap[0]
+            entry = self._entries.get(website_id)
+            if entry and entry[2] == generation:
+                return
+            heapq.heappop(self._heap)
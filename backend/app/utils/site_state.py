@@ -0,0 +1,86 @@
+class SiteState:
+    """Health of one monitored website as the monitor last saw it."""
+
+    __slots__ = ("is_down", "consecutive_failures", "last_alert_id", "last_latency", "changed")
+
+    def __init__(self, is_down=False, last_alert_id=None):
+        self.is_down = is_down
+        self.consecutive_failures = 0
+        self.last_alert_id = last_alert_id
+        self.last_latency = None
+        self.changed = 0    # SiteStateTable.version of its last up/down transition
+
+
+class SiteStateTable:
+    """In-memory up/down state per website, so steady-state cycles skip the Alert table."""
+
+    def __init__(self):
+        self._states = {}
+        self.loaded = False
+        self.version = 0    # Bumped on every up/down transition
+
+    def __len__(self):
+        return len(self._states)
+
+    def get(self, website_id):
+        return self._states.get(website_id)
+
+    def reconcile(self, open_alerts, since=None):
+        """Sync down/up flags with {website_id: alert_id} of unresolved 'Website Down' alerts.
+
+        Failure counters and latencies survive; a site whose alert was resolved
+        by hand goes back to 'up' and alerts again if it is still failing.
+        `since` is the table version when open_alerts was read: sites that changed
+        after that are newer than the snapshot and keep their state.
+        """
+        for website_id, state in self._states.items():
+            if website_id not in open_alerts and (since is None or state.changed <= since):
+                state.is_down = False
+                state.last_alert_id = None
+        for website_id, alert_id in open_alerts.items():
+            state = self._states.get(website_id)
+            if state is None:
+                self._states[website_id] = SiteState(is_down=True, last_alert_id=alert_id)
+            elif since is None or state.changed <= since:
+                state.is_down = True
+                state.last_alert_id = alert_id
+        self.loaded = True
+
+    def record(self, website_id, uptime, response_time):
+        """Apply one probe result; returns "down", "up" or None when nothing changed."""
+        state = self._states.get(website_id)
+        if state is None:
+            state = self._states[website_id] = SiteState()
+        if uptime:
+            state.consecutive_failures = 0
+            state.last_latency = response_time
+            if state.is_down:
+                state.is_down = False
+                self._changed(state)
+                return "up"
+        else:
+            state.consecutive_failures += 1
+            if not state.is_down:
+                state.is_down = True
+                self._changed(state)
+                return "down"
+        return None
+
+    def _changed(self, state):
+        self.version += 1
+        state.changed = self.version
+
+    def discard(self, website_ids):
+        for website_id in website_ids:
+            self._states.pop(website_id, None)
+
+    def retain(self, website_ids):
+        """Drop state for websites that no longer exist."""
+        keep = set(website_ids)
+        for website_id in [website_id for website_id in self._states if website_id not in keep]:
+            del self._states[website_id]
+
+    def clear(self):
+        self._states = {}
+        self.loaded = False
+        self.version = 0
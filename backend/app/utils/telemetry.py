@@ -0,0 +1,232 @@
+import bisect
+import hmac
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from app.config import TELEMETRY_ENABLED, TELEMETRY_HOST, TELEMETRY_TOKEN
+from app.utils.logger import logger
+
+#Seconds; probe latencies, lags and DB writes all fall somewhere in here
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _label_text(names, values):
+    if not names:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values)) + "}"
+
+
+def _number(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Instrument:
+    kind = None
+
+    def __init__(self, name, documentation, labels=()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self._lock = threading.Lock()
+        self._children = {}
+
+    def _key(self, labels):
+        return tuple(labels.get(name, "") for name in self.labels)
+
+    def header(self):
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Instrument):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        if not TELEMETRY_ENABLED:
+            return
+        key = self._key(labels)
+        with self._lock:
+            self._children[key] = self._children.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._children.get(self._key(labels), 0)
+
+    def samples(self):
+        with self._lock:
+            children = list(self._children.items())
+        return [f"{self.name}{_label_text(self.labels, key)} {_number(value)}" for key, value in children]
+
+
+class Gauge(_Instrument):
+    """A settable value, or a callback read at scrape time."""
+
+    kind = "gauge"
+
+    def __init__(self, name, documentation, labels=(), callback=None):
+        super().__init__(name, documentation, labels)
+        self.callback = callback
+
+    def set(self, value, **labels):
+        with self._lock:
+            self._children[self._key(labels)] = value
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._children[key] = self._children.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    def value(self, **labels):
+        return self._children.get(self._key(labels), 0)
+
+    def samples(self):
+        if self.callback is not None:
+            try:
+                value = self.callback()
+            except Exception as e:
+                logger.error("❌ Telemetry gauge %s failed: %s", self.name, e)
+                return []
+            return [f"{self.name} {_number(value)}"]
+        with self._lock:
+            children = list(self._children.items())
+        return [f"{self.name}{_label_text(self.labels, key)} {_number(value)}" for key, value in children]
+
+
+class Histogram(_Instrument):
+    """Cumulative-bucket histogram; observe() is a bisect and three additions."""
+
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labels=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(sorted(float(bound) for bound in buckets))
+
+    def observe(self, value, **labels):
+        if not TELEMETRY_ENABLED:
+            return
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            child = self._children.get(key)
+            if child is None:
+                child = self._children[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            child[0][index] += 1
+            child[1] += value
+            child[2] += 1
+
+    def count(self, **labels):
+        child = self._children.get(self._key(labels))
+        return child[2] if child else 0
+
+    def samples(self):
+        with self._lock:
+            children = [(key, list(counts), total, count) for key, (counts, total, count) in self._children.items()]
+        lines = []
+        for key, counts, total, count in children:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                lines.append(
+                    f"{self.name}_bucket{_label_text(self.labels + ('le',), key + (_number(bound),))} {cumulative}"
+                )
+            lines.append(f"{self.name}_sum{_label_text(self.labels, key)} {_number(total)}")
+            lines.append(f"{self.name}_count{_label_text(self.labels, key)} {count}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._instruments = {}
+
+    def register(self, instrument):
+        if instrument.name in self._instruments:
+            raise ValueError(f"Duplicate telemetry instrument {instrument.name}")
+        self._instruments[instrument.name] = instrument
+        return instrument
+
+    def counter(self, name, documentation, labels=()):
+        return self.register(Counter(name, documentation, labels))
+
+    def gauge(self, name, documentation, labels=(), callback=None):
+        return self.register(Gauge(name, documentation, labels, callback))
+
+    def histogram(self, name, documentation, labels=(), buckets=DEFAULT_BUCKETS):
+        return self.register(Histogram(name, documentation, labels, buckets))
+
+    def render(self):
+        """Prometheus text exposition of every instrument."""
+        lines = []
+        for instrument in list(self._instruments.values()):
+            lines.extend(instrument.header())
+            lines.extend(instrument.samples())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+# Monitor loop
+PROBE_SECONDS = registry.histogram("watchly_probe_duration_seconds", "Time to probe one website.", ["result"])
+PROBES = registry.counter("watchly_probes_total", "Websites probed.", ["result"])
+PROBE_PHASE_SECONDS = registry.histogram("watchly_probe_phase_seconds", "Probe time per phase (dns, connect, tls, ttfb, body).", ["phase"])
+SCHEDULE_LAG = registry.histogram("watchly_probe_schedule_lag_seconds", "How late a website was picked up after it was due.")
+QUEUE_WAIT = registry.histogram("watchly_probe_queue_wait_seconds", "Time a picked-up probe waited for a concurrency slot.")
+PHASE_SECONDS = registry.histogram("watchly_monitor_phase_seconds", "Time per probe cycle phase (probe, db_write, alerts, total).", ["phase"])
+CYCLES = registry.counter("watchly_monitor_cycles_total", "Probe cycles run.", ["outcome"])
+CONCURRENCY_LIMIT = registry.gauge("watchly_probe_concurrency_limit", "Current adaptive limit on in-flight probes.")
+PROBES_IN_FLIGHT = registry.gauge("watchly_monitor_probes_in_flight", "Websites in probe cycles that haven't finished.")
+SITES_SCHEDULED = registry.gauge("watchly_monitor_sites_scheduled", "Websites on this monitor's probe schedule.")
+ALERTS = registry.counter("watchly_alerts_total", "Alert transitions emitted.", ["transition"])
+# Email notifier
+EMAILS = registry.counter("watchly_emails_total", "Alert email outcomes.", ["outcome"])
+EMAIL_QUEUE_DEPTH = registry.gauge("watchly_email_queue_depth", "Alert emails waiting to be sent.")
+# API requests (see app.utils.profiling)
+REQUEST_SECONDS = registry.histogram("watchly_http_request_seconds", "API request wall time.", ["endpoint", "method"])
+REQUEST_QUERIES = registry.histogram("watchly_http_sql_queries", "SQL statements per API request.", ["endpoint"],
+                                     buckets=(1, 2, 3, 5, 10, 20, 50, 100, 250))
+REQUEST_SQL_SECONDS = registry.histogram("watchly_http_sql_seconds", "SQL time per API request.", ["endpoint"])
+QUERY_BUDGET_EXCEEDED = registry.counter("watchly_http_query_budget_exceeded_total", "API requests over QUERY_BUDGET.", ["endpoint"])
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        #Same bearer check as /health/telemetry
+        token = self.server.token
+        if token and not hmac.compare_digest(self.headers.get("Authorization", "").encode(), f"Bearer {token}".encode()):
+            body = b'{"error": "Unauthorized"}'
+            self.send_response(401)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            return
+        body = registry.render().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # Scrapes would flood the log
+
+
+def serve_telemetry(port, host=TELEMETRY_HOST, token=TELEMETRY_TOKEN):
+    """Expose the registry on its own port (for monitor-only processes); returns the server, or None."""
+    try:
+        server = ThreadingHTTPServer((host, port), _Handler)
+    except OSError as e:
+        logger.error("❌ Cannot serve telemetry on %s:%d: %s", host, port, e)
+        return None
+    server.token = token
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="watchly-telemetry", daemon=True).start()
+    logger.info("📈 Telemetry served on %s:%d", host, server.server_address[1])
+    return server
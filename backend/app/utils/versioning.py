@@ -0,0 +1,89 @@
+import hashlib
+import json
+import threading
+import time
+from functools import wraps
+
+from flask import Response, request
+
+from app import db
+from app.config import RESPONSE_CACHE_SIZE
+from app.models import User, Website
+from app.utils.cache import TTLCache
+
+_response_cache = TTLCache(RESPONSE_CACHE_SIZE)
+_cache_lock = threading.Lock()
+_FOREVER = float("inf")   # Entries are keyed by version, so they never go stale; LRU bounds them
+
+
+def bump_user_versions(user_ids):
+    """Mark the users' dashboard data as changed (caller commits)."""
+    user_ids = list(user_ids)
+    if user_ids:
+        db.session.execute(
+            db.update(User).where(User.id.in_(user_ids)).values(data_version=User.data_version + 1)
+        )
+
+
+def bump_site_versions(website_ids):
+    """Bump the owners of these websites (caller commits)."""
+    website_ids = list(website_ids)
+    if website_ids:
+        db.session.execute(
+            db.update(User)
+            .where(User.id.in_(db.select(Website.user_id).where(Website.id.in_(website_ids))))
+            .values(data_version=User.data_version + 1)
+        )
+
+
+def current_version(user_id):
+    # Always read fresh: the cached principal from token_required may be stale
+    return db.session.execute(db.select(User.data_version).where(User.id == user_id)).scalar() or 0
+
+
+def _etag(user_id, version):
+    digest = hashlib.blake2b(f"{user_id}:{request.full_path}".encode(), digest_size=8).hexdigest()
+    return f"{version}-{digest}"
+
+
+def versioned(f):
+    """Conditional GET for a token_required endpoint, keyed on the user's data_version.
+
+    Answers 304 when If-None-Match still matches, and (with RESPONSE_CACHE_SIZE > 0)
+    serves repeat polls from a small in-process cache without re-running the query.
+    """
+    @wraps(f)
+    def decorated(*args, current_user, **kwargs):
+        version = current_version(current_user.id)
+        etag = _etag(current_user.id, version)
+        headers = {"ETag": f'"{etag}"', "Cache-Control": "private, no-cache"}
+
+        if request.if_none_match.contains(etag):
+            return Response(status=304, headers=headers)
+
+        key = (current_user.id, request.full_path)
+        if _response_cache.max_size:
+            with _cache_lock:
+                cached = _response_cache.get(key, time.monotonic())
+            if cached is not None and cached[0] == version:
+                return Response(cached[1], 200, headers={**cached[2], **headers}, mimetype="application/json")
+
+        result = f(*args, current_user=current_user, **kwargs)
+        if not (isinstance(result, tuple) and len(result) >= 2 and result[1] == 200):
+            return result
+        extra = result[2] if len(result) > 2 else {}
+        if not _response_cache.max_size:
+            return result[0], 200, {**extra, **headers}
+
+        # Serialize once; repeat polls at this version reuse the bytes
+        body = json.dumps(result[0])
+        with _cache_lock:
+            _response_cache.put(key, (version, body, extra), _FOREVER)
+        return Response(body, 200, headers={**extra, **headers}, mimetype="application/json")
+
+    return decorated
+
+
+def clear_response_cache():
+    with _cache_lock:
+        _response_cache.clear()
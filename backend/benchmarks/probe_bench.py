@@ -0,0 +1,328 @@
+"""End-to-end benchmark of the probe engine against a local target farm.
+
+    python -m benchmarks.probe_bench --sites 2000 --out bench.json
+    python -m benchmarks.probe_bench --mode scheduled --duration 60 --baseline bench.json
+
+Runs fully offline: targets come from benchmarks.target_farm, the database is
+a throwaway SQLite file unless --database-url points at a scratch database
+(its tables are dropped), and alert emails go to a discarding sender.
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import logging
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+from benchmarks.target_farm import FarmProcess, profile_arguments, profile_from_args, site_url
+
+RESULT_VERSION = 1
+#(result key, higher is better) checked against --baseline
+COMPARED = [
+    ("throughput_per_s", True),
+    ("schedule_lag_ms.p95", False),
+    ("db_write_ms.p95", False),
+    ("alert_ms.p95", False),
+]
+
+
+def summarize(values):
+    """count/mean/p50/p95/p99/max of a list of milliseconds."""
+    if not values:
+        return {"count": 0}
+    values = sorted(values)
+
+    def pick(q):
+        return round(values[min(len(values) - 1, int(q / 100 * len(values)))], 3)
+
+    return {
+        "count": len(values),
+        "mean": round(sum(values) / len(values), 3),
+        "p50": pick(50),
+        "p95": pick(95),
+        "p99": pick(99),
+        "max": round(values[-1], 3),
+    }
+
+
+class Recorder:
+    """Collects timings from the instrumented monitor functions."""
+
+    def __init__(self):
+        self.enabled = False
+        self.batch_start = time.time()
+        self.due = {}           # website_id -> due time handed out by the scheduler
+        self.lag = []
+        self.probe = []
+        self.db_write = []
+        self.alerts = []
+        self.probes = 0
+        self.down = 0
+        self.emails = 0
+
+
+@contextlib.contextmanager
+def instrumented(monitor, recorder):
+    """Wrap the pipeline stages of app.monitor with timers (the real code still runs)."""
+    check_websites, save_metrics, evaluate_alerts = monitor.check_websites, monitor.save_metrics, monitor.evaluate_alerts
+    pop_due = monitor.probe_scheduler.pop_due
+
+    async def timed_check(website):
+        due = recorder.due.pop(website.id, recorder.batch_start)
+        started = time.time()
+        result = await check_websites(website)
+        if recorder.enabled:
+            recorder.lag.append((started - due) * 1000)
+            recorder.probe.append((time.time() - started) * 1000)
+            recorder.probes += 1
+            recorder.down += 0 if result["uptime"] else 1
+        return result
+
+    def timed_save(results):
+        started = time.perf_counter()
+        try:
+            return save_metrics(results)
+        finally:
+            if recorder.enabled:
+                recorder.db_write.append((time.perf_counter() - started) * 1000)
+
+    async def timed_alerts(results):
+        started = time.perf_counter()
+        try:
+            return await evaluate_alerts(results)
+        finally:
+            if recorder.enabled:
+                recorder.alerts.append((time.perf_counter() - started) * 1000)
+
+    def recorded_pop_due(now=None):
+        due = pop_due(now)
+        recorder.due.update(due)
+        return due
+
+    monitor.check_websites, monitor.save_metrics, monitor.evaluate_alerts = timed_check, timed_save, timed_alerts
+    monitor.probe_scheduler.pop_due = recorded_pop_due
+    try:
+        yield
+    finally:
+        monitor.check_websites, monitor.save_metrics, monitor.evaluate_alerts = check_websites, save_metrics, evaluate_alerts
+        del monitor.probe_scheduler.pop_due
+
+
+def seed(db, models, args):
+    """Fresh schema with one user and args.sites websites spread over the farm's hosts."""
+    db.drop_all()
+    db.create_all()
+    user = models.User(name="Benchmark", email="bench@example.com")
+    user.set_password("benchmark")
+    db.session.add(user)
+    db.session.commit()
+    rows = [
+        {"user_id": user.id, "url": site_url(site % args.hosts, args.port, site), "name": f"Site {site}", "frequency": args.frequency}
+        for site in range(1, args.sites + 1)
+    ]
+    for offset in range(0, len(rows), 1000):
+        db.session.execute(db.insert(models.Website), rows[offset:offset + 1000])
+    db.session.commit()
+
+
+async def run_burst(app, monitor, recorder, args):
+    """check_all_websites back to back; returns the measured wall time in seconds."""
+    elapsed = 0.0
+    try:
+        await monitor.notifier.start()
+        for round_number in range(args.warmup + args.rounds):
+            recorder.enabled = round_number >= args.warmup
+            recorder.batch_start = time.time()
+            started = time.perf_counter()
+            await monitor.check_all_websites(app)
+            if recorder.enabled:
+                elapsed += time.perf_counter() - started
+    finally:
+        await monitor.notifier.stop(5)
+        await monitor.probe_client.aclose()
+    return elapsed
+
+
+def run_scheduled(app, monitor, recorder, args):
+    """The real MonitorService for args.duration seconds after a warm-up."""
+    service = monitor.MonitorService(app)
+    service.start()
+    try:
+        time.sleep(args.warmup_seconds)
+        recorder.enabled = True
+        started = time.perf_counter()
+        time.sleep(args.duration)
+        recorder.enabled = False
+        return time.perf_counter() - started
+    finally:
+        service.stop()
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def _lookup(results, key):
+    value = results
+    for part in key.split("."):
+        value = value.get(part) if isinstance(value, dict) else None
+    return value
+
+
+def compare(current, baseline, tolerance):
+    """[(key, baseline, current, change, regressed)] for the COMPARED keys present in both runs."""
+    rows = []
+    for key, higher_is_better in COMPARED:
+        before, after = _lookup(baseline["results"], key), _lookup(current["results"], key)
+        if not before or after is None:
+            continue
+        change = (after - before) / before
+        regressed = change < -tolerance if higher_is_better else change > tolerance
+        rows.append((key, before, after, change, regressed))
+    return rows
+
+
+def run(args):
+    scratch = None
+    if args.database_url:
+        os.environ["DATABASE_URL"] = args.database_url
+    else:
+        scratch = tempfile.mkdtemp(prefix="watchly-bench-")
+        os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(scratch, 'bench.db')}"
+    #email_utils refuses to import without these; nothing is ever sent
+    os.environ.setdefault("SENDGRID_DEV_API_KEY", "benchmark")
+    os.environ.setdefault("SENDGRID_FROM_EMAIL", "bench@example.com")
+
+    from app import create_app, db, models, monitor, config
+    from app.utils.logger import logger
+    from app.utils.notifier import NotificationDispatcher
+
+    logging.getLogger().setLevel(args.log_level)  # httpx/httpcore debug lines too
+    logger.setLevel(args.log_level)
+    recorder = Recorder()
+
+    async def discard(to_email, subject, content):
+        recorder.emails += 1
+        return True
+
+    farm = FarmProcess(profile_from_args(args), hosts=args.hosts, port=args.port)
+    farm.start()
+    notifier = monitor.notifier
+    monitor.notifier = NotificationDispatcher(send=discard)
+    try:
+        app = create_app()
+        with app.app_context():
+            seed(db, models, args)
+            dialect = db.engine.dialect.name
+        with instrumented(monitor, recorder):
+            if args.mode == "burst":
+                elapsed = asyncio.run(run_burst(app, monitor, recorder, args))
+            else:
+                elapsed = run_scheduled(app, monitor, recorder, args)
+        with app.app_context():
+            metrics_written = db.session.execute(db.select(db.func.count(models.Metric.id))).scalar()
+            db.session.remove()
+            db.engine.dispose()
+    finally:
+        monitor.notifier = notifier
+        farm.stop()
+        if scratch:
+            shutil.rmtree(scratch, ignore_errors=True)
+
+    return {
+        "benchmark": "probe_engine",
+        "version": RESULT_VERSION,
+        "mode": args.mode,
+        "started_at": datetime.utcnow().isoformat(),
+        "git_commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": {
+            "sites": args.sites,
+            "rounds": args.rounds if args.mode == "burst" else None,
+            "duration_s": args.duration if args.mode == "scheduled" else None,
+            "frequency": args.frequency,
+            "database": dialect,
+            "farm": {"hosts": args.hosts, **profile_from_args(args).as_dict()},
+            "probe_timeout": config.PROBE_TIMEOUT,
+            "probe_max_connections": config.PROBE_MAX_CONNECTIONS,
+            "probe_max_per_host": config.PROBE_MAX_PER_HOST,
+            "probe_concurrency": {"min": config.PROBE_CONCURRENCY_MIN, "max": config.PROBE_CONCURRENCY_MAX,
+                                  "initial": config.PROBE_CONCURRENCY_INITIAL},
+            "metric_storage": config.METRIC_STORAGE,
+        },
+        "results": {
+            "elapsed_s": round(elapsed, 3),
+            "probes": recorder.probes,
+            "probes_down": recorder.down,
+            "throughput_per_s": round(recorder.probes / elapsed, 2) if elapsed else 0.0,
+            "schedule_lag_ms": summarize(recorder.lag),
+            "probe_ms": summarize(recorder.probe),
+            "db_write_ms": summarize(recorder.db_write),
+            "alert_ms": summarize(recorder.alerts),
+            "alert_emails": recorder.emails,
+            "metrics_written": metrics_written,
+            "concurrency": monitor.probe_limiter.as_dict(),  # Where the adaptive limit ended up
+        },
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the probe pipeline against a local target farm.")
+    parser.add_argument("--mode", choices=["burst", "scheduled"], default="burst",
+                        help="burst: check_all_websites back to back; scheduled: the real MonitorService")
+    parser.add_argument("--sites", type=int, default=500)
+    parser.add_argument("--rounds", type=int, default=3, help="Measured check_all_websites rounds (burst)")
+    parser.add_argument("--warmup", type=int, default=1, help="Unmeasured rounds first (burst)")
+    parser.add_argument("--duration", type=float, default=30.0, help="Measured seconds (scheduled)")
+    parser.add_argument("--warmup-seconds", type=float, default=5.0, help="Unmeasured seconds first (scheduled)")
+    parser.add_argument("--frequency", type=int, default=10, help="Website.frequency given to every site")
+    parser.add_argument("--database-url", help="Scratch database to use instead of a temporary SQLite file (tables are dropped!)")
+    parser.add_argument("--log-level", default="WARNING")
+    parser.add_argument("--out", help="Write the JSON results here instead of stdout")
+    parser.add_argument("--baseline", help="Earlier results to compare against; exits 1 on a regression")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed relative change before a regression is reported")
+    profile_arguments(parser)
+    args = parser.parse_args(argv)
+
+    # The app prints its routes and every saved cycle; keep stdout for the JSON
+    with contextlib.redirect_stdout(sys.stderr):
+        results = run(args)
+    text = json.dumps(results, indent=2)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(text + "\n")
+        print(f"✅ Results written to {args.out}", file=sys.stderr)
+    else:
+        print(text)
+
+    r = results["results"]
+    print(f"📊 {r['probes']} probes in {r['elapsed_s']}s = {r['throughput_per_s']}/s, "
+          f"lag p95 {r['schedule_lag_ms'].get('p95')} ms, db write p95 {r['db_write_ms'].get('p95')} ms, "
+          f"alerts p95 {r['alert_ms'].get('p95')} ms", file=sys.stderr)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline.get("mode") != results["mode"] or baseline["config"].get("sites") != results["config"]["sites"]:
+            print("⚠️ Baseline was run with a different mode or site count; comparing anyway", file=sys.stderr)
+        rows = compare(results, baseline, args.tolerance)
+        for key, before, after, change, regressed in rows:
+            print(f"{'❌' if regressed else '✅'} {key}: {before} -> {after} ({change:+.1%})", file=sys.stderr)
+        if any(row[4] for row in rows):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
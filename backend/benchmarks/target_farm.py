@@ -0,0 +1,204 @@
+import argparse
+import asyncio
+import hashlib
+import multiprocessing
+import random
+import sys
+
+#Synthetic HTTP targets for benchmarks: one tiny asyncio HTTP/1.1 server per
+#loopback address (127.0.0.1, 127.0.0.2, ...), so the probe client sees many
+#distinct hosts without leaving the machine. Linux routes all of 127/8 to lo;
+#on macOS add aliases first (ifconfig lo0 alias 127.0.0.2 ...) or use --hosts 1.
+
+
+def _stable_fraction(site, salt):
+    """Deterministic 0..1 value per site, so a site keeps its profile across runs."""
+    digest = hashlib.blake2b(f"{salt}:{site}".encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "big") / 2**64
+
+
+class FarmProfile:
+    """How the fake targets behave."""
+
+    def __init__(self, latency_ms=50.0, jitter_ms=20.0, error_rate=0.0, down_rate=0.0,
+                 redirect_rate=0.0, slow_rate=0.0, slow_body_ms=500.0, body_bytes=1024, seed=1):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate          # Per request: random 503s (flapping sites)
+        self.down_rate = down_rate            # Per site: always 503
+        self.redirect_rate = redirect_rate    # Per site: 302 to a second URL first
+        self.slow_rate = slow_rate            # Per request: body trickled over slow_body_ms
+        self.slow_body_ms = slow_body_ms
+        self.body_bytes = body_bytes
+        self.seed = seed
+
+    def as_dict(self):
+        return dict(vars(self))
+
+    def is_down(self, site):
+        return _stable_fraction(site, "down") < self.down_rate
+
+    def redirects(self, site):
+        return _stable_fraction(site, "redirect") < self.redirect_rate
+
+
+def site_url(host_index, port, site):
+    """URL the benchmark seeds for site number `site`."""
+    return f"http://127.0.0.{host_index + 1}:{port}/s/{site}"
+
+
+async def _read_request(reader):
+    """Request line + headers of the next request, or None when the client hung up."""
+    line = await reader.readline()
+    if not line:
+        return None
+    keep_alive = True
+    while True:
+        header = await reader.readline()
+        if header in (b"\r\n", b"\n", b""):
+            break
+        if header.lower().startswith(b"connection:") and b"close" in header.lower():
+            keep_alive = False
+    parts = line.decode("latin-1").split()
+    return (parts[1] if len(parts) > 1 else "/"), keep_alive
+
+
+class TargetFarm:
+    def __init__(self, profile, hosts=16, port=8800):
+        self.profile = profile
+        self.hosts = hosts
+        self.port = port
+        self.random = random.Random(profile.seed)
+        self.requests = 0
+        self._body = b"x" * profile.body_bytes
+
+    async def _handle(self, reader, writer):
+        try:
+            while True:
+                request = await _read_request(reader)
+                if request is None:
+                    break
+                path, keep_alive = request
+                await self._respond(path, writer)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def _respond(self, path, writer):
+        self.requests += 1
+        profile = self.profile
+        parts = path.split("/")
+        site = int(parts[2]) if len(parts) > 2 and parts[2].isdigit() else 0
+        final = path.endswith("/final")
+
+        delay = max(0.0, profile.latency_ms + self.random.uniform(-profile.jitter_ms, profile.jitter_ms))
+        await asyncio.sleep(delay / 1000)
+
+        if profile.redirects(site) and not final:
+            writer.write(
+                f"HTTP/1.1 302 Found\r\nLocation: /s/{site}/final\r\nContent-Length: 0\r\n\r\n".encode()
+            )
+            await writer.drain()
+            return
+        if profile.is_down(site) or self.random.random() < profile.error_rate:
+            status, body = "503 Service Unavailable", b"unavailable"
+        else:
+            status, body = "200 OK", self._body
+        writer.write(f"HTTP/1.1 {status}\r\nContent-Type: text/plain\r\nContent-Length: {len(body)}\r\n\r\n".encode())
+
+        if self.random.random() < profile.slow_rate and len(body) > 1:
+            #Trickle the body in a few chunks so the client waits on the read
+            chunks = 5
+            step = max(1, len(body) // chunks)
+            for offset in range(0, len(body), step):
+                writer.write(body[offset:offset + step])
+                await writer.drain()
+                await asyncio.sleep(profile.slow_body_ms / 1000 / chunks)
+        else:
+            writer.write(body)
+            await writer.drain()
+
+    async def serve(self, ready=None, stop=None):
+        servers = [
+            await asyncio.start_server(self._handle, f"127.0.0.{index + 1}", self.port, backlog=1024)
+            for index in range(self.hosts)
+        ]
+        if ready is not None:
+            ready.set()
+        try:
+            if stop is None:
+                await asyncio.Event().wait()
+            else:
+                while not stop.is_set():
+                    await asyncio.sleep(0.2)
+        finally:
+            for server in servers:
+                server.close()
+
+
+def _run(profile, hosts, port, ready, stop):
+    asyncio.run(TargetFarm(profile, hosts, port).serve(ready, stop))
+
+
+class FarmProcess:
+    """Runs a TargetFarm in a child process, so serving doesn't compete with the probe loop."""
+
+    def __init__(self, profile, hosts=16, port=8800):
+        self.profile = profile
+        self.hosts = hosts
+        self.port = port
+        context = multiprocessing.get_context("spawn")
+        self._ready = context.Event()
+        self._stop = context.Event()
+        self._process = context.Process(
+            target=_run, args=(profile, hosts, port, self._ready, self._stop), name="watchly-target-farm", daemon=True
+        )
+
+    def start(self, timeout=10):
+        self._process.start()
+        if not self._ready.wait(timeout):
+            self.stop()
+            raise RuntimeError(f"Target farm did not start on port {self.port} (exit code {self._process.exitcode})")
+
+    def stop(self, timeout=5):
+        self._stop.set()
+        self._process.join(timeout)
+        if self._process.is_alive():
+            self._process.terminate()
+
+
+def profile_arguments(parser):
+    """Add the FarmProfile options to an argparse parser."""
+    parser.add_argument("--hosts", type=int, default=16, help="Loopback addresses to serve on")
+    parser.add_argument("--port", type=int, default=8800)
+    parser.add_argument("--latency-ms", type=float, default=50.0)
+    parser.add_argument("--jitter-ms", type=float, default=20.0)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of requests answered with 503")
+    parser.add_argument("--down-rate", type=float, default=0.0, help="Share of sites that always answer 503")
+    parser.add_argument("--redirect-rate", type=float, default=0.0, help="Share of sites that redirect once")
+    parser.add_argument("--slow-rate", type=float, default=0.0, help="Share of requests with a trickled body")
+    parser.add_argument("--slow-body-ms", type=float, default=500.0)
+    parser.add_argument("--body-bytes", type=int, default=1024)
+    parser.add_argument("--seed", type=int, default=1)
+
+
+def profile_from_args(args):
+    return FarmProfile(
+        latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, error_rate=args.error_rate,
+        down_rate=args.down_rate, redirect_rate=args.redirect_rate, slow_rate=args.slow_rate,
+        slow_body_ms=args.slow_body_ms, body_bytes=args.body_bytes, seed=args.seed,
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve synthetic probe targets on loopback addresses.")
+    profile_arguments(parser)
+    args = parser.parse_args()
+    print(f"🎯 Serving {args.hosts} hosts on port {args.port}, e.g. {site_url(0, args.port, 1)}", file=sys.stderr)
+    try:
+        asyncio.run(TargetFarm(profile_from_args(args), args.hosts, args.port).serve())
+    except KeyboardInterrupt:
+        pass
@@ -7,6 +7,8 @@ from flask_cors import CORS
 from app import create_app, db
 from app.models import User, Website, Metric, Alert
 from app.monitor import start_monitoring
+from app.config import MONITOR_MODE, DB_POOL_WARMUP
+from app.utils.db_pool import warm_up
 from app.utils.email_utils import send_email_via_sendgrid, send_email_via_cloudflare
 
 # Create the Flask app
@@ -107,10 +109,14 @@ def initialize_app():
         #
         db.create_all()
         print("✅ Database created successfully!")
-
-    # Start monitoring in a separate thread
-    monitoring_thread = threading.Thread(target=start_monitoring, args=(app,), daemon=True)
-    monitoring_thread.start()
+        # Open pooled connections now so the first requests skip connection setup
+        warm_up(db.engine, DB_POOL_WARMUP)
+
+    # Start monitoring in a separate thread. Every worker campaigns, but only the
+    # elected leader probes. With MONITOR_MODE=off run `python -m app.monitor` instead.
+    if MONITOR_MODE == "embedded":
+        monitoring_thread = threading.Thread(target=start_monitoring, args=(app,), daemon=True)
+        monitoring_thread.start()
 
 # ---------------------------------------------------------------------
 # Only run the built-in Flask server if we run 'python main.py' directly.
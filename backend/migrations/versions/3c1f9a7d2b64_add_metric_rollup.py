@@ -0,0 +1,37 @@
+"""Add metric_rollup table
+
+Revision ID: 3c1f9a7d2b64
+Revises: 818e60925f51
+Create Date: 2026-10-18 19:30:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3c1f9a7d2b64'
+down_revision = '818e60925f51'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('metric_rollup',
+    sa.Column('website_id', sa.Integer(), nullable=False),
+    sa.Column('resolution', sa.Integer(), nullable=False),
+    sa.Column('bucket_start', sa.Integer(), nullable=False),
+    sa.Column('count', sa.Integer(), nullable=False),
+    sa.Column('up_count', sa.Integer(), nullable=False),
+    sa.Column('latency_count', sa.Integer(), nullable=False),
+    sa.Column('latency_sum', sa.Float(), nullable=False),
+    sa.Column('latency_min', sa.Float(), nullable=True),
+    sa.Column('latency_max', sa.Float(), nullable=True),
+    sa.Column('histogram', sa.Text(), nullable=False),
+    sa.ForeignKeyConstraint(['website_id'], ['website.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('website_id', 'resolution', 'bucket_start')
+    )
+
+
+def downgrade():
+    op.drop_table('metric_rollup')
@@ -0,0 +1,50 @@
+"""Add latest_status table and composite metric index
+
+Revision ID: 5e2d8b4a9f13
+Revises: 3c1f9a7d2b64
+Create Date: 2026-10-18 20:15:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5e2d8b4a9f13'
+down_revision = '3c1f9a7d2b64'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('latest_status',
+    sa.Column('website_id', sa.Integer(), nullable=False),
+    sa.Column('response_time', sa.Float(), nullable=False),
+    sa.Column('uptime', sa.Float(), nullable=False),
+    sa.Column('timestamp', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['website_id'], ['website.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('website_id')
+    )
+    with op.batch_alter_table('metric', schema=None) as batch_op:
+        batch_op.create_index('ix_metric_website_id_timestamp', ['website_id', 'timestamp'], unique=False)
+        batch_op.drop_index(batch_op.f('ix_metric_website_id'))
+
+    # Seed from existing history
+    op.execute("""
+        INSERT INTO latest_status (website_id, response_time, uptime, timestamp)
+        SELECT m.website_id, m.response_time, m.uptime, m.timestamp
+        FROM metric m
+        WHERE m.id = (
+            SELECT m2.id FROM metric m2
+            WHERE m2.website_id = m.website_id
+            ORDER BY m2.timestamp DESC, m2.id DESC
+            LIMIT 1
+        )
+    """)
+
+
+def downgrade():
+    with op.batch_alter_table('metric', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_metric_website_id'), ['website_id'], unique=False)
+        batch_op.drop_index('ix_metric_website_id_timestamp')
+    op.drop_table('latest_status')
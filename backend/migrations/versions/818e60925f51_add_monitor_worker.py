@@ -0,0 +1,37 @@
+"""Add monitor_worker table for sharded probe workers
+
+Revision ID: 818e60925f51
+Revises: 8317bb261285
+Create Date: 2026-10-18 19:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '818e60925f51'
+down_revision = '8317bb261285'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('monitor_worker',
+    sa.Column('id', sa.String(length=100), nullable=False),
+    sa.Column('started_at', sa.DateTime(), nullable=False),
+    sa.Column('heartbeat_at', sa.DateTime(), nullable=False),
+    sa.Column('sites_owned', sa.Integer(), nullable=False),
+    sa.Column('probes_total', sa.BigInteger(), nullable=False),
+    sa.Column('probes_per_second', sa.Float(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('monitor_worker', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_monitor_worker_heartbeat_at'), ['heartbeat_at'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('monitor_worker', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_monitor_worker_heartbeat_at'))
+
+    op.drop_table('monitor_worker')
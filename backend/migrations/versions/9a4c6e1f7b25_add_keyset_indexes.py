@@ -0,0 +1,36 @@
+"""Add (website_id, timestamp, id) indexes for keyset pagination
+
+Revision ID: 9a4c6e1f7b25
+Revises: 5e2d8b4a9f13
+Create Date: 2026-10-18 21:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9a4c6e1f7b25'
+down_revision = '5e2d8b4a9f13'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('metric', schema=None) as batch_op:
+        batch_op.drop_index('ix_metric_website_id_timestamp')
+        batch_op.create_index('ix_metric_website_id_timestamp', ['website_id', 'timestamp', 'id'], unique=False)
+
+    with op.batch_alter_table('alert', schema=None) as batch_op:
+        batch_op.create_index('ix_alert_website_id_timestamp', ['website_id', 'timestamp', 'id'], unique=False)
+        batch_op.drop_index(batch_op.f('ix_alert_website_id'))
+
+
+def downgrade():
+    with op.batch_alter_table('alert', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_alert_website_id'), ['website_id'], unique=False)
+        batch_op.drop_index('ix_alert_website_id_timestamp')
+
+    with op.batch_alter_table('metric', schema=None) as batch_op:
+        batch_op.drop_index('ix_metric_website_id_timestamp')
+        batch_op.create_index('ix_metric_website_id_timestamp', ['website_id', 'timestamp'], unique=False)
@@ -0,0 +1,35 @@
+"""Copy website.user_id onto alert for per-user keyset pagination
+
+Revision ID: a7c9e2b4d6f8
+Revises: f4b6d8e0a2c3
+Create Date: 2026-10-19 04:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a7c9e2b4d6f8'
+down_revision = 'f4b6d8e0a2c3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('alert', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('user_id', sa.Integer(), nullable=True))
+
+    op.execute("UPDATE alert SET user_id = (SELECT website.user_id FROM website WHERE website.id = alert.website_id)")
+
+    with op.batch_alter_table('alert', schema=None) as batch_op:
+        batch_op.alter_column('user_id', existing_type=sa.Integer(), nullable=False)
+        batch_op.create_foreign_key('fk_alert_user_id_user', 'user', ['user_id'], ['id'], ondelete='CASCADE')
+        batch_op.create_index('ix_alert_user_id_timestamp', ['user_id', 'timestamp', 'id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('alert', schema=None) as batch_op:
+        batch_op.drop_index('ix_alert_user_id_timestamp')
+        batch_op.drop_constraint('fk_alert_user_id_user', type_='foreignkey')
+        batch_op.drop_column('user_id')
@@ -0,0 +1,37 @@
+"""Add metric_chunk table for compacted metric history
+
+Revision ID: c41d7a9e2f60
+Revises: b7e3f05d1c88
+Create Date: 2026-10-18 23:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c41d7a9e2f60'
+down_revision = 'b7e3f05d1c88'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('metric_chunk',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('website_id', sa.Integer(), nullable=False),
+    sa.Column('start_ts', sa.DateTime(), nullable=False),
+    sa.Column('end_ts', sa.DateTime(), nullable=False),
+    sa.Column('count', sa.Integer(), nullable=False),
+    sa.Column('data', sa.LargeBinary(), nullable=False),
+    sa.ForeignKeyConstraint(['website_id'], ['website.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('metric_chunk', schema=None) as batch_op:
+        batch_op.create_index('ix_metric_chunk_website_id_end_ts', ['website_id', 'end_ts'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('metric_chunk', schema=None) as batch_op:
+        batch_op.drop_index('ix_metric_chunk_website_id_end_ts')
+    op.drop_table('metric_chunk')
@@ -0,0 +1,28 @@
+"""Replace website user_id index with (user_id, url)
+
+Revision ID: d58b2e6f9a17
+Revises: c41d7a9e2f60
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd58b2e6f9a17'
+down_revision = 'c41d7a9e2f60'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('website', schema=None) as batch_op:
+        batch_op.create_index('ix_website_user_id_url', ['user_id', 'url'], unique=False)
+        batch_op.drop_index(batch_op.f('ix_website_user_id'))
+
+
+def downgrade():
+    with op.batch_alter_table('website', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_website_user_id'), ['user_id'], unique=False)
+        batch_op.drop_index('ix_website_user_id_url')
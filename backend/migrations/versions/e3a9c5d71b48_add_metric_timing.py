@@ -0,0 +1,39 @@
+"""Add metric_timing table for per-phase probe timings
+
+Revision ID: e3a9c5d71b48
+Revises: d58b2e6f9a17
+Create Date: 2026-10-19 02:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e3a9c5d71b48'
+down_revision = 'd58b2e6f9a17'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('metric_timing',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('website_id', sa.Integer(), nullable=False),
+    sa.Column('timestamp', sa.DateTime(), nullable=False),
+    sa.Column('dns_ms', sa.Float(precision=24), nullable=True),
+    sa.Column('connect_ms', sa.Float(precision=24), nullable=True),
+    sa.Column('tls_ms', sa.Float(precision=24), nullable=True),
+    sa.Column('ttfb_ms', sa.Float(precision=24), nullable=True),
+    sa.Column('body_ms', sa.Float(precision=24), nullable=True),
+    sa.ForeignKeyConstraint(['website_id'], ['website.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('metric_timing', schema=None) as batch_op:
+        batch_op.create_index('ix_metric_timing_website_id_timestamp', ['website_id', 'timestamp'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('metric_timing', schema=None) as batch_op:
+        batch_op.drop_index('ix_metric_timing_website_id_timestamp')
+    op.drop_table('metric_timing')
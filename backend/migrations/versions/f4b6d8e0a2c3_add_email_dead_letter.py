@@ -0,0 +1,40 @@
+"""Add email_dead_letter table for undeliverable alert emails
+
+Revision ID: f4b6d8e0a2c3
+Revises: e3a9c5d71b48
+Create Date: 2026-10-19 03:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f4b6d8e0a2c3'
+down_revision = 'e3a9c5d71b48'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('email_dead_letter',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('to_email', sa.String(length=200), nullable=False),
+    sa.Column('subject', sa.String(length=255), nullable=False),
+    sa.Column('content', sa.Text(), nullable=False),
+    sa.Column('attempts', sa.Integer(), nullable=False),
+    sa.Column('last_error', sa.Text(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('failed_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('email_dead_letter', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_email_dead_letter_to_email'), ['to_email'], unique=False)
+        batch_op.create_index(batch_op.f('ix_email_dead_letter_failed_at'), ['failed_at'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('email_dead_letter', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_email_dead_letter_failed_at'))
+        batch_op.drop_index(batch_op.f('ix_email_dead_letter_to_email'))
+    op.drop_table('email_dead_letter')
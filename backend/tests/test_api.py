@@ -1,5 +1,6 @@
 import json
 import pytest
+from datetime import datetime
 from app import create_app, db
 from app.models import User, Website, Metric, Alert
 
@@ -107,3 +108,121 @@ def test_status(client):
     response = client.get('/status')
     print("TEST RESPONSE:", response.status_code, response.data)
     assert response.status_code == 200, f"Unexpected status code: {response.status_code}, response: {response.data}"
+
+def test_alert_history_pagination(client):
+    client.post('/auth/register', json={"name": "Test User", "email": "test@example.com", "password": "securepass"})
+    login_response = client.post('/auth/login', json={"email": "test@example.com", "password": "securepass"})
+    headers = {"Authorization": f"Bearer {json.loads(login_response.data)['access_token']}"}
+    client.post('/websites/add', json={"url": "https://example.com", "name": "Example"}, headers=headers)
+    with client.application.app_context():
+        # Two alerts share a timestamp, so the id tie-breaker is exercised too
+        stamps = [datetime(2024, 1, 1, 12, minute) for minute in (0, 1, 1, 2, 3)]
+        db.session.add_all([Alert(website_id=1, user_id=1, alert_type="Website Down", timestamp=stamp) for stamp in stamps])
+        db.session.commit()
+
+    seen, cursor = [], None
+    while True:
+        response = client.get('/alerts/history', query_string={"limit": 2, "cursor": cursor}, headers=headers)
+        assert response.status_code == 200
+        seen.extend(alert["id"] for alert in response.get_json())
+        cursor = response.headers.get("X-Next-Cursor")
+        if not cursor:
+            break
+    assert seen == [5, 4, 3, 2, 1]
+
+    response = client.get('/alerts/history', query_string={"cursor": "not-a-cursor"}, headers=headers)
+    assert response.status_code == 400
+
+def test_token_required_caches_verified_user(client):
+    from sqlalchemy import event
+    client.post('/auth/register', json={"name": "Test User", "email": "test@example.com", "password": "securepass"})
+    login_response = client.post('/auth/login', json={"email": "test@example.com", "password": "securepass"})
+    headers = {"Authorization": f"Bearer {json.loads(login_response.data)['access_token']}"}
+    assert client.get('/auth/profile', headers=headers).status_code == 200
+
+    statements = []
+    with client.application.app_context():
+        engine = db.engine
+    listener = lambda conn, cursor, statement, *args: statements.append(statement)
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        response = client.get('/auth/profile', headers=headers)
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+    assert response.status_code == 200
+    assert statements == []
+
+    # Profile updates invalidate the cached copy
+    client.put('/auth/profile', json={"name": "Renamed"}, headers=headers)
+    assert client.get('/auth/profile', headers=headers).get_json()["name"] == "Renamed"
+
+def test_dashboard_reads_answer_304_until_data_changes(client):
+    client.post('/auth/register', json={"name": "Test User", "email": "test@example.com", "password": "securepass"})
+    login_response = client.post('/auth/login', json={"email": "test@example.com", "password": "securepass"})
+    headers = {"Authorization": f"Bearer {json.loads(login_response.data)['access_token']}"}
+    client.post('/websites/add', json={"url": "https://example.com", "name": "Example"}, headers=headers)
+
+    first = client.get('/websites', headers=headers)
+    etag = first.headers["ETag"]
+    assert first.status_code == 200
+
+    unchanged = client.get('/websites', headers={**headers, "If-None-Match": etag})
+    assert unchanged.status_code == 304
+
+    # A new metric bumps the owner's version, so the next poll gets fresh data
+    added = client.post('/metrics/add', json={"website_id": 1, "response_time": 50.0, "uptime": 1}, headers=headers)
+    assert added.status_code == 201 and added.get_json()["metric"]["id"] == 1
+    changed = client.get('/websites', headers={**headers, "If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["ETag"] != etag
+    assert changed.get_json()[0]["response_time"] == 50.0
+
+def test_bulk_import_websites(client):
+    client.post('/auth/register', json={"name": "Test User", "email": "test@example.com", "password": "securepass"})
+    login_response = client.post('/auth/login', json={"email": "test@example.com", "password": "securepass"})
+    headers = {"Authorization": f"Bearer {json.loads(login_response.data)['access_token']}"}
+    client.post('/websites/add', json={"url": "https://example.com", "name": "Example"}, headers=headers)
+
+    csv_body = "url,name,frequency\nexample.com,Dup,\nHTTPS://Example.org:443/,Org,60\nftp://nope.example,,\nexample.org,Again,\nnot a url,,\n"
+    response = client.post('/websites/bulk', data=csv_body, content_type="text/csv", headers=headers)
+    summary = response.get_json()
+    assert response.status_code == 201
+    assert summary["created"] == 1 and summary["duplicates"] == 2 and summary["failed"] == 2
+    assert summary["websites"][0]["url"] == "https://example.org"
+    assert [error["row"] for error in summary["errors"]] == [3, 5]
+
+    ndjson_body = '{"url": "https://a.example.com"}\n{"url": "https://b.example.com", "frequency": 300}\n{broken\n'
+    response = client.post('/websites/bulk', data=ndjson_body, content_type="application/x-ndjson", headers=headers)
+    assert response.get_json()["created"] == 2 and response.get_json()["failed"] == 1
+    assert len(client.get('/websites', headers=headers).get_json()) == 4
+
+    #Wrong JSON types are row errors, not server errors
+    rows = [{"url": 42}, {"url": "https://c.example.com", "name": ["x"]}, {"url": "https://d.example.com", "frequency": 7}]
+    response = client.post('/websites/bulk', json=rows, headers=headers)
+    assert response.status_code == 200 and response.get_json()["failed"] == 3
+    assert client.post('/websites/bulk', json=5, headers=headers).status_code == 400
+
+    from app.utils.bulk_import import normalize_url
+    assert normalize_url("http://[::1]:8080/x") == "http://[::1]:8080/x"
+    assert normalize_url("https://[2001:DB8::1]:443/") == "https://[2001:db8::1]"
+
+def test_requests_report_sql_count_and_profile(client, tmp_path, monkeypatch):
+    from app.utils import profiling
+    client.post('/auth/register', json={"name": "Test User", "email": "test@example.com", "password": "securepass"})
+    login_response = client.post('/auth/login', json={"email": "test@example.com", "password": "securepass"})
+    headers = {"Authorization": f"Bearer {json.loads(login_response.data)['access_token']}"}
+    for i in range(3):
+        client.post('/websites/add', json={"url": f"https://site{i}.example.com", "name": "Site"}, headers=headers)
+
+    assert "X-Query-Count" not in client.get('/alerts', headers=headers).headers   # Off unless enabled
+    monkeypatch.setattr(profiling, "QUERY_TIMING_HEADERS", True)
+    response = client.get('/alerts', headers=headers)
+    assert response.status_code == 200
+    assert int(response.headers["X-Query-Count"]) <= 2  # Version check + one alerts query
+    assert response.headers["Server-Timing"].startswith("db;dur=")
+
+    monkeypatch.setattr(profiling, "PROFILE_TOKEN", "let-me-profile")
+    monkeypatch.setattr(profiling, "PROFILE_DIR", str(tmp_path))
+    assert "X-Profile-File" not in client.get('/websites', headers={**headers, "X-Profile": "wrong"}).headers
+    profiled = client.get('/websites', headers={**headers, "X-Profile": "let-me-profile"})
+    assert (tmp_path / profiled.headers["X-Profile-File"]).exists()
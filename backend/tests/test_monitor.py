@@ -0,0 +1,816 @@
+import asyncio
+import time
+import threading
+from datetime import datetime, timedelta
+import pytest
+from sqlalchemy import event
+from app import create_app, db
+from app.models import User, Website, Alert, LatestStatus, Metric, MetricChunk, MetricRollup
+from app import monitor
+from app.utils.notifier import NotificationDispatcher
+from app.utils.on_demand import OnDemandChecker
+from app.utils.scheduler import ProbeScheduler, frequency_to_seconds
+from app.utils.leader import FileLock, LeaderElector
+from app.utils.hashring import HashRing
+from app.utils.site_state import SiteStateTable
+from app.utils.metric_store import record_metrics
+from app.utils import rollups, pubsub, chunk_codec, metric_store
+
+# ✅ SCHEDULER TESTS
+def test_frequency_to_seconds():
+    assert frequency_to_seconds(None) == 300
+    assert frequency_to_seconds(5) == 300      # Legacy value in minutes
+    assert frequency_to_seconds(30) == 30
+    assert frequency_to_seconds(86400) == 3600
+
+def test_scheduler_only_returns_due_sites():
+    scheduler = ProbeScheduler()
+    scheduler.sync([(1, 10), (2, 3600)], now=0)
+
+    due = [website_id for website_id, _ in scheduler.pop_due(now=10)]
+    assert due == [1]
+    assert scheduler.pop_due(now=10) == []
+
+    # Site 1 comes back every 10 s, site 2 only once in the hour
+    probes = []
+    for now in range(20, 3601, 10):
+        probes += [website_id for website_id, _ in scheduler.pop_due(now=now)]
+    assert probes.count(2) == 1
+    assert probes.count(1) == 359
+
+def test_scheduler_spreads_start_times():
+    scheduler = ProbeScheduler()
+    scheduler.sync([(website_id, 60) for website_id in range(1, 61)], now=0)
+
+    first_second = scheduler.pop_due(now=1)
+    assert len(first_second) < 10
+
+def test_scheduler_sync_removes_deleted_sites():
+    scheduler = ProbeScheduler()
+    scheduler.sync([(1, 10), (2, 10)], now=0)
+    scheduler.sync([(2, 10)], now=0)
+
+    due = [website_id for website_id, _ in scheduler.pop_due(now=20)]
+    assert due == [2]
+
+def test_sites_due_in_one_tick_share_a_cycle(monkeypatch):
+    scheduler = ProbeScheduler()
+    cycles = []
+
+    async def no_refresh(app, force=False, shard=None):
+        pass
+
+    async def record_cycle(app, website_ids):
+        cycles.append(website_ids)
+
+    monkeypatch.setattr(monitor, "probe_scheduler", scheduler)
+    monkeypatch.setattr(monitor, "refresh_schedule", no_refresh)
+    monkeypatch.setattr(monitor, "check_due_websites", record_cycle)
+    monkeypatch.setattr(monitor, "MONITOR_TICK_SECONDS", 1.0)
+    #200 sites every 10 s: their phases put ~20 of them due in every second
+    scheduler.sync([(website_id, 10) for website_id in range(200)])
+
+    service = monitor.MonitorService(None)
+    service.start()
+    time.sleep(2.5)
+    service.stop()
+    probed = sum(len(website_ids) for website_ids in cycles)
+    assert probed >= 30
+    assert len(cycles) <= 4     # One per tick, not one per site
+
+# ✅ LEADER ELECTION TESTS
+def test_file_lock_is_exclusive(tmp_path):
+    path = str(tmp_path / "monitor.lock")
+    first, second = FileLock(path), FileLock(path)
+
+    assert first.try_acquire()
+    assert not second.try_acquire()
+    first.release()
+    assert second.try_acquire()
+    second.release()
+
+def test_only_one_elector_leads(tmp_path):
+    path = str(tmp_path / "monitor.lock")
+    events = []
+    electors = [
+        LeaderElector(FileLock(path), lambda i=i: events.append(("up", i)), lambda i=i: events.append(("down", i)), retry_seconds=0.05)
+        for i in range(3)
+    ]
+    for elector in electors:
+        elector.start()
+    time.sleep(0.3)
+    assert sum(elector.is_leader for elector in electors) == 1
+
+    # Fail over when the leader steps down
+    leader = next(elector for elector in electors if elector.is_leader)
+    leader.stop()
+    time.sleep(0.3)
+    assert sum(elector.is_leader for elector in electors if elector is not leader) == 1
+
+    for elector in electors:
+        elector.stop()
+    assert [event for event, _ in events].count("up") == 2
+
+# ✅ SHARDING TESTS
+def test_hash_ring_moves_few_keys_on_join():
+    ring = HashRing(["worker-a", "worker-b", "worker-c"])
+    before = {website_id: ring.owner(website_id) for website_id in range(10000)}
+
+    ring.add("worker-d")
+    after = {website_id: ring.owner(website_id) for website_id in range(10000)}
+    moved = [website_id for website_id in before if before[website_id] != after[website_id]]
+
+    # Only keys taken over by the new worker move (~1/4 of them)
+    assert all(after[website_id] == "worker-d" for website_id in moved)
+    assert 1500 < len(moved) < 3500
+
+def test_hash_ring_spreads_keys():
+    ring = HashRing(["worker-a", "worker-b"])
+    owners = [ring.owner(website_id) for website_id in range(10000)]
+    assert 4000 < owners.count("worker-a") < 6000
+
+def test_shard_heartbeat_expires_dead_workers(app):
+    from app.models import MonitorWorker
+
+    with app.app_context():
+        db.session.add(MonitorWorker(id="crashed", started_at=datetime.utcnow(),
+                                     heartbeat_at=datetime.utcnow() - timedelta(hours=1)))
+        db.session.add(MonitorWorker(id="alive", started_at=datetime.utcnow(), heartbeat_at=datetime.utcnow()))
+        db.session.commit()
+
+    shard = monitor.ShardMembership(app, worker_id="me")
+    assert shard.heartbeat(0, 0)
+    assert shard.ring.nodes == {"me", "alive"}
+    shard.leave()
+    with app.app_context():
+        assert set(db.session.execute(db.select(MonitorWorker.id)).scalars()) == {"alive"}
+
+# ✅ ALERT EVALUATION TESTS
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    monkeypatch.setenv("DATABASE_URL", f"sqlite:///{tmp_path / 'monitor.db'}")
+    app = create_app()
+    app.config['TESTING'] = True
+    with app.app_context():
+        db.create_all()
+        user = User(name="Test User", email="test@example.com")
+        user.set_password("securepass")
+        db.session.add(user)
+        db.session.commit()
+        db.session.add_all([
+            Website(user_id=user.id, url=f"http://site{i}.example.com", name=f"Site {i}", frequency=60)
+            for i in range(1, 6)
+        ])
+        db.session.commit()
+    monitor.site_states.clear()
+    yield app
+
+@pytest.fixture
+def sent_emails(monkeypatch):
+    sent = []
+
+    class FakeNotifier:
+        def enqueue(self, to_email, subject, content):
+            sent.append((to_email, subject))
+            return True
+
+    monkeypatch.setattr(monitor, "notifier", FakeNotifier())
+    return sent
+
+def _result(website_id, uptime):
+    return {"website_id": website_id, "response_time": 12.5 if uptime else 0, "uptime": uptime, "timestamp": datetime.utcnow()}
+
+def test_evaluate_alerts_batches_transitions(app, sent_emails):
+    with app.app_context():
+        asyncio.run(monitor.evaluate_alerts([_result(1, 0), _result(2, 0), _result(3, 1)]))
+        assert Alert.query.filter_by(status="unresolved").count() == 2
+        assert len(sent_emails) == 2
+
+        # Still down: no duplicate alerts; site 1 recovers
+        asyncio.run(monitor.evaluate_alerts([_result(1, 1), _result(2, 0), _result(3, 1)]))
+        assert Alert.query.filter_by(status="unresolved").count() == 1
+        assert Alert.query.filter_by(website_id=1, status="resolved").count() == 1
+        assert len(sent_emails) == 3
+        assert "back UP" in sent_emails[-1][1]
+
+def test_resync_snapshot_does_not_reopen_alerts(app, sent_emails, monkeypatch):
+    load_schedule = monitor.load_schedule
+
+    def slow_load_schedule():
+        snapshot = load_schedule()
+        time.sleep(0.2)     # A site goes down while this is in flight
+        return snapshot
+
+    monkeypatch.setattr(monitor, "load_schedule", slow_load_schedule)
+    monkeypatch.setattr(monitor, "probe_scheduler", ProbeScheduler())
+    monkeypatch.setattr(monitor, "site_targets", {})
+    monkeypatch.setattr(monitor, "_last_resync", 0)
+
+    async def scenario():
+        await monitor.evaluate_alerts([_result(2, 1)])
+        resync = asyncio.create_task(monitor.refresh_schedule(app, force=True))
+        await asyncio.sleep(0.05)
+        await monitor.evaluate_alerts([_result(1, 0)])
+        await resync
+        await monitor.evaluate_alerts([_result(1, 0)])
+
+    with app.app_context():
+        asyncio.run(scenario())
+        assert Alert.query.filter_by(website_id=1, status="unresolved").count() == 1
+        assert len(sent_emails) == 1
+
+def test_evaluate_alerts_skips_database_in_steady_state(app, sent_emails):
+    statements = []
+
+    def count(*args):
+        statements.append(args)
+
+    with app.app_context():
+        asyncio.run(monitor.evaluate_alerts([_result(1, 0)]))  # Warm the state table
+        event.listen(db.engine, "before_cursor_execute", count)
+        asyncio.run(monitor.evaluate_alerts([_result(1, 0)] + [_result(website_id, 1) for website_id in range(2, 6)]))
+        event.remove(db.engine, "before_cursor_execute", count)
+    assert statements == []
+
+def test_site_state_reconciles_with_open_alerts():
+    states = SiteStateTable()
+    states.reconcile({1: 10})
+    assert states.record(1, 0, 0) is None       # Already down
+    assert states.record(2, 0, 0) == "down"
+    assert states.get(2).consecutive_failures == 1
+
+    states.reconcile({2: 11})                     # Alert for site 1 was resolved by hand
+    assert states.record(1, 0, 0) == "down"
+    assert states.record(2, 1, 20.0) == "up"
+    assert states.get(2).last_latency == 20.0
+
+    #A snapshot read before a transition must not undo it
+    since = states.version
+    assert states.record(3, 0, 0) == "down"
+    assert states.record(2, 0, 0) == "down"
+    states.reconcile({1: 12}, since=since)        # Loaded before sites 2 and 3 went down
+    assert states.get(2).is_down and states.get(3).is_down
+    assert states.record(3, 0, 0) is None
+
+# ✅ NOTIFIER TESTS
+def test_notifier_retries_then_dead_letters():
+    attempts = []
+
+    async def flaky_send(to_email, subject, content):
+        attempts.append(to_email)
+        return to_email != "broken@example.com"
+
+    async def scenario():
+        notifier = NotificationDispatcher(send=flaky_send, max_attempts=3, backoff=0.01, concurrency=2)
+        await notifier.start()
+        assert notifier.enqueue("ok@example.com", "Subject", "Body")
+        assert notifier.enqueue("broken@example.com", "Subject", "Body")
+        await asyncio.sleep(0.3)
+        await notifier.stop()
+        return notifier
+
+    notifier = asyncio.run(scenario())
+    assert notifier.stats["sent"] == 1
+    assert attempts.count("broken@example.com") == 3
+    assert [n.to_email for n in notifier.dead_letters] == ["broken@example.com"]
+
+def test_dead_lettered_emails_are_stored(app):
+    from app.models import EmailDeadLetter
+    dead = []
+
+    async def failing_send(to_email, subject, content):
+        return False
+
+    async def scenario():
+        notifier = NotificationDispatcher(send=failing_send, max_attempts=1, on_dead_letter=dead.append)
+        await notifier.start()
+        notifier.enqueue("broken@example.com", "Subject", "Body")
+        await asyncio.sleep(0.1)
+        await notifier.stop()
+
+    asyncio.run(scenario())
+    assert len(dead) == 1
+    with app.app_context():
+        monitor.save_dead_letter(dead[0].as_dict())
+        stored = db.session.execute(db.select(EmailDeadLetter)).scalar_one()
+        assert (stored.to_email, stored.content, stored.attempts) == ("broken@example.com", "Body", 1)
+
+def test_notifier_enqueue_never_blocks_when_full():
+    async def slow_send(to_email, subject, content):
+        await asyncio.sleep(1)
+        return True
+
+    async def scenario():
+        notifier = NotificationDispatcher(send=slow_send, max_queue=2, concurrency=1)
+        await notifier.start()
+        accepted = [notifier.enqueue(f"user{i}@example.com", "Subject", "Body") for i in range(5)]
+        await notifier.stop(timeout=0)
+        return accepted, notifier
+
+    accepted, notifier = asyncio.run(scenario())
+    assert accepted == [True, True, False, False, False]
+    assert notifier.stats["dead_lettered"] >= 3
+
+
+def test_record_metrics_maintains_rollups(app):
+    with app.app_context():
+        start = datetime(2024, 1, 1, 12, 0, 0)
+        record_metrics([
+            {"website_id": 1, "timestamp": start.replace(second=second), "uptime": second != 30, "response_time": 100.0 + second}
+            for second in (0, 15, 30, 45)
+        ])
+        record_metrics([{"website_id": 1, "timestamp": start.replace(minute=5), "uptime": True, "response_time": 200.0}])
+
+        resolution, minutes = rollups.read_rollups(1, start, start.replace(minute=10), rollups.MINUTE)
+        assert [m.count for m in minutes] == [4, 1]
+        first = rollups.serialize_rollup(minutes[0])
+        assert first["uptime"] == 0.75
+        assert first["min_response_time"] == 100.0 and first["max_response_time"] == 145.0
+
+        _, hours = rollups.read_rollups(1, start, start.replace(hour=13), rollups.HOUR)
+        assert len(hours) == 1 and hours[0].count == 5 and hours[0].up_count == 4
+
+def test_concurrent_rollup_writers_merge(app, monkeypatch):
+    import threading
+    start = datetime(2024, 1, 1, 12, 0, 0)
+
+    def writer(offset):
+        with app.app_context():
+            for second in range(20):
+                record_metrics([{"website_id": 1, "timestamp": start.replace(second=second),
+                                 "uptime": True, "response_time": 10.0 + offset + second}])
+
+    threads = [threading.Thread(target=writer, args=(offset,)) for offset in (0, 100)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    monkeypatch.setattr(rollups, "HISTOGRAM_COMPACT_LENGTH", 0)
+    with app.app_context():
+        assert rollups.compact_histograms(batch_size=2) == 3
+        _, minutes = rollups.read_rollups(1, start, start.replace(minute=1), rollups.MINUTE)
+        assert minutes[0].count == 40 and minutes[0].latency_count == 40
+        assert minutes[0].latency_min == 10.0 and minutes[0].latency_max == 129.0
+        assert sum(rollups.decode_histogram(minutes[0].histogram).values()) == 40
+        assert minutes[0].histogram.count(",") < 39     # Compacted back to one entry per bucket
+
+    #A busy day rollup stays bounded: upserts re-encode whatever they grow past the threshold
+    monkeypatch.setattr(rollups, "HISTOGRAM_COMPACT_LENGTH", 200)
+    with app.app_context():
+        for second in range(0, 3600, 10):
+            record_metrics([{"website_id": 2, "timestamp": start + timedelta(seconds=second),
+                             "uptime": True, "response_time": 5.0 + second % 400}])
+        _, days = rollups.read_rollups(2, start.replace(hour=0), start.replace(hour=23), rollups.DAY)
+        assert days[0].latency_count == 360
+        assert sum(rollups.decode_histogram(days[0].histogram).values()) == 360
+        assert len(days[0].histogram) <= 200 + 10
+
+
+def test_rollup_resolution_and_percentiles():
+    start = datetime(2024, 1, 1)
+    assert rollups.pick_resolution(start, start.replace(hour=6), now=start) == rollups.MINUTE
+    assert rollups.pick_resolution(start, start.replace(month=2), now=start) == rollups.HOUR
+    assert rollups.pick_resolution(start, start.replace(year=2026), now=start) == rollups.DAY
+    #Minute rollups are pruned after 14 days, so an old range falls back to hourly ones
+    assert rollups.pick_resolution(start, start.replace(hour=6), now=start + timedelta(days=30)) == rollups.HOUR
+    assert rollups.parse_timestamp("1e20") is None and rollups.parse_timestamp("inf") is None
+
+    histogram = {}
+    for latency in range(1, 1001):
+        index = rollups.latency_bucket(latency)
+        histogram[index] = histogram.get(index, 0) + 1
+    assert rollups.decode_histogram(rollups.encode_histogram(histogram)) == histogram
+    assert 850 <= rollups.percentile(histogram, 95) <= 1150
+
+
+def test_record_metrics_keeps_latest_status(app):
+    with app.app_context():
+        now = datetime(2024, 1, 1, 12, 0, 0)
+        record_metrics([
+            {"website_id": 1, "timestamp": now, "uptime": True, "response_time": 120.0},
+            {"website_id": 2, "timestamp": now, "uptime": False, "response_time": 0.0},
+        ])
+        record_metrics([{"website_id": 1, "timestamp": now.replace(minute=1), "uptime": False, "response_time": 0.0}])
+        # A late write for an older probe must not win
+        record_metrics([{"website_id": 2, "timestamp": now.replace(hour=11), "uptime": True, "response_time": 90.0}])
+
+        statuses = {status.website_id: status for status in LatestStatus.query.all()}
+        assert set(statuses) == {1, 2}
+        assert statuses[1].uptime == 0 and statuses[1].timestamp == now.replace(minute=1)
+        assert statuses[2].uptime == 0 and statuses[2].timestamp == now
+
+
+def test_aggregate_metrics_buckets_in_sql(app):
+    with app.app_context():
+        start = datetime(2024, 1, 1, 12, 0, 0)
+        record_metrics([
+            {"website_id": 1, "timestamp": start.replace(minute=minute), "uptime": minute != 7, "response_time": 100.0 + minute}
+            for minute in range(10)
+        ])
+
+        buckets = rollups.aggregate_metrics(1, start, start.replace(minute=10), 300)
+        assert [b["count"] for b in buckets] == [5, 5]
+        assert [b["failures"] for b in buckets] == [0, 1]
+        assert buckets[1]["uptime_pct"] == 80.0
+        assert buckets[0]["avg_response_time"] == 102.0
+        assert buckets[0]["p50_response_time"] <= buckets[0]["p99_response_time"]
+
+        assert rollups.parse_duration("5m") == 300 and rollups.parse_duration("1d") == 86400
+        assert rollups.parse_duration("soon") is None
+
+
+def test_probe_results_fan_out_to_subscribers(monkeypatch):
+    broker = pubsub.InProcessBroker()
+    monkeypatch.setattr(pubsub, "_broker", broker)
+    mine, other = broker.subscribe(pubsub.user_topic(1)), broker.subscribe(pubsub.user_topic(2))
+    control = broker.subscribe(monitor.MONITOR_TOPIC)
+
+    now = datetime.utcnow()
+    monitor.publish_results([
+        {"website_id": 10, "user_id": 1, "uptime": 1, "response_time": 42.0, "timestamp": now},
+        {"website_id": 11, "user_id": 3, "uptime": 0, "response_time": 0, "timestamp": now},
+    ])
+    events, dropped = mine.get(timeout=0)
+    assert [(e["type"], e["website_id"]) for e in events] == [("status", 10)] and dropped == 0
+    assert other.get(timeout=0) == ([], 0)
+    assert control.get(timeout=0) == ([], 0)
+
+    broker.unsubscribe(other)
+    assert broker.subscriber_count == 2
+
+
+def test_event_streams_are_capped_per_worker(app, monkeypatch):
+    from app.routes import events
+    monkeypatch.setattr(events, "_stream_slots", threading.BoundedSemaphore(1))
+    client = app.test_client()
+    token = client.post("/auth/login", json={"email": "test@example.com", "password": "securepass"}).json["access_token"]
+
+    first = client.get(f"/events/stream?token={token}")
+    assert first.status_code == 200
+    busy = client.get(f"/events/stream?token={token}")
+    assert busy.status_code == 503 and busy.headers["Retry-After"]
+
+    #Closing the stream frees its slot
+    first.close()
+    again = client.get(f"/events/stream?token={token}")
+    assert again.status_code == 200
+    again.close()
+
+
+def test_status_check_does_not_block_the_request(app, monkeypatch):
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+    from app.routes import status
+
+    class SlowHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            time.sleep(0.3)
+            self.send_response(200)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), SlowHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    monkeypatch.setattr(status, "_checker", None)
+    client = app.test_client()
+    token = client.post("/auth/login", json={"email": "test@example.com", "password": "securepass"}).json["access_token"]
+    url = f"/status/http://127.0.0.1:{server.server_address[1]}/"
+    try:
+        started = time.perf_counter()
+        assert client.get(url, headers={"Authorization": f"Bearer {token}"}).status_code == 202
+        assert time.perf_counter() - started < 0.25
+        time.sleep(0.5)
+        response = client.get(url, headers={"Authorization": f"Bearer {token}"})
+        assert response.status_code == 200 and response.json["status"] == "online"
+    finally:
+        status._checker.stop()
+        server.shutdown()
+
+
+def test_slow_subscriber_memory_is_bounded():
+    subscription = pubsub.Subscription(pubsub.user_topic(1), max_size=3)
+    for i in range(10):
+        subscription.put({"type": "status", "website_id": i})
+    events, dropped = subscription.get(timeout=0)
+    assert [e["website_id"] for e in events] == [7, 8, 9]
+    assert dropped == 7
+
+
+def test_chunk_codec_round_trip():
+    points = [(1_700_000_000_000 + i * 60_000 + (i % 3), i % 7 != 0, 100.0 + i * 0.35) for i in range(500)]
+    blob = chunk_codec.encode_points(points)
+    assert len(blob) < len(points) * 4
+    decoded = chunk_codec.decode_points(blob)
+    assert [(ts, up) for ts, up, _ in decoded] == [(ts, up) for ts, up, _ in points]
+    assert all(abs(a[2] - b[2]) <= chunk_codec.LATENCY_QUANTUM_MS / 2 + 1e-9 for a, b in zip(decoded, points))
+
+
+def test_prune_keeps_raw_history_unless_configured(app, monkeypatch):
+    with app.app_context():
+        start = datetime.utcnow() - timedelta(days=60)
+        record_metrics([{"website_id": 1, "timestamp": start + timedelta(hours=i), "uptime": True, "response_time": 50.0}
+                        for i in range(12)])
+        rollups.prune_history()
+        assert Metric.query.count() == 12
+
+        monkeypatch.setattr(rollups, "METRIC_RAW_RETENTION_DAYS", 30)
+        rollups.prune_history(batch_size=5)     # Several small transactions
+        assert Metric.query.count() == 0
+        assert not MetricRollup.query.filter_by(resolution=rollups.MINUTE).count()
+        assert MetricRollup.query.filter_by(resolution=rollups.HOUR).count() == 12
+
+
+def test_compacted_history_reads_like_rows(app):
+    with app.app_context():
+        start = datetime(2024, 1, 1, 0, 0, 0)
+        record_metrics([
+            {"website_id": 1, "timestamp": start + timedelta(minutes=30 * i), "uptime": i % 5 != 0, "response_time": 50.0 + i}
+            for i in range(150)   # A bit over three days
+        ])
+        before = metric_store.read_points(1)
+
+        compacted = metric_store.compact_metrics(now=start + timedelta(days=3, hours=12), compact_after_hours=0)
+        assert compacted == 144   # Three whole days; today's rows stay as rows
+        assert Metric.query.count() == 6 and MetricChunk.query.count() == 3
+
+        after = metric_store.read_points(1)
+        assert [(p["timestamp"], bool(p["uptime"])) for p in after] == [(p["timestamp"], bool(p["uptime"])) for p in before]
+
+        seen, cursor = [], None
+        while True:
+            page, cursor = metric_store.read_metrics(1, cursor, size=40)
+            seen.extend(p["timestamp"] for p in page)
+            if not cursor:
+                break
+        assert seen == sorted((p["timestamp"] for p in before), reverse=True)
+
+
+def test_on_demand_checks_coalesce_and_cache():
+    recorded = []
+
+    class SlowChecker(OnDemandChecker):
+        async def _probe(self, url):
+            await asyncio.sleep(0.2)
+            return {"status": "online", "response_time": 12.0, "status_code": 200, "checked_at": datetime.utcnow().isoformat()}
+
+    checker = SlowChecker(cache_seconds=60, on_result=lambda url, result, ids: recorded.append((url, ids)))
+    try:
+        first = checker.check("https://example.com", website_id=1)
+        second = checker.check("https://example.com", website_id=2)
+        assert first is second
+        assert first.result(timeout=5)["status"] == "online"
+
+        third = checker.check("https://example.com")
+        assert third.done() and third.result()["response_time"] == 12.0
+        assert checker.stats == {"probes": 1, "coalesced": 1, "cache_hits": 1}
+
+        deadline = time.time() + 5
+        while not recorded and time.time() < deadline:
+            time.sleep(0.01)
+        assert recorded == [("https://example.com", {1, 2})]
+    finally:
+        checker.stop()
+
+    #Bad URLs are reported as offline instead of failing the request
+    checker = OnDemandChecker()
+    try:
+        for url in ("ftp://example.com", "http://example.com:abc", "http://[::1"):
+            assert checker.check(url).result(timeout=5)["status"] == "offline"
+    finally:
+        checker.stop()
+
+
+# ✅ BENCHMARK FARM TESTS
+def test_target_farm_profiles():
+    import socket
+    import threading
+    import httpx
+    from benchmarks.target_farm import FarmProfile, TargetFarm, site_url
+
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    profile = FarmProfile(latency_ms=1, jitter_ms=0, redirect_rate=0.5, down_rate=0.5)
+    redirecting = next(site for site in range(100) if profile.redirects(site) and not profile.is_down(site))
+    down = next(site for site in range(100) if profile.is_down(site))
+
+    async def scenario():
+        stop = threading.Event()
+        server = asyncio.ensure_future(TargetFarm(profile, hosts=1, port=port).serve(stop=stop))
+        await asyncio.sleep(0.2)
+        try:
+            async with httpx.AsyncClient(follow_redirects=True) as client:
+                redirected = await client.get(site_url(0, port, redirecting))
+                failed = await client.get(site_url(0, port, down))
+        finally:
+            stop.set()
+            await server
+        return redirected, failed
+
+    redirected, failed = asyncio.run(scenario())
+    assert redirected.status_code == 200 and len(redirected.history) == 1
+    assert failed.status_code == 503
+
+
+# ✅ TELEMETRY TESTS
+def test_telemetry_exposition(app, sent_emails, monkeypatch):
+    from app.utils import telemetry
+    histogram = telemetry.Histogram("test_latency_seconds", "Test latency.", ["result"], buckets=(0.1, 1))
+    for value in (0.05, 0.5, 5):
+        histogram.observe(value, result="up")
+    lines = histogram.samples()
+    assert 'test_latency_seconds_bucket{result="up",le="0.1"} 1' in lines
+    assert 'test_latency_seconds_bucket{result="up",le="1.0"} 2' in lines
+    assert 'test_latency_seconds_bucket{result="up",le="+Inf"} 3' in lines
+    assert 'test_latency_seconds_count{result="up"} 3' in lines
+
+    before = telemetry.ALERTS.value(transition="down")
+    with app.app_context():
+        asyncio.run(monitor.evaluate_alerts([_result(1, 0)]))
+    assert telemetry.ALERTS.value(transition="down") == before + 1
+
+    #The standalone port checks the same token and only listens locally by default
+    import httpx
+    server = telemetry.serve_telemetry(0, token="secret")
+    try:
+        assert server.server_address[0] == "127.0.0.1"
+        url = f"http://127.0.0.1:{server.server_address[1]}/"
+        assert httpx.get(url).status_code == 401
+        assert "watchly_alerts_total" in httpx.get(url, headers={"Authorization": "Bearer secret"}).text
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    from app import config
+    client = app.test_client()
+    monkeypatch.setattr(config, "TELEMETRY_TOKEN", None)
+    assert client.get("/health/telemetry").status_code == 404
+    monkeypatch.setattr(config, "TELEMETRY_TOKEN", "secret")
+    assert client.get("/health/telemetry", headers={"Authorization": "Bearer wrong"}).status_code == 401
+    response = client.get("/health/telemetry", headers={"Authorization": "Bearer secret"})
+    assert response.status_code == 200
+    assert response.content_type.startswith("text/plain; version=0.0.4")
+    assert "# TYPE watchly_alerts_total counter" in response.text
+
+
+# ✅ LOGGING TESTS
+def test_log_rate_limit_and_queue():
+    import logging
+    import queue
+    from app.utils.logger import RateLimitFilter, NonBlockingQueueHandler
+
+    rate_limit = RateLimitFilter(limit=2, window=60)
+    records = [logging.LogRecord("watchly", logging.INFO, __file__, 1, "Checking website: %s", (f"site{i}",), None)
+               for i in range(5)]
+    assert [rate_limit.filter(record) for record in records] == [True, True, False, False, False]
+    errors = [logging.LogRecord("watchly", logging.ERROR, __file__, 1, "Probe failed: %s", (i,), None) for i in range(5)]
+    assert all(rate_limit.filter(record) for record in errors)
+
+    rate_limit.window = 0  # Next record opens a new window and reports what was dropped
+    record = logging.LogRecord("watchly", logging.INFO, __file__, 1, "Checking website: %s", ("site5",), None)
+    assert rate_limit.filter(record)
+    assert record.getMessage() == "Checking website: site5 (+3 similar suppressed)"
+
+    handler = NonBlockingQueueHandler(queue.Queue(1))
+    handler.handle(records[0])
+    handler.handle(records[1])  # Queue full: dropped, not blocking
+    assert handler.dropped == 1
+    assert handler.queue.get_nowait().msg == "Checking website: site0"
+
+
+# ✅ PROBE TIMING TESTS
+def test_probe_timings_and_dns_cache(app):
+    import threading
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+    from app.models import MetricTiming
+    from app.utils.http_client import ProbeClient, ProbeTimer
+
+    class SlowHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            time.sleep(0.05)
+            self.send_response(200)
+            self.send_header("Content-Length", "2")
+            self.end_headers()
+            self.wfile.write(b"ok")
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), SlowHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://localhost:{server.server_address[1]}/"
+    client = ProbeClient(dns_cache_seconds=60)
+
+    async def probe_twice():
+        first, second = ProbeTimer(), ProbeTimer()
+        await client.get(url, timer=first)
+        await client.aclose()  # Fresh connection, but the host stays cached
+        await client.get(url, timer=second)
+        await client.aclose()
+        return first.as_dict(), second.as_dict()
+
+    try:
+        first, second = asyncio.run(probe_twice())
+    finally:
+        server.shutdown()
+    assert first["dns_ms"] is not None and second["dns_ms"] is None
+    assert second["connect_ms"] is not None and second["tls_ms"] is None
+    assert first["ttfb_ms"] >= 50 and second["ttfb_ms"] >= 50
+
+    with app.app_context():
+        record_metrics([{"website_id": 1, "response_time": 60.0, "uptime": 1, "timestamp": datetime.utcnow(), "timings": second}])
+        timing = db.session.execute(db.select(MetricTiming)).scalar_one()
+        assert timing.ttfb_ms == pytest.approx(second["ttfb_ms"], rel=1e-3)
+        assert timing.dns_ms is None
+
+def test_probe_time_excludes_host_queue(monkeypatch):
+    import threading
+    import httpx
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+    from app.utils.http_client import ProbeClient
+
+    class SlowHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            time.sleep(0.2)
+            self.send_response(200)
+            self.send_header("Content-Length", "2")
+            self.end_headers()
+            self.wfile.write(b"ok")
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), SlowHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}/"
+    client = ProbeClient(timeout=0.3, max_per_host=1)
+
+    async def scenario():
+        results = await asyncio.gather(*(client.probe(url) for _ in range(3)), return_exceptions=True)
+        await client.aclose()
+        return results
+
+    async def monitor_scenario():
+        targets = [monitor.SiteTarget(i, url, 1) for i in range(3)]
+        results = await asyncio.gather(*(monitor.check_websites(target) for target in targets))
+        await client.aclose()
+        return results
+
+    monkeypatch.setattr(monitor, "probe_client", client)
+    try:
+        first, second, third = asyncio.run(scenario())
+        checked = asyncio.run(monitor_scenario())
+    finally:
+        server.shutdown()
+    #The limiter sees the probes' own time, and a host-slot wait timing out isn't an upstream timeout
+    assert [result["uptime"] for result in checked] == [1, 1, 0]
+    assert all(result["probe_seconds"] < 0.3 for result in checked[:2])
+    assert checked[2]["probe_seconds"] is None and not checked[2]["timed_out"]
+    #The second probe queued ~0.2 s behind the first but is timed from its own request
+    assert first[1] < 0.3 and second[1] < 0.3
+    #The third would queue past the timeout, so it gives up instead of waiting forever
+    assert isinstance(third, httpx.PoolTimeout)
+    assert client._host_slots == {}
+
+# ✅ ADAPTIVE CONCURRENCY TESTS
+def test_probe_limiter_grows_then_backs_off():
+    from app.utils.limiter import AdaptiveLimiter
+
+    limiter = AdaptiveLimiter(initial=4, min_limit=2, max_limit=32)
+    peak = 0
+
+    async def unmeasured():
+        for _ in range(50):
+            await limiter.acquire()
+            limiter.release(None)
+    asyncio.run(unmeasured())
+    assert limiter.limit == 4 and limiter.baseline is None and limiter.in_flight == 0
+
+    async def probe(latency, timed_out):
+        nonlocal peak
+        await limiter.acquire()
+        peak = max(peak, limiter.in_flight)
+        await asyncio.sleep(0)
+        limiter.release(latency, timed_out=timed_out)
+
+    async def wave(count, latency, timed_out=False):
+        await asyncio.gather(*(probe(latency, timed_out) for _ in range(count)))
+
+    #Healthy and saturated: slow start doubles the limit up to the ceiling
+    asyncio.run(wave(400, 0.05))
+    assert limiter.limit == 32 and limiter.slow_start
+    assert peak <= 32
+
+    #Every probe timing out: multiplicative back-off down to the floor
+    asyncio.run(wave(400, 5.0, timed_out=True))
+    assert limiter.limit == 2 and not limiter.slow_start
+    assert limiter.in_flight == 0 and limiter.as_dict()["decreases"] >= 1
+
+    #Recovery is additive once slow start is over
+    peak = 0
+    asyncio.run(wave(40, 0.05))
+    assert 2 < limiter.limit <= 6
+    assert peak <= limiter.limit